@@ -0,0 +1,11 @@
+"""
+.. module: hubcommander.__main__
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+from hubcommander.hubcommander import main
+
+main()
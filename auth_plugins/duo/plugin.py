@@ -8,11 +8,14 @@
 """
 import json
 
-from duo_client.client import Client
-
+from hubcommander.bot_components import circuit_breaker
 from hubcommander.bot_components.bot_classes import BotAuthPlugin
 from hubcommander.bot_components.slack_comm import send_info, send_error, send_success
 
+# How long to wait for Duo (in seconds). Duo waits for the user to approve the push before it responds, which times out
+# after 60 seconds:
+DUO_TIMEOUT = 75
+
 
 class InvalidDuoResponseError(Exception):
     pass
@@ -27,16 +30,20 @@ class NoSecretsProvidedError(Exception):
 
 
 class DuoPlugin(BotAuthPlugin):
+    upstreams = ["Duo"]
+
     def __init__(self):
         super().__init__()
 
         self.clients = {}
 
     def setup(self, secrets, **kwargs):
+        from duo_client.client import Client
+
         for variable, secret in secrets.items():
             if "DUO_" in variable:
                 domain, host, ikey, skey = secret.split(",")
-                self.clients[domain] = Client(ikey, skey, host)
+                self.clients[domain] = Client(ikey, skey, host, timeout=DUO_TIMEOUT)
 
         if not len(self.clients):
             raise NoSecretsProvidedError("Must provide secrets to enable authentication.")
@@ -54,7 +61,15 @@ class DuoPlugin(BotAuthPlugin):
                   .format(user_data["name"]), markdown=True, ephemeral_user=user_data["id"])
 
         try:
-            result = self._perform_auth(user_data, self.clients[domain])
+            # Users that Duo can't authenticate are not a problem with Duo itself:
+            result = circuit_breaker.call("Duo", lambda: self._perform_auth(user_data, self.clients[domain]),
+                                          expected_errors=(CantDuoUserError,))
+
+        except circuit_breaker.CircuitOpenError as coe:
+            send_error(data["channel"], "💀 @{}: {} Aborting...".format(user_data["name"], str(coe)),
+                       thread=data["ts"], markdown=True)
+            return False
+
         except InvalidDuoResponseError as idre:
             send_error(data["channel"], "💀 @{}: There was a problem communicating with Duo. Got this status: {}. "
                                         "Aborting..."
@@ -0,0 +1,65 @@
+"""
+.. module: hubcommander.benchmarks.admission
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+
+Measures the per-message cost of deciding whether a message from Slack is a command.
+
+Run with: python -m hubcommander.benchmarks.admission
+"""
+import timeit
+
+from hubcommander.bot_components.admission import AdmissionFilter
+
+COMMANDS = ["!help", "!listorgs", "!listprs", "!listkeys", "!addkey", "!deletekey", "!getkey", "!createrepo",
+            "!adduser", "!addcollab", "!setrepopermissions", "!setdefaultbranch", "!setdescription",
+            "!sethomepage", "!setbranchprotection", "!setteampermissions", "!enabletravis", "!listtravisorgs",
+            "!repeat", "!repeatthread", "!repeatephemeral"]
+IGNORE_ROOMS = ["C{:08d}".format(x) for x in range(20)]
+ONLY_LISTEN = []
+
+MESSAGES = {
+    "chatter": {"type": "message", "channel": "C99999999", "user": "U1", "ts": "1.1",
+                "text": "Has anyone looked at the build failure from this morning? It seems to be flaky again."},
+    "edit": {"type": "message", "subtype": "message_changed", "channel": "C99999999", "ts": "1.1"},
+    "bot": {"type": "message", "bot_id": "B1", "channel": "C99999999", "ts": "1.1", "text": "!help"},
+    "no text": {"type": "message", "channel": "C99999999", "user": "U1", "ts": "1.1"},
+    "exclamation": {"type": "message", "channel": "C99999999", "user": "U1", "ts": "1.1", "text": "!!! Yay"},
+    "command": {"type": "message", "channel": "C99999999", "user": "U1", "ts": "1.1",
+                "text": "!ListPRs Netflix hubcommander open"},
+}
+
+
+def original(data, commands=set(COMMANDS)):
+    """
+    The checks from before the admission filter (which raise a KeyError on messages without text).
+    """
+    if data["channel"] in IGNORE_ROOMS:
+        return None
+
+    if len(ONLY_LISTEN) > 0 and data["channel"] not in ONLY_LISTEN:
+        return None
+
+    command_prefix = data["text"].split(" ")[0].lower()
+    return command_prefix if command_prefix in commands else None
+
+
+def main(number=200000):
+    admission_filter = AdmissionFilter(COMMANDS, IGNORE_ROOMS, ONLY_LISTEN)
+
+    print("{:<14}{:>14}{:>14}".format("Message", "Original (ns)", "Filter (ns)"))
+    for name, data in MESSAGES.items():
+        try:
+            before = "{:.0f}".format(timeit.timeit(lambda: original(data), number=number) / number * 1e9)
+        except KeyError:
+            before = "crash"
+
+        after = timeit.timeit(lambda: admission_filter.match(data), number=number) / number * 1e9
+        print("{:<14}{:>14}{:>14.0f}".format(name, before, after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+.. module: hubcommander.benchmarks.startup
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+
+Reports how long it takes to import HubCommander (and its plugins), and which modules take the longest.
+
+Run with: python -m hubcommander.benchmarks.startup
+"""
+import os
+import subprocess
+import sys
+
+MODULE = "hubcommander.hubcommander"
+
+
+def import_times(module=MODULE):
+    """
+    Imports the module in a fresh interpreter with `-X importtime`.
+    :param module:
+    :return: A list of (module, self microseconds, cumulative microseconds), in import order.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+                            stderr=subprocess.PIPE, universal_newlines=True, env=os.environ.copy(), check=True)
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_time), int(cumulative)))
+
+    return times
+
+
+def main(top=20):
+    times = import_times()
+    total = next(cumulative for name, _, cumulative in reversed(times) if name == MODULE)
+
+    print("Importing {} took {:.1f} ms.\n".format(MODULE, total / 1000))
+    print("{:<60}{:>12}".format("Slowest modules (including what they import)", "ms"))
+    for name, _, cumulative in sorted(times, key=lambda t: t[2], reverse=True)[1:top + 1]:
+        print("{:<60}{:>12.1f}".format(name, cumulative / 1000))
+
+
+if __name__ == "__main__":
+    main()
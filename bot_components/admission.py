@@ -0,0 +1,51 @@
+"""
+.. module: hubcommander.bot_components.admission
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+
+
+class AdmissionFilter:
+    """
+    Decides (as cheaply as possible) whether a message from Slack is a command.
+
+    This runs on every message in every channel that HubCommander is in, and nearly all of them are not commands.
+    So, the checks are ordered from cheapest to most expensive, and nothing is allocated until the message starts
+    with the same character as one of the commands.
+    """
+    def __init__(self, commands, ignore_rooms=(), only_listen=()):
+        self.commands = frozenset(command.lower() for command in commands)
+        self.first_chars = frozenset(c for command in self.commands for c in (command[0], command[0].upper()))
+        self.max_length = max((len(command) for command in self.commands), default=0)
+        self.ignore_rooms = frozenset(ignore_rooms)
+        self.only_listen = frozenset(only_listen)
+
+    def match(self, data):
+        """
+        :param data: The message from Slack.
+        :return: The command (lower-cased) that the message is for, or None if it's not a command.
+        """
+        # Edits, joins, bot messages, etc.:
+        if "subtype" in data or "bot_id" in data:
+            return None
+
+        text = data.get("text")
+        if not text or text[0] not in self.first_chars:
+            return None
+
+        channel = data.get("channel")
+        if channel in self.ignore_rooms or (self.only_listen and channel not in self.only_listen):
+            return None
+
+        end = text.find(" ", 0, self.max_length + 1)
+        if end == -1:
+            if len(text) > self.max_length:
+                return None
+
+            end = len(text)
+
+        command = text[:end].lower()
+        return command if command in self.commands else None
@@ -9,14 +9,34 @@
 
 
 class BotPlugin:
+    # The names of the plugins (in enabled_plugins.py) whose setup() needs to finish before this plugin's setup()
+    # runs. Plugins without dependencies on each other are set up at the same time:
+    depends_on = []
+
+    # The names of the services that this plugin calls (like "GitHub"). While one of them is down (its circuit
+    # breaker is open), the plugin's commands fail right away with a message, rather than waiting on it:
+    upstreams = []
+
     def __init__(self):
         pass
 
     def setup(self, secrets, **kwargs):
         raise NotImplementedError()
 
+    def warm_up(self):
+        """
+        Called on a background thread after setup() when WARM_UP is enabled in config.py. Use it to open connections
+        and fill caches ahead of the first command.
+        """
+        pass
+
 
 class BotCommander(BotPlugin):
+    """
+    Command plugins. The functions for the commands (in `self.commands`) can be regular functions, or `async def`
+    coroutines. Coroutines are run on a shared event loop (see `bot_components/event_loop.py`), so they can
+    `await` many things at once without needing threads.
+    """
     def __init__(self):
         super().__init__()
         self.commands = {}
@@ -26,6 +46,9 @@ class BotCommander(BotPlugin):
 
 
 class BotAuthPlugin(BotPlugin):
+    """
+    Auth plugins. `authenticate()` can be a regular function, or an `async def` coroutine.
+    """
     def __init__(self):
         super().__init__()
 
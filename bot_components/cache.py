@@ -0,0 +1,501 @@
+"""
+.. module: hubcommander.bot_components.cache
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# All the caches, by namespace:
+CACHES = {}
+
+# The backend for caches that don't have their own (None means that each cache keeps its entries in memory):
+BACKEND = None
+
+# Saves the in-memory caches to a file every so often (None means that they aren't saved):
+SNAPSHOTS = None
+
+
+def _encode_key(key):
+    return json.dumps(key, sort_keys=True)
+
+
+def _decode_key(key):
+    key = json.loads(key)
+    return tuple(key) if isinstance(key, list) else key   # JSON turns tuples into lists.
+
+
+class MemoryBackend:
+    """
+    Keeps the entries in this process. Only the most recently used `max_entries` are kept.
+    """
+    shared = False
+
+    def __init__(self, max_entries=10000, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+
+            if entry[3] <= self.clock():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def items(self, prefix):
+        now = self.clock()
+        with self.lock:
+            return [(key, entry) for key, entry in self.entries.items() if key.startswith(prefix) and entry[3] > now]
+
+    def count(self, prefix):
+        now = self.clock()
+        with self.lock:
+            return sum(1 for key, entry in self.entries.items() if key.startswith(prefix) and entry[3] > now)
+
+
+class SQLiteBackend:
+    """
+    Keeps the entries in a SQLite database, which all the worker processes (and replicas on the same host) share.
+    The values need to be JSON serializable.
+    """
+    shared = True
+
+    def __init__(self, path, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        import sqlite3   # Only needed with the sqlite cache backend.
+
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cache "
+                                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored REAL NOT NULL, "
+                                "fresh_until REAL NOT NULL, expires REAL NOT NULL)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT value, stored, fresh_until, expires FROM cache "
+                                          "WHERE key = ? AND expires > ?", (key, self.clock())).fetchone()
+
+        return (json.loads(row[0]),) + tuple(row[1:]) if row else None
+
+    def set(self, key, entry):
+        value, stored, fresh_until, expires = entry
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO cache (key, value, stored, fresh_until, expires) "
+                                    "VALUES (?, ?, ?, ?, ?)", (key, json.dumps(value), stored, fresh_until, expires))
+
+            # Every so often, clean out the expired entries so that the table doesn't grow forever:
+            if self.connection.total_changes % 100 == 0:
+                self.connection.execute("DELETE FROM cache WHERE expires <= ?", (self.clock(),))
+
+    def delete(self, key):
+        with self.lock:
+            self.connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, prefix):
+        with self.lock:
+            self.connection.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def items(self, prefix):
+        with self.lock:
+            rows = self.connection.execute("SELECT key, value, stored, fresh_until, expires FROM cache "
+                                           "WHERE substr(key, 1, ?) = ? AND expires > ?",
+                                           (len(prefix), prefix, self.clock())).fetchall()
+
+        return [(row[0], (json.loads(row[1]),) + tuple(row[2:])) for row in rows]
+
+    def count(self, prefix):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM cache WHERE substr(key, 1, ?) = ? AND expires > ?",
+                                           (len(prefix), prefix, self.clock())).fetchone()[0]
+
+
+class RedisBackend:
+    """
+    Keeps the entries in Redis (or anything that speaks its protocol), which all the replicas can share. The values
+    need to be JSON serializable. Redis expires the entries itself, and its `maxmemory` limits the size.
+    """
+    shared = True
+
+    def __init__(self, url, clock=time.time):
+        self.clock = clock
+
+        import redis   # Only needed with the redis cache backend.
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return tuple(json.loads(raw)) if raw else None
+
+    def set(self, key, entry):
+        milliseconds = int((entry[3] - self.clock()) * 1000)
+        if milliseconds > 0:
+            self.client.set(key, json.dumps(entry), px=milliseconds)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def clear(self, prefix):
+        for key in self.client.scan_iter(match=prefix + "*"):
+            self.client.delete(key)
+
+    def items(self, prefix):
+        items = []
+        for key in self.client.scan_iter(match=prefix + "*"):
+            raw = self.client.get(key)
+            if raw:
+                items.append((key.decode("utf-8"), tuple(json.loads(raw))))
+
+        return items
+
+    def count(self, prefix):
+        # Only the keys are scanned (Redis drops the expired ones itself):
+        return sum(1 for _ in self.client.scan_iter(match=prefix + "*"))
+
+
+def make_backend(config):
+    """
+    Makes the cache backend from its config (see `CACHE_BACKEND` in config.py).
+    :param config: A dict with the "type" ("memory", "sqlite", or "redis"), and its settings.
+    :return: The backend, or None for the in-memory backend.
+    """
+    if config["type"] == "memory":
+        return None
+
+    if config["type"] == "sqlite":
+        return SQLiteBackend(config["path"])
+
+    if config["type"] == "redis":
+        return RedisBackend(config["url"])
+
+    raise ValueError("Unknown cache backend: {}".format(config["type"]))
+
+
+def configure_backend(config):
+    global BACKEND
+
+    BACKEND = make_backend(config) if config else None
+
+
+class Cache:
+    """
+    A namespace of cached values. Each entry is fresh for `ttl` seconds after it's set, and then stale for another
+    `stale_ttl` seconds. Stale entries are still returned, but are fetched again in the background (if the lookup
+    says how). Keys and values need to be JSON serializable for the shared backends.
+
+    The entries are kept in the backend that's passed in, or the one from `configure_backend()` (which is looked up
+    when the cache is used, since plugins make their caches before the backend is configured). By default, each
+    cache keeps up to `max_entries` in memory.
+    """
+    def __init__(self, namespace, ttl, stale_ttl=0, max_entries=10000, backend=None, clock=time.time):
+        self.namespace = namespace
+        self.prefix = namespace + ":"
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.memory = MemoryBackend(max_entries, clock=clock)
+        self._backend = backend
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        self.counts = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+        CACHES[namespace] = self
+
+    @property
+    def backend(self):
+        return self._backend or BACKEND or self.memory
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def lookup(self, key):
+        """
+        :return: The (value, how many seconds ago it was set, whether it's stale), or None if it's not cached.
+        """
+        entry = self.backend.get(self.prefix + _encode_key(key))
+        if not entry:
+            self._count("misses")
+            return None
+
+        value, stored, fresh_until, _ = entry
+        now = self.clock()
+        stale = fresh_until <= now
+        self._count("stale_hits" if stale else "hits")
+        return value, now - stored, stale
+
+    def get(self, key, default=None, refresh=None):
+        """
+        :param key:
+        :param default: Returned if the key isn't cached.
+        :param refresh: A function that fetches the value. If the entry is stale, then it's called in the background.
+        :return:
+        """
+        found = self.lookup(key)
+        if not found:
+            return default
+
+        value, _, stale = found
+        if stale and refresh:
+            self.refresh(key, refresh)
+
+        return value
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Returns the cached value (refreshing it in the background if it's stale), or fetches and caches it if it's
+        not cached.
+        """
+        found = self.lookup(key)
+        if found:
+            value, _, stale = found
+            if stale:
+                self.refresh(key, fetch)
+
+            return value
+
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def is_stale(self, key):
+        found = self.lookup(key)
+        return bool(found and found[2])
+
+    def set(self, key, value, ttl=None, stale=False, stored=None):
+        """
+        :param key:
+        :param value:
+        :param ttl: How long the entry is fresh for (instead of the cache's `ttl`).
+        :param stale: Marks the entry as stale right away, like for entries that are loaded from a snapshot.
+        :param stored: When the value was fetched (if not now), like for entries that are loaded from a snapshot. The
+                       entry expires `ttl + stale_ttl` seconds after this.
+        :return:
+        """
+        now = self.clock()
+        stored = now if stored is None else stored
+        ttl = self.ttl if ttl is None else ttl
+        fresh_until = now if stale else stored + ttl
+        self.backend.set(self.prefix + _encode_key(key), (value, stored, fresh_until, stored + ttl + self.stale_ttl))
+
+    def refresh(self, key, fetch):
+        """
+        Fetches the value again on a background thread. The old value is used until that's done. If the fetch fails
+        (or returns None), then the entry is left as it is.
+        :param key:
+        :param fetch: A function that returns the fresh value.
+        :return: The thread, or None if the key is already being refreshed.
+        """
+        encoded = _encode_key(key)
+        with self.lock:
+            if encoded in self.refreshing:
+                return None
+
+            self.refreshing.add(encoded)
+
+        def run():
+            try:
+                fresh = fetch()
+                if fresh is not None:
+                    self.set(key, fresh)
+
+                self._count("refreshes")
+
+            except Exception as e:
+                self._count("refresh_failures")
+                print("[!] Couldn't refresh the cached {} in {}: {}".format(key, self.namespace, e))
+
+            finally:
+                with self.lock:
+                    self.refreshing.discard(encoded)
+
+        thread = threading.Thread(target=run, name="hubcommander-cache-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def delete(self, key):
+        self.backend.delete(self.prefix + _encode_key(key))
+
+    def clear(self):
+        self.backend.clear(self.prefix)
+
+    def items(self):
+        """
+        :return: A list of (key, value) for all the entries that haven't expired.
+        """
+        return [(_decode_key(key[len(self.prefix):]), entry[0]) for key, entry in self.backend.items(self.prefix)]
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+
+        stats["entries"] = len(self)
+        return stats
+
+    def __contains__(self, key):
+        return self.backend.get(self.prefix + _encode_key(key)) is not None
+
+    def __len__(self):
+        return self.backend.count(self.prefix)
+
+
+def cache_stats():
+    """
+    :return: A dict of each cache's namespace to its stats.
+    """
+    return {namespace: cache.stats() for namespace, cache in CACHES.items()}
+
+
+class CacheSnapshots:
+    """
+    Saves the in-memory caches to a SQLite database every `interval` seconds, so that they can be loaded again after
+    a restart (rather than filled again by a burst of calls to GitHub and Slack). Caches with a shared backend keep
+    their entries across restarts already, so they are skipped.
+
+    Loaded entries keep the time that they were fetched at, so they expire when they would have without the restart
+    (and older ones aren't loaded at all). They are stale: they are used, but are fetched again when they are next
+    needed (or by the warm-up).
+    """
+    def __init__(self, path, caches, interval=300):
+        self.caches = caches
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+        import sqlite3   # Only needed with a CACHE_SNAPSHOT_PATH.
+
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cache_entries "
+                                "(cache TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, saved REAL NOT NULL, "
+                                "PRIMARY KEY (cache, key))")
+
+    def _in_memory(self):
+        return {name: cache for name, cache in self.caches.items() if not cache.backend.shared}
+
+    def save(self):
+        """
+        Replaces the snapshot of each cache with what's in it now.
+        :return: The number of entries that were saved.
+        """
+        saved = 0
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                for name, cache in self._in_memory().items():
+                    # Each entry is saved with the time that it was fetched:
+                    rows = [(name, key[len(cache.prefix):], json.dumps(entry[0]), entry[1])
+                            for key, entry in cache.backend.items(cache.prefix)]
+                    self.connection.execute("DELETE FROM cache_entries WHERE cache = ?", (name,))
+                    self.connection.executemany("INSERT INTO cache_entries (cache, key, value, saved) "
+                                                "VALUES (?, ?, ?, ?)", rows)
+                    saved += len(rows)
+
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+        return saved
+
+    def load(self):
+        """
+        Loads the snapshot into the caches, as stale entries. Entries that are already in the caches are kept, and
+        entries that would have expired by now are skipped.
+        :return: The number of entries that were loaded.
+        """
+        loaded = 0
+        caches = self._in_memory()
+        with self.lock:
+            rows = self.connection.execute("SELECT cache, key, value, saved FROM cache_entries").fetchall()
+
+        for name, key, value, saved in rows:
+            cache = caches.get(name)
+            if cache is None or saved + cache.ttl + cache.stale_ttl <= cache.clock():
+                continue
+
+            key = _decode_key(key)
+            if key in cache:
+                continue
+
+            cache.set(key, json.loads(value), stale=True, stored=saved)
+            loaded += 1
+
+        return loaded
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="hubcommander-cache-snapshots", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops saving in the background, and saves one last time.
+        """
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+
+        self.save()
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                print("[!] Couldn't save the cache snapshot: {}".format(e))
+
+
+def start_snapshots(path, interval=300):
+    """
+    Loads the last snapshot into the in-memory caches, and then saves them every `interval` seconds.
+    :param path:
+    :param interval:
+    :return:
+    """
+    global SNAPSHOTS
+
+    if not SNAPSHOTS:
+        SNAPSHOTS = CacheSnapshots(path, CACHES, interval)
+        print("[+] Loaded {} cached entries from the snapshot.".format(SNAPSHOTS.load()))
+        SNAPSHOTS.start()
+
+    return SNAPSHOTS
+
+
+def stop_snapshots():
+    global SNAPSHOTS
+
+    if SNAPSHOTS:
+        SNAPSHOTS.stop()
+        SNAPSHOTS = None
@@ -0,0 +1,227 @@
+"""
+.. module: hubcommander.bot_components.circuit_breaker
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_SETTINGS = {
+    "failure_ratio": 0.5,
+    "minimum_calls": 5,
+    "window": 60,
+    "slow_seconds": 9,
+    "open_seconds": 30,
+}
+
+# The settings for each upstream (see `CIRCUIT_BREAKERS` in config.py). None means that the breakers never open:
+SETTINGS = None
+
+# The breakers, by upstream name. They are made the first time that the upstream is called:
+BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, upstream, retry_in):
+        self.upstream = upstream
+        self.retry_in = retry_in
+        super().__init__("{} isn't responding right now, so it won't be called for another {:.0f}s."
+                         .format(upstream, retry_in))
+
+
+class CircuitBreaker:
+    """
+    Keeps track of how the calls to an upstream (like GitHub) are going. If at least `minimum_calls` are made within
+    `window` seconds, and `failure_ratio` of them fail (or take longer than `slow_seconds`), then the breaker opens.
+
+    While it's open, calls fail right away with a `CircuitOpenError`, rather than waiting on the upstream. After
+    `open_seconds`, it's half open: a single call is let through as a probe. If that works, then the breaker closes
+    again. Otherwise, it's open for another `open_seconds`.
+    """
+    def __init__(self, name, failure_ratio=0.5, minimum_calls=5, window=60, slow_seconds=9, open_seconds=30,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.calls = deque()
+        self.counts = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def retry_in(self):
+        """
+        :return: How many seconds until a probe is let through (0 if calls can be made now).
+        """
+        with self.lock:
+            return self._retry_in()
+
+    def _retry_in(self):
+        if self.state == CLOSED or (self.state == HALF_OPEN and not self.probing):
+            return 0
+
+        if self.state == OPEN:
+            return max(0, self.opened_at + self.open_seconds - self.clock())
+
+        # Waiting on the probe:
+        return self.open_seconds
+
+    def before(self):
+        """
+        Called before calling the upstream. Raises a `CircuitOpenError` if the call shouldn't be made.
+        """
+        with self.lock:
+            if self.state == OPEN and self._retry_in() == 0:
+                self.state = HALF_OPEN
+
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return
+
+            if self.state != CLOSED:
+                self.counts["rejected"] += 1
+                raise CircuitOpenError(self.name, self._retry_in())
+
+    def record(self, seconds, failed):
+        """
+        Called with how the call went.
+        :param seconds: How long the call took.
+        :param failed: True if the call failed (like a connection error, or a 5xx).
+        :return:
+        """
+        failed = failed or (self.slow_seconds is not None and seconds > self.slow_seconds)
+        now = self.clock()
+
+        with self.lock:
+            self.counts["calls"] += 1
+            if failed:
+                self.counts["failures"] += 1
+
+            if self.state == HALF_OPEN and self.probing:
+                self.probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    print("[+] The circuit breaker for {} is closed again.".format(self.name))
+                    self.state = CLOSED
+                    self.calls.clear()
+                return
+
+            self.calls.append((now, failed))
+            while self.calls and self.calls[0][0] <= now - self.window:
+                self.calls.popleft()
+
+            failures = sum(1 for _, call_failed in self.calls if call_failed)
+            if self.state == CLOSED and len(self.calls) >= self.minimum_calls \
+                    and failures >= self.failure_ratio * len(self.calls):
+                self._open(now)
+
+    def _open(self, now):
+        print("[!] The circuit breaker for {} is open for {}s.".format(self.name, self.open_seconds))
+        self.state = OPEN
+        self.opened_at = now
+        self.counts["opened"] += 1
+        self.calls.clear()
+
+    def call(self, func, is_failure=None, expected_errors=()):
+        """
+        Calls the function through the breaker.
+        :param func:
+        :param is_failure: A function that says if the result counts as a failure (like a 5xx response).
+        :param expected_errors: Exceptions that don't count as failures (since they mean that the upstream answered).
+        :return: What the function returned.
+        """
+        self.before()
+        started = self.clock()
+        try:
+            result = func()
+        except expected_errors:
+            self.record(self.clock() - started, False)
+            raise
+        except Exception:
+            self.record(self.clock() - started, True)
+            raise
+
+        self.record(self.clock() - started, bool(is_failure and is_failure(result)))
+        return result
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+            stats["state"] = self.state
+            return stats
+
+
+def configure(settings):
+    """
+    :param settings: A dict of the upstream name (or "default") to the breaker's settings, or None to disable them.
+    :return:
+    """
+    global SETTINGS
+
+    with _BREAKERS_LOCK:
+        SETTINGS = settings
+        BREAKERS.clear()
+
+
+def get_breaker(upstream):
+    """
+    :param upstream:
+    :return: The breaker for the upstream, or None if the breakers are disabled.
+    """
+    if SETTINGS is None:
+        return None
+
+    breaker = BREAKERS.get(upstream)
+    if not breaker:
+        with _BREAKERS_LOCK:
+            breaker = BREAKERS.get(upstream)
+            if not breaker:
+                settings = dict(DEFAULT_SETTINGS)
+                settings.update(SETTINGS.get("default", {}))
+                settings.update(SETTINGS.get(upstream, {}))
+                breaker = BREAKERS[upstream] = CircuitBreaker(upstream, **settings)
+
+    return breaker
+
+
+def call(upstream, func, is_failure=None, expected_errors=()):
+    """
+    Calls the function through the upstream's breaker (or just calls it, if the breakers are disabled).
+    """
+    breaker = get_breaker(upstream)
+    if not breaker:
+        return func()
+
+    return breaker.call(func, is_failure=is_failure, expected_errors=expected_errors)
+
+
+def open_breakers(upstreams):
+    """
+    :param upstreams:
+    :return: The breakers for the upstreams that can't be called right now.
+    """
+    breakers = [get_breaker(upstream) for upstream in upstreams]
+    return [breaker for breaker in breakers if breaker and breaker.retry_in()]
+
+
+def breaker_states():
+    """
+    :return: A dict of each upstream's name to its breaker's stats.
+    """
+    return {name: breaker.stats() for name, breaker in list(BREAKERS.items())}
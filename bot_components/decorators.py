@@ -8,8 +8,11 @@
 """
 import argparse
 import shlex
+import time
 
-from hubcommander.bot_components.parse_functions import ParseException
+from hubcommander.bot_components import metrics, tracing
+from hubcommander.bot_components.parse_functions import ParseException, cleanup_argument, replace_smart_quotes
+from hubcommander.bot_components.pipeline import PipelineSpec, Stage, add_stage
 from hubcommander.bot_components.slack_comm import send_info, send_error
 
 ARG_TYPE = ["required", "optional"]
@@ -83,10 +86,7 @@ def perform_additional_verification(plugin_obj, args, **kwargs):
 
                         # Perform cleanups? Removes <>, {}, &lt;&gt; from the variables if `cleanup=False` not set.
                         if argument.get("cleanup", True):
-                            args[real_arg_name] = args[real_arg_name].replace("<", "") \
-                                .replace(">", "").replace("{", "").replace("}", "") \
-                                .replace("[", "").replace("]", "") \
-                                .replace("&lt;", "").replace("&gt;", "")
+                            args[real_arg_name] = cleanup_argument(args[real_arg_name])
 
                     # Perform custom validation if needed:
                     if argument.get("validation_func"):
@@ -101,90 +101,121 @@ def perform_additional_verification(plugin_obj, args, **kwargs):
     return args
 
 
+def build_parser(plugin_obj, **kwargs):
+    """
+    Builds the argparse parser for the command.
+    :param plugin_obj:
+    :param kwargs:
+    :return:
+    """
+    parser = argparse.ArgumentParser(prog=kwargs["name"],
+                                     description=kwargs["description"],
+                                     usage=kwargs["usage"])
+
+    # Dynamically add in the required and optional arguments:
+    for at in ARG_TYPE:
+        if kwargs.get(at):
+            for argument in kwargs[at]:
+                # If there is a list of available values, then ensure that they are added in for argparse to
+                # process properly. This can be done 1 of two ways:
+                #  1.) [Not recommended] Use argparse directly by passing in a fixed list within
+                #       `properties["choices"]`
+                #
+                #  2.) [Recommended] Add `choices` outside of `properties` where you can define where
+                #      the list of values appear within the Plugin's command config. This is
+                #      preferred, because it reflects how the command is actually configured after the plugin's
+                #      `setup()` method is run.
+                #
+                #      To make use of this properly, you need to have the help text contain: "{values}"
+                #      This will then ensure that the list of values are properly in there.
+                ##
+                if argument.get("choices"):
+                    # Add the dynamic choices:
+                    argument["properties"]["choices"] = plugin_obj.commands[kwargs["name"]][argument["choices"]]
+
+                    # Fix the help text:
+                    argument["properties"]["help"] = argument["properties"]["help"].format(
+                        values=", ".join(plugin_obj.commands[kwargs["name"]][argument["choices"]])
+                    )
+
+                parser.add_argument(argument["name"], **argument["properties"])
+
+    return parser
+
+
 def hubcommander_command(**kwargs):
+    """
+    Declares a command. The stages from the decorators below this one (like `@auth()`) are compiled, along with the
+    argument parser, into a pipeline the first time that the command is registered (or run).
+    :param kwargs:
+    :return:
+    """
     def command_decorator(func):
+        def compile_parser(plugin_obj, pipeline):
+            pipeline.parser = build_parser(plugin_obj, **kwargs)
+
+        spec = PipelineSpec(kwargs["name"], getattr(func, "stages", []), getattr(func, "command", func),
+                            compile_extra=compile_parser)
+
         def decorated_command(plugin_obj, data, user_data):
-            parser = argparse.ArgumentParser(prog=kwargs["name"],
-                                             description=kwargs["description"],
-                                             usage=kwargs["usage"])
-
-            # Dynamically add in the required and optional arguments:
-            arg_type = ["required", "optional"]
-            for at in arg_type:
-                if kwargs.get(at):
-                    for argument in kwargs[at]:
-                        # If there is a list of available values, then ensure that they are added in for argparse to
-                        # process properly. This can be done 1 of two ways:
-                        #  1.) [Not recommended] Use argparse directly by passing in a fixed list within
-                        #       `properties["choices"]`
-                        #
-                        #  2.) [Recommended] Add `choices` outside of `properties` where you can define where
-                        #      the list of values appear within the Plugin's command config. This is
-                        #      preferred, because it reflects how the command is actually configured after the plugin's
-                        #      `setup()` method is run.
-                        #
-                        #      To make use of this properly, you need to have the help text contain: "{values}"
-                        #      This will then ensure that the list of values are properly in there.
-                        ##
-                        if argument.get("choices"):
-                            # Add the dynamic choices:
-                            argument["properties"]["choices"] = plugin_obj.commands[kwargs["name"]][argument["choices"]]
-
-                            # Fix the help text:
-                            argument["properties"]["help"] = argument["properties"]["help"].format(
-                                values=", ".join(plugin_obj.commands[kwargs["name"]][argument["choices"]])
-                            )
-
-                        parser.add_argument(argument["name"], **argument["properties"])
-
-            # Remove all the macOS "Smart Quotes":
-            data["text"] = data["text"].replace(u'\u201C', "\"").replace(u'\u201D', "\"") \
-                .replace(u'\u2018', "\'").replace(u'\u2019', "\'")
-
-            # Remove the command from the command string:
-            split_args = shlex.split(data["text"])[1:]
-            try:
-                args = vars(parser.parse_args(split_args))
-
-            except SystemExit as _:
-                send_info(data["channel"], format_help_text(data, user_data, **kwargs), markdown=True,
-                          ephemeral_user=user_data["id"])
-                return
-
-            # Perform additional verification:
-            try:
-                args = perform_additional_verification(plugin_obj, args, **kwargs)
-            except ParseException as pe:
-                send_error(data["channel"], pe.format_proper_usage(user_data["name"]),
-                           markdown=True, ephemeral_user=user_data["id"])
-                return
-            except Exception as e:
-                send_error(data["channel"], "An exception was encountered while running validation for the input. "
-                                            "The exception details are: `{}`".format(str(e)),
-                           markdown=True)
-                return
-
-            # Run the next function:
-            data["command_name"] = kwargs["name"]
-            return func(plugin_obj, data, user_data, **args)
+            started = time.monotonic()
+            with tracing.span("parse"):
+                pipeline = spec.compile(plugin_obj)
 
-        return decorated_command
+                # Remove all the macOS "Smart Quotes":
+                data["text"] = replace_smart_quotes(data["text"])
 
-    return command_decorator
+                # Remove the command from the command string:
+                split_args = shlex.split(data["text"])[1:]
+                try:
+                    args = vars(pipeline.parser.parse_args(split_args))
 
+                except SystemExit as _:
+                    send_info(data["channel"], format_help_text(data, user_data, **kwargs), markdown=True,
+                              ephemeral_user=user_data["id"])
+                    return
 
-def auth(**kwargs):
-    def command_decorator(func):
-        def decorated_command(command_plugin, data, user_data, *args, **kwargs):
-            # Perform authentication:
-            if command_plugin.commands[data["command_name"]].get("auth"):
-                if not command_plugin.commands[data["command_name"]]["auth"]["plugin"].authenticate(
-                        data, user_data, *args, **command_plugin.commands[data["command_name"]]["auth"]["kwargs"]):
+                # Perform additional verification:
+                try:
+                    args = perform_additional_verification(plugin_obj, args, **kwargs)
+                except ParseException as pe:
+                    send_error(data["channel"], pe.format_proper_usage(user_data["name"]),
+                               markdown=True, ephemeral_user=user_data["id"])
                     return
+                except Exception as e:
+                    send_error(data["channel"], "An exception was encountered while running validation for the input. "
+                                                "The exception details are: `{}`".format(str(e)),
+                               markdown=True)
+                    return
+
+            metrics.observe_phase(metrics.PARSE, time.monotonic() - started, kwargs["name"])
 
-            # Run the next function:
-            return func(command_plugin, data, user_data, *args, **kwargs)
+            # Run the stages, and then the command:
+            data["command_name"] = kwargs["name"]
+            return pipeline(data, user_data, args)
 
+        decorated_command.pipeline = spec
         return decorated_command
 
     return command_decorator
+
+
+class AuthStage(Stage):
+    """
+    Runs the auth plugin that is configured for the command (if there is one).
+    """
+    def __init__(self):
+        super(AuthStage, self).__init__("auth", None)
+
+    def bind(self, plugin_obj, command_name):
+        auth_config = plugin_obj.commands[command_name].get("auth")
+        if not auth_config:
+            return None
+
+        plugin = auth_config["plugin"]
+        auth_kwargs = auth_config["kwargs"]
+        return lambda data, user_data, args: plugin.authenticate(data, user_data, **auth_kwargs)
+
+
+def auth(**kwargs):
+    return add_stage(AuthStage())
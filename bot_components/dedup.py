@@ -0,0 +1,136 @@
+"""
+.. module: hubcommander.bot_components.dedup
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from hubcommander.bot_components.parse_functions import replace_smart_quotes
+
+# The deduplicator for incoming commands (None means that duplicates are not detected):
+DEDUPLICATOR = None
+
+
+def normalize_command(text):
+    """
+    Normalizes the command text so that trivial differences (extra spaces, smart quotes, the casing of the
+    command itself) don't make two copies of the same command look different. The arguments keep their case,
+    since some of them are case-sensitive.
+    :param text:
+    :return:
+    """
+    parts = replace_smart_quotes(text).split()
+    if parts:
+        parts[0] = parts[0].lower()
+
+    return " ".join(parts)
+
+
+def command_key(data):
+    return data.get("user"), data["channel"], normalize_command(data["text"])
+
+
+class _InFlight:
+    def __init__(self, future, ts):
+        self.future = future
+        self.ts = ts
+        self.finished = None
+
+
+class CommandDeduplicator:
+    """
+    Keeps track of the commands that are running (and the ones that finished successfully in the last `window`
+    seconds). A copy of one of those commands is attached to the execution that is already there, rather than running
+    again.
+    """
+    def __init__(self, window=5, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def _purge(self):
+        now = self.clock()
+        for key in [key for key, entry in self.in_flight.items()
+                    if entry.finished is not None and now - entry.finished > self.window]:
+            del self.in_flight[key]
+
+    def _finished(self, key, entry):
+        with self.lock:
+            # Only successful runs are kept around, so that the user can try a failed command again right away:
+            if succeeded(entry.future):
+                entry.finished = self.clock()
+            elif self.in_flight.get(key) is entry:
+                del self.in_flight[key]
+
+    def submit(self, key, ts, func, *args, **kwargs):
+        """
+        Runs the function (which must return a future) unless the same command is already running.
+        :param key: From `command_key()`.
+        :param ts: The timestamp of the Slack message.
+        :param func:
+        :return: A tuple of the future for the execution, and the timestamp of the original message if this
+                 was a duplicate (or None if it was not).
+        """
+        with self.lock:
+            self._purge()
+
+            entry = self.in_flight.get(key)
+            if entry:
+                return entry.future, entry.ts
+
+            entry = self.in_flight[key] = _InFlight(Future(), ts)
+
+        entry.future.add_done_callback(lambda _: self._finished(key, entry))
+        entry.future.set_running_or_notify_cancel()
+
+        try:
+            _chain(func(*args, **kwargs), entry.future)
+        except Exception as e:
+            entry.future.set_exception(e)
+
+        return entry.future, None
+
+
+def succeeded(future):
+    """
+    :param future: A command's future.
+    :return: False if the command raised an exception, was cancelled, or returned False.
+    """
+    return not future.cancelled() and not future.exception() and future.result() is not False
+
+
+def _chain(source, destination):
+    def copy_result(_):
+        if source.cancelled():
+            destination.cancel()
+        elif source.exception():
+            destination.set_exception(source.exception())
+        else:
+            destination.set_result(source.result())
+
+    source.add_done_callback(copy_result)
+
+
+def configure(window=None):
+    global DEDUPLICATOR
+
+    DEDUPLICATOR = CommandDeduplicator(window) if window else None
+
+
+def submit(data, func, *args, **kwargs):
+    """
+    Runs the command (via `func`, which must return a future), unless it's a duplicate of one that is running.
+    :param data:
+    :param func:
+    :return: A tuple of the future, and the timestamp of the original message if this was a duplicate.
+    """
+    if not DEDUPLICATOR:
+        return func(*args, **kwargs), None
+
+    return DEDUPLICATOR.submit(command_key(data), data.get("ts"), func, *args, **kwargs)
@@ -0,0 +1,97 @@
+"""
+.. module: hubcommander.bot_components.event_loop
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import contextvars
+import threading
+from concurrent.futures import Future
+
+# The event loop that runs `async def` commands and auth plugins (it's started the first time that it's needed):
+LOOP = None
+LOOP_THREAD = None
+_LOOP_LOCK = threading.Lock()
+
+
+def start_loop():
+    global LOOP, LOOP_THREAD
+
+    with _LOOP_LOCK:
+        if not LOOP:
+            import asyncio   # Only imported once there is a coroutine to run.
+
+            LOOP = asyncio.new_event_loop()
+            LOOP_THREAD = threading.Thread(target=LOOP.run_forever, name="hubcommander-event-loop", daemon=True)
+            LOOP_THREAD.start()
+
+        return LOOP
+
+
+def stop_loop():
+    global LOOP, LOOP_THREAD
+
+    with _LOOP_LOCK:
+        if LOOP:
+            LOOP.call_soon_threadsafe(LOOP.stop)
+            LOOP_THREAD.join()
+            LOOP.close()
+            LOOP = None
+            LOOP_THREAD = None
+
+
+def run(coroutine):
+    """
+    Schedules the coroutine on the event loop.
+    :param coroutine:
+    :return: A (concurrent.futures) future for the result.
+    """
+    loop = start_loop()
+    future = Future()
+
+    def start():
+        import asyncio
+
+        # The task runs in the caller's context (so that it's tied to the command that is running):
+        task = asyncio.ensure_future(coroutine, loop=loop)
+        task.add_done_callback(lambda _: _copy_result(task, future))
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return future
+
+
+def _copy_result(task, future):
+    if future.cancelled():
+        return
+
+    if task.cancelled():
+        future.cancel()
+    elif task.exception():
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def resolve(result):
+    """
+    Waits for the result of a command (or an auth plugin) if it's a coroutine, by running it on the event loop.
+    Anything else (the result of a regular function) is returned as is.
+
+    This blocks the calling thread (a scheduler thread, or the RTM thread), so it must never be called from a
+    coroutine that's running on the event loop. Coroutines should `await` each other instead.
+    :param result:
+    :return:
+    """
+    if not hasattr(result, "__await__"):
+        return result
+
+    if threading.current_thread() is LOOP_THREAD:
+        raise RuntimeError("Coroutines on the event loop need to be awaited, not resolved.")
+
+    return run(_await(result)).result()
+
+
+async def _await(awaitable):
+    return await awaitable
@@ -0,0 +1,263 @@
+"""
+.. module: hubcommander.bot_components.http
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+
+from hubcommander.bot_components import circuit_breaker, metrics, retry, tracing
+
+# Timeouts that are worked out from how long each kind of call has taken recently (see `configure()`). None means
+# that the timeouts that the plugins pass in are always used:
+ADAPTIVE_TIMEOUTS = None
+
+# The methods that the adaptive timeouts apply to (the others always use the timeouts that the plugins pass in):
+ADAPTIVE_METHODS = frozenset(["GET", "HEAD"])
+
+# Whether slow GETs get a second copy sent (see `configure()`):
+HEDGED_GETS = False
+
+# How many of the latest latencies are kept for each kind of call:
+LATENCY_SAMPLES = 200
+
+# The latencies for each kind of call, by (upstream, endpoint):
+LATENCIES = {}
+_LATENCIES_LOCK = threading.Lock()
+
+# The number of threads for sending hedged GETs:
+HEDGE_THREADS = 8
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+class UpstreamUnavailable(requests.exceptions.ConnectionError):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open. It's a `RequestException`, so the plugins
+    handle it like any other problem with the upstream.
+    """
+    pass
+
+
+def configure(adaptive_timeouts=None, hedged_gets=False):
+    """
+    :param adaptive_timeouts: A dict with the "multiplier" for the 99th percentile latency, the "min_seconds" for a
+                              timeout, and the "min_samples" needed before the timeout is worked out. None to disable.
+    :param hedged_gets: If a GET is slower than the 95th percentile for its kind, then a second copy is sent, and
+                        whichever answers first is used. This needs `adaptive_timeouts` for the "min_samples".
+    :return:
+    """
+    global ADAPTIVE_TIMEOUTS, HEDGED_GETS
+
+    ADAPTIVE_TIMEOUTS = adaptive_timeouts
+    HEDGED_GETS = hedged_gets
+
+
+def _executor():
+    global _EXECUTOR
+
+    with _EXECUTOR_LOCK:
+        if not _EXECUTOR:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="hubcommander-hedge")
+
+        return _EXECUTOR
+
+
+def endpoint_class(method, url, resources):
+    """
+    Works out the kind of call from the URL, by replacing everything in its path that isn't a resource name with a
+    "*". For example, "GET https://api.github.com/repos/Netflix/hubcommander/pulls?state=open" is "GET repos/*/*/pulls".
+    :param method:
+    :param url:
+    :param resources: The names in the upstream's URLs that aren't IDs (like "repos" or "pulls").
+    :return:
+    """
+    path = urlsplit(url).path.strip("/").split("/")
+    return "{} {}".format(method.upper(), "/".join(part if part in resources else "*" for part in path))
+
+
+class LatencyTracker:
+    """
+    Keeps the latest `samples` latencies for a kind of call.
+    """
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.latencies = deque(maxlen=samples)
+        self.lock = threading.Lock()
+        self.counts = {"calls": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0}
+
+    def add(self, seconds, timed_out=False):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.counts["calls"] += 1
+            if timed_out:
+                self.counts["timeouts"] += 1
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def __len__(self):
+        return len(self.latencies)
+
+    def percentile(self, percent):
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        if not latencies:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    def timeout(self, default, multiplier=3, min_seconds=1, min_samples=20):
+        """
+        :param default: The timeout that the plugin asked for. This is never exceeded.
+        :return: `multiplier` times the 99th percentile latency (or the default until there are `min_samples`).
+        """
+        if len(self) < min_samples:
+            return default
+
+        return min(default, max(min_seconds, self.percentile(99) * multiplier))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+
+        stats.update({"p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99)})
+        return stats
+
+
+def get_tracker(upstream, endpoint):
+    tracker = LATENCIES.get((upstream, endpoint))
+    if not tracker:
+        with _LATENCIES_LOCK:
+            tracker = LATENCIES.setdefault((upstream, endpoint), LatencyTracker())
+
+    return tracker
+
+
+def latency_stats():
+    """
+    :return: A dict of (upstream, endpoint) to the latency percentiles and counts for that kind of call.
+    """
+    return {key: tracker.stats() for key, tracker in list(LATENCIES.items())}
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamSession(requests.Session):
+    """
+    A `requests.Session` for calling an upstream (like GitHub). Connections are reused, and the calls go through the
+    upstream's circuit breaker. Connection errors, timeouts, and 5xx responses count as failures. Calls that are safe
+    to repeat are retried on connection errors, timeouts, and 502s, 503s, and 504s (see `retry.py`).
+
+    The latencies are tracked for each kind of call (see `endpoint_class()`), so that the timeouts can be based on
+    them, and slow GETs can be hedged (see `configure()`).
+    """
+    def __init__(self, upstream, resources=()):
+        super().__init__()
+        self.upstream = upstream
+        self.resources = frozenset(resources)
+
+    def request(self, method, url, *args, **kwargs):
+        tracker = get_tracker(self.upstream, endpoint_class(method, url, self.resources))
+
+        attempt = 0
+        while True:
+            retry.record_call()
+            try:
+                response = circuit_breaker.call(self.upstream,
+                                                lambda: self._request(tracker, method, url, *args, **kwargs),
+                                                is_failure=lambda response: response.status_code >= 500)
+
+            except circuit_breaker.CircuitOpenError as e:
+                raise UpstreamUnavailable(str(e)) from e
+
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not retry.should_retry(method, attempt):
+                    raise
+
+                retry_after = None
+
+            else:
+                if response.status_code not in retry.RETRY_STATUSES or not retry.should_retry(method, attempt):
+                    return response
+
+                retry_after = _retry_after(response)
+                response.close()
+
+            retry.wait_before_retry(attempt, retry_after)
+            attempt += 1
+
+    def _request(self, tracker, method, url, *args, **kwargs):
+        # Only reads get the shorter timeouts. Cutting off a change (like a POST) doesn't mean that it didn't happen:
+        settings = ADAPTIVE_TIMEOUTS
+        if settings and kwargs.get("timeout") and method.upper() in ADAPTIVE_METHODS:
+            kwargs["timeout"] = tracker.timeout(kwargs["timeout"], **settings)
+
+        # Only GETs are safe to send twice:
+        if not (HEDGED_GETS and settings and method.upper() == "GET"
+                and len(tracker) >= settings.get("min_samples", 20)):
+            return self._timed(tracker, method, url, *args, **kwargs)
+
+        # The copies are sent in the caller's context, so that they show up in its trace:
+        first = _executor().submit(contextvars.copy_context().run, self._timed, tracker, method, url, *args, **kwargs)
+        done, _ = wait([first], timeout=tracker.percentile(95))
+        if done:
+            return first.result()
+
+        tracker.count("hedged")
+        second = _executor().submit(contextvars.copy_context().run, self._timed, tracker, method, url, *args,
+                                    **kwargs)
+
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if not future.exception():
+                    if future is second:
+                        tracker.count("hedge_wins")
+
+                    return future.result()
+
+        # Both failed:
+        return first.result()
+
+    def _timed(self, tracker, method, url, *args, **kwargs):
+        host = urlsplit(url).hostname
+        with tracing.span("HTTP {}".format(method.upper()), upstream=self.upstream, **{
+                "http.method": method.upper(), "http.host": host,
+                "http.endpoint": endpoint_class(method, url, self.resources)}) as span:
+            started = time.monotonic()
+            try:
+                response = requests.Session.request(self, method, url, *args, **kwargs)
+
+            except requests.exceptions.Timeout:
+                tracker.add(time.monotonic() - started, timed_out=True)
+                metrics.observe_upstream(self.upstream, host, "timeout", time.monotonic() - started)
+                raise
+
+            except requests.exceptions.RequestException:
+                metrics.observe_upstream(self.upstream, host, "error", time.monotonic() - started)
+                raise
+
+            tracker.add(time.monotonic() - started)
+            metrics.observe_upstream(self.upstream, host, str(response.status_code), time.monotonic() - started)
+            if span:
+                span.set_attribute("http.status_code", response.status_code)
+
+            return response
@@ -0,0 +1,253 @@
+"""
+.. module: hubcommander.bot_components.ingestion
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from slackclient import SlackClient
+
+RTM = "rtm"
+EVENTS_API = "events"
+SOCKET_MODE = "socket"
+
+# The events that can contain commands:
+COMMAND_EVENTS = {"message", "app_mention"}
+
+# Requests that are older than this (in seconds) are rejected, so that they can't be replayed:
+MAX_REQUEST_AGE = 60 * 5
+
+# How long to wait before reconnecting to Socket Mode after the connection drops:
+RECONNECT_DELAY = 5
+
+MENTION = re.compile(r"^<@[A-Z0-9]+>\s*")
+
+# The running listener for the Events API or Socket Mode (None means that messages come in over RTM). With RTM,
+# Slack sends over every message in every channel that HubCommander is in. With the others, Slack only sends the
+# events that the Slack app is subscribed to (like `app_mention`):
+LISTENER = None
+
+
+def event_to_message(event):
+    """
+    Turns a Slack event into the same `data` dict that comes in over RTM. The mention of the bot is taken off of
+    `app_mention` events, so that "@hubcommander !ListPRs ..." becomes "!ListPRs ...".
+    :param event:
+    :return: The message, or None if the event can't contain a command.
+    """
+    if event.get("type") not in COMMAND_EVENTS or event.get("subtype") or event.get("bot_id"):
+        return None
+
+    if not event.get("channel") or not event.get("text"):
+        return None
+
+    message = dict(event, type="message")
+    if event["type"] == "app_mention":
+        message["text"] = MENTION.sub("", event["text"])
+
+    return message
+
+
+def verify_signature(signing_secret, timestamp, body, signature, now=None):
+    """
+    Checks that a request came from Slack. See: https://api.slack.com/authentication/verifying-requests-from-slack
+    :param signing_secret:
+    :param timestamp: The X-Slack-Request-Timestamp header.
+    :param body: The raw body of the request (bytes).
+    :param signature: The X-Slack-Signature header.
+    :param now:
+    :return:
+    """
+    try:
+        if abs((now or time.time()) - int(timestamp)) > MAX_REQUEST_AGE:
+            return False
+    except (TypeError, ValueError):
+        return False
+
+    base = b"v0:" + timestamp.encode("utf-8") + b":" + body
+    expected = "v0=" + hmac.new(signing_secret.encode("utf-8"), base, hashlib.sha256).hexdigest()
+
+    return hmac.compare_digest(expected, signature or "")
+
+
+class _EventsHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not verify_signature(self.server.signing_secret, self.headers.get("X-Slack-Request-Timestamp"), body,
+                                self.headers.get("X-Slack-Signature")):
+            self._respond(401)
+            return
+
+        try:
+            payload = json.loads(body.decode("utf-8"))
+        except ValueError:
+            self._respond(400)
+            return
+
+        if payload.get("type") == "url_verification":
+            self._respond(200, json.dumps({"challenge": payload.get("challenge")}))
+            return
+
+        # Slack wants a response within 3 seconds, so respond before handling the event:
+        self._respond(200)
+
+        if payload.get("type") == "event_callback":
+            message = event_to_message(payload.get("event", {}))
+            if message:
+                self.server.handler(message)
+
+    def _respond(self, status, body=""):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EventsAPIServer:
+    """
+    Receives events from the Slack Events API over HTTP. The Slack app's "Request URL" must point to this server.
+    """
+    def __init__(self, signing_secret, handler, host="0.0.0.0", port=3000):
+        self.server = ThreadingHTTPServer((host, port), _EventsHandler)
+        self.server.daemon_threads = True
+        self.server.signing_secret = signing_secret
+        self.server.handler = handler
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="hubcommander-events-api",
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SocketModeClient:
+    """
+    Receives events from Slack over a Socket Mode connection. This needs an app-level token (xapp-...) with the
+    `connections:write` scope.
+    """
+    def __init__(self, app_token, handler, connect=None):
+        self.slack_client = SlackClient(app_token)
+        self.handler = handler
+        self.connect = connect or _create_connection
+        self.running = False
+        self.connection = None
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="hubcommander-socket-mode", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.connection:
+            self.connection.close()
+
+    def _open(self):
+        result = self.slack_client.api_call("apps.connections.open")
+        if not result.get("ok"):
+            raise SocketModeException("Unable to open a Socket Mode connection: {}".format(result.get("error")))
+
+        return self.connect(result["url"])
+
+    def _run(self):
+        while self.running:
+            try:
+                self.connection = self._open()
+                self.listen(self.connection)
+            except Exception as e:
+                if self.running:
+                    print("[X] The Socket Mode connection failed: {}. Reconnecting...".format(e))
+                    time.sleep(RECONNECT_DELAY)
+
+    def listen(self, connection):
+        """
+        Handles the envelopes that come in over the connection, until Slack asks to reconnect (or it is closed).
+        :param connection:
+        :return:
+        """
+        while self.running:
+            raw = connection.recv()
+            if not raw:
+                return
+
+            envelope = json.loads(raw)
+            if envelope.get("type") == "disconnect":
+                return
+
+            # Every envelope needs to be acknowledged, or Slack sends it again:
+            if envelope.get("envelope_id"):
+                connection.send(json.dumps({"envelope_id": envelope["envelope_id"]}))
+
+            if envelope.get("type") == "events_api":
+                message = event_to_message(envelope.get("payload", {}).get("event", {}))
+                if message:
+                    # Like the Events API server, each message is handled on its own thread, so that a slow command
+                    # (like one waiting on a Duo push) doesn't hold up acknowledging the envelopes behind it:
+                    threading.Thread(target=self.handler, args=(message,), name="hubcommander-socket-mode-message",
+                                     daemon=True).start()
+
+
+class SocketModeException(Exception):
+    pass
+
+
+def _create_connection(url):
+    import websocket   # Installed along with slackclient.
+    return websocket.create_connection(url)
+
+
+def start_listener(ingestion, secrets, handler, port=3000):
+    """
+    Starts receiving commands over the Events API or Socket Mode.
+    :param ingestion: One of "rtm", "events", or "socket".
+    :param secrets:
+    :param handler: Called with each message.
+    :param port: For the Events API.
+    :return:
+    """
+    global LISTENER
+
+    if ingestion == EVENTS_API:
+        LISTENER = EventsAPIServer(secrets["SLACK_SIGNING_SECRET"], handler, port=port)
+
+    elif ingestion == SOCKET_MODE:
+        LISTENER = SocketModeClient(secrets["SLACK_APP_TOKEN"], handler)
+
+    elif ingestion != RTM:
+        raise ValueError("Unknown ingestion: {}".format(ingestion))
+
+    if LISTENER:
+        LISTENER.start()
+
+    return LISTENER
+
+
+def stop_listener():
+    global LISTENER
+
+    if LISTENER:
+        LISTENER.stop()
+        LISTENER = None
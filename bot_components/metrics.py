@@ -0,0 +1,310 @@
+"""
+.. module: hubcommander.bot_components.metrics
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hubcommander.bot_components import cache, circuit_breaker, retry
+
+# The latency histograms' buckets (in seconds):
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+# The phases that a command's time is split into:
+PARSE = "parse"
+AUTH = "auth"
+PRECONDITION = "precondition"
+EXECUTION = "execution"
+SLACK_SEND = "slack_send"
+
+# All the counters and histograms, in the order that they are served:
+REGISTRY = []
+
+# Functions that are called for each scrape (along with `component_stats()`), which return a list of
+# (name, type, help, [(labels, value), ...]) for the stats that are kept elsewhere:
+COLLECTORS = []
+
+# The running /metrics server (None if it isn't running):
+SERVER = None
+
+# The name of the command that is running (None outside of commands):
+_COMMAND = contextvars.ContextVar("metrics_command", default=None)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+
+    return "{" + ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+                                                         .replace("\n", "\\n"))
+                          for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        lines = ["# HELP {} {}".format(self.name, self.help_text), "# TYPE {} counter".format(self.name)]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append("{}{} {}".format(self.name, _format_labels(self.labels, label_values),
+                                              _format_value(value)))
+
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, seconds, *label_values):
+        with self.lock:
+            counts = self.values.get(label_values)
+            if not counts:
+                counts = self.values[label_values] = [[0] * len(self.buckets), 0, 0]
+
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[0][index] += 1
+                    break
+
+            counts[1] += seconds
+            counts[2] += 1
+
+    def count(self, *label_values):
+        counts = self.values.get(label_values)
+        return counts[2] if counts else 0
+
+    def render(self):
+        lines = ["# HELP {} {}".format(self.name, self.help_text), "# TYPE {} histogram".format(self.name)]
+        with self.lock:
+            for label_values, (buckets, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, buckets):
+                    cumulative += bucket
+                    lines.append("{}_bucket{} {}".format(
+                        self.name, _format_labels(self.labels + ("le",), label_values + (_format_value(bound),)),
+                        cumulative))
+
+                labels = _format_labels(self.labels, label_values)
+                lines.append("{}_sum{} {}".format(self.name, labels, _format_value(total)))
+                lines.append("{}_count{} {}".format(self.name, labels, count))
+
+        return lines
+
+
+COMMANDS = Counter("hubcommander_commands_total",
+                   "Commands run, by outcome (ok, or error if it raised, returned False, or sent an error).",
+                   ["command", "outcome"])
+COMMAND_SECONDS = Histogram("hubcommander_command_seconds", "How long commands took to run.", ["command"])
+PHASE_SECONDS = Histogram("hubcommander_command_phase_seconds",
+                          "How long each phase of a command took (parse, auth, precondition, execution, and "
+                          "slack_send).", ["command", "phase"])
+UPSTREAM_SECONDS = Histogram("hubcommander_upstream_request_seconds",
+                             "How long the calls to other services took, by host and status code (or error).",
+                             ["upstream", "host", "status"])
+
+
+def add_collector(collector):
+    COLLECTORS.append(collector)
+
+
+def component_stats():
+    """
+    A collector for the stats that the caches, circuit breakers, and retries keep.
+    """
+    caches = cache.cache_stats()
+    breakers = circuit_breaker.breaker_states()
+    retries = retry.retry_stats()
+
+    return [
+        ("hubcommander_cache_requests_total", "counter", "Cache lookups, by result.",
+         [({"cache": name, "result": result}, stats[result]) for name, stats in sorted(caches.items())
+          for result in ["hits", "stale_hits", "misses"]]),
+        ("hubcommander_cache_entries", "gauge", "The number of entries in each cache.",
+         [({"cache": name}, stats["entries"]) for name, stats in sorted(caches.items())]),
+        ("hubcommander_circuit_breaker_open", "gauge", "1 if the upstream's circuit breaker is open (or half open).",
+         [({"upstream": name}, int(stats["state"] != circuit_breaker.CLOSED))
+          for name, stats in sorted(breakers.items())]),
+        ("hubcommander_circuit_breaker_rejected_total", "counter",
+         "Calls that weren't made since the breaker was open.",
+         [({"upstream": name}, stats["rejected"]) for name, stats in sorted(breakers.items())]),
+        ("hubcommander_retries_total", "counter",
+         "Upstream calls that were retried, or weren't since a budget ran out.",
+         [({"result": name}, value) for name, value in sorted(retries.items())]),
+    ]
+
+
+class TrackedCommand:
+    """
+    What `track_command()` gives the command's caller. A command that fails without raising an exception (like if
+    it returned False, or sent an error) needs `failed` set, to be counted as an "error".
+    """
+    def __init__(self, name):
+        self.name = name
+        self.failed = False
+
+
+@contextmanager
+def track_command(name):
+    """
+    Counts and times the command that runs within this, and ties the phases that are recorded within it to it.
+    :return: The `TrackedCommand`.
+    """
+    token = _COMMAND.set(name)
+    started = time.monotonic()
+    tracked = TrackedCommand(name)
+    outcome = "error"
+    try:
+        yield tracked
+        if not tracked.failed:
+            outcome = "ok"
+    finally:
+        COMMAND_SECONDS.observe(time.monotonic() - started, name)
+        COMMANDS.inc(name, outcome)
+        _COMMAND.reset(token)
+
+
+def current_command():
+    return _COMMAND.get()
+
+
+def observe_phase(phase, seconds, command=None):
+    """
+    :param phase: One of the phases above.
+    :param seconds:
+    :param command: The command's name (the running command, if not given). Nothing is recorded outside of commands.
+    :return:
+    """
+    command = _COMMAND.get() or command
+    if command:
+        PHASE_SECONDS.observe(seconds, command, phase)
+
+
+def observe_stage(command, stage, seconds, passed):
+    """
+    A timing hook for the pipeline (see `pipeline.add_timing_hook()`).
+    """
+    if stage == "command":
+        phase = EXECUTION
+    elif stage == "auth":
+        phase = AUTH
+    else:
+        phase = PRECONDITION
+
+    observe_phase(phase, seconds, command)
+
+
+def observe_upstream(upstream, host, status, seconds):
+    UPSTREAM_SECONDS.observe(seconds, upstream, host, status)
+
+
+def render():
+    """
+    :return: All the metrics, in the Prometheus text format.
+    """
+    lines = []
+    for metric in list(REGISTRY):
+        lines += metric.render()
+
+    for collector in [component_stats] + COLLECTORS:
+        for name, metric_type, help_text, samples in collector():
+            lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} {}".format(name, metric_type)]
+            for labels, value in samples:
+                lines.append("{}{} {}".format(name, _format_labels(list(labels.keys()), list(labels.values())),
+                                              _format_value(value)))
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """
+    Serves the metrics on /metrics, for Prometheus to scrape.
+    """
+    def __init__(self, host="127.0.0.1", port=9100):
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="hubcommander-metrics", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_server(host="127.0.0.1", port=9100):
+    global SERVER
+
+    if not SERVER:
+        SERVER = MetricsServer(host, port)
+        SERVER.start()
+
+    return SERVER
+
+
+def stop_server():
+    global SERVER
+
+    if SERVER:
+        SERVER.stop()
+        SERVER = None
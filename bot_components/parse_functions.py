@@ -12,6 +12,9 @@ import warnings
 TOGGLE_ON_VALUES = ["on", "true", "enable", "enabled"]
 TOGGLE_OFF_VALUES = ["off", "false", "disable", "disabled"]
 
+# The characters that are removed from arguments (Slack wraps links and mentions in <>). "&" is for &lt; and &gt;:
+CLEANUP_CHARS = frozenset("<>{}[]&")
+
 
 class ParseException(Exception):
     """
@@ -30,6 +33,34 @@ class ParseException(Exception):
         return usage_text.format(user=user, arg_type=self.arg_type, proper_values=self.proper_values)
 
 
+def replace_smart_quotes(text):
+    """
+    Replaces the macOS "Smart Quotes" with plain ones.
+    :param text:
+    :return:
+    """
+    # Most messages are plain ASCII, so they have no smart quotes to replace:
+    if text.isascii():
+        return text
+
+    return text.replace(u'\u201C', "\"").replace(u'\u201D', "\"") \
+        .replace(u'\u2018', "\'").replace(u'\u2019', "\'")
+
+
+def cleanup_argument(text):
+    """
+    Removes <>, {}, [], &lt;, and &gt; from an argument.
+    :param text:
+    :return:
+    """
+    # Most arguments (like org and repo names) have nothing to remove:
+    if CLEANUP_CHARS.isdisjoint(text):
+        return text
+
+    return text.replace("<", "").replace(">", "").replace("{", "").replace("}", "") \
+        .replace("[", "").replace("]", "").replace("&lt;", "").replace("&gt;", "")
+
+
 def preformat_args(text):
     """
     THIS METHOD IS DEPRECATED! USE THE DECORATORS FOR PARSING!!
@@ -0,0 +1,218 @@
+"""
+.. module: hubcommander.bot_components.pipeline
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import contextvars
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from hubcommander.bot_components import tracing
+from hubcommander.bot_components.event_loop import resolve
+from hubcommander.bot_components.slack_comm import watch_for_errors
+
+# Called with (command name, stage name, seconds, passed) after each stage (and the command itself) runs:
+TIMING_HOOKS = []
+
+# The number of threads for running concurrent stages:
+STAGE_THREADS = 8
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def add_timing_hook(hook):
+    TIMING_HOOKS.append(hook)
+
+
+def remove_timing_hook(hook):
+    TIMING_HOOKS.remove(hook)
+
+
+def _executor():
+    global _EXECUTOR
+
+    with _EXECUTOR_LOCK:
+        if not _EXECUTOR:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=STAGE_THREADS, thread_name_prefix="hubcommander-stage")
+
+        return _EXECUTOR
+
+
+class Stage:
+    """
+    A check that runs before a command, like authentication, or making sure that a repo exists.
+
+    The check is called with (plugin_obj, data, user_data, args), and returns True if the command should carry on.
+    If it doesn't, then it's up to the check to tell the user why. The check can be an `async def`.
+
+    Stages that are marked as `concurrent` don't depend on each other, so neighboring concurrent stages run at the
+    same time (and the command only runs if all of them pass).
+    """
+    def __init__(self, name, check, concurrent=False):
+        self.name = name
+        self.check = check
+        self.concurrent = concurrent
+
+    def bind(self, plugin_obj, command_name):
+        """
+        Looks up anything that the check needs from the plugin ahead of time.
+        :param plugin_obj:
+        :param command_name:
+        :return: A function of (data, user_data, args), or None if the stage doesn't apply to this command.
+        """
+        check = self.check
+        return lambda data, user_data, args: check(plugin_obj, data, user_data, args)
+
+
+def add_stage(stage):
+    """
+    Makes a decorator that adds the stage to a command. Stages run in the same order as the decorators are listed.
+
+    The stages are collected by `@hubcommander_command`, which compiles them into a `CompiledPipeline`. A function
+    that only has stages (and no `@hubcommander_command`) still works, and runs them one at a time.
+    :param stage:
+    :return:
+    """
+    def command_decorator(func):
+        command = getattr(func, "command", func)
+        stages = [stage] + getattr(func, "stages", [])
+
+        def decorated_command(plugin_obj, data, user_data, *args, **kwargs):
+            for each in stages:
+                bound = each.bind(plugin_obj, data.get("command_name"))
+                if bound and not resolve(bound(data, user_data, kwargs)):
+                    return
+
+            return resolve(command(plugin_obj, data, user_data, *args, **kwargs))
+
+        decorated_command.command = command
+        decorated_command.stages = stages
+        return decorated_command
+
+    return command_decorator
+
+
+class CompiledPipeline:
+    """
+    The stages for a command, bound to the plugin, and grouped so that neighboring concurrent stages run together.
+    """
+    def __init__(self, plugin_obj, name, stages, command):
+        self.plugin_obj = plugin_obj
+        self.name = name
+        self.command = command
+        self.groups = []
+
+        for stage in stages:
+            bound = stage.bind(plugin_obj, name)
+            if not bound:
+                continue
+
+            if stage.concurrent and self.groups and self.groups[-1][0][2]:
+                self.groups[-1].append((stage.name, bound, True))
+            else:
+                self.groups.append([(stage.name, bound, stage.concurrent)])
+
+    def _timed(self, stage_name, func, *args):
+        started = time.monotonic()
+        passed = False
+        try:
+            with tracing.span(stage_name, stage=stage_name) as span:
+                result = resolve(func(*args))
+                passed = bool(result)
+                if span:
+                    span.set_attribute("passed", passed)
+
+                return result
+        finally:
+            for hook in TIMING_HOOKS:
+                hook(self.name, stage_name, time.monotonic() - started, passed)
+
+    def run_stages(self, data, user_data, args):
+        """
+        :return: True if all the stages passed.
+        """
+        for group in self.groups:
+            if len(group) == 1:
+                stage_name, bound, _ = group[0]
+                if not self._timed(stage_name, bound, data, user_data, args):
+                    return False
+
+            else:
+                # The stages run in the command's context (for things like its retry budget and trace):
+                futures = [_executor().submit(contextvars.copy_context().run, self._timed, stage_name, bound, data,
+                                              user_data, args)
+                           for stage_name, bound, _ in group]
+                if not all([future.result() for future in futures]):
+                    return False
+
+        return True
+
+    def __call__(self, data, user_data, args):
+        """
+        :return: What the command returned, or False if one of the stages didn't pass.
+        """
+        if not self.run_stages(data, user_data, args):
+            return False
+
+        started = time.monotonic()
+        passed = False
+        try:
+            with watch_for_errors() as errors, tracing.span("execute", command=self.name) as span:
+                result = resolve(self.command(self.plugin_obj, data, user_data, **args))
+
+                # Like the stages, the command didn't pass if it returned False (or sent an error):
+                passed = result is not False and not errors
+                if span:
+                    span.set_attribute("passed", passed)
+
+                return result
+        finally:
+            for hook in TIMING_HOOKS:
+                hook(self.name, "command", time.monotonic() - started, passed)
+
+
+class PipelineSpec:
+    """
+    The declaration of a command's pipeline. It's compiled once for each plugin object (see `compile()`).
+    """
+    def __init__(self, name, stages, command, compile_extra=None):
+        self.name = name
+        self.stages = stages
+        self.command = command
+        self.compile_extra = compile_extra
+        self.compiled = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def compile(self, plugin_obj):
+        with self.lock:
+            pipeline = self.compiled.get(plugin_obj)
+            if not pipeline:
+                pipeline = CompiledPipeline(plugin_obj, self.name, self.stages, self.command)
+                if self.compile_extra:
+                    self.compile_extra(plugin_obj, pipeline)
+
+                self.compiled[plugin_obj] = pipeline
+
+            return pipeline
+
+
+def compile_plugin_commands(plugin_obj):
+    """
+    Compiles the pipelines for all of a plugin's commands. This is done when the commands are registered, so that
+    the first run of each command doesn't have to.
+    :param plugin_obj:
+    :return:
+    """
+    for command in plugin_obj.commands.values():
+        if not command.get("enabled", True):
+            continue
+
+        spec = getattr(command.get("func"), "pipeline", None)
+        if spec:
+            spec.compile(plugin_obj)
@@ -0,0 +1,146 @@
+"""
+.. module: hubcommander.bot_components.plugin_setup
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# The number of plugins that can run their setup() at the same time:
+SETUP_THREADS = 8
+
+
+class PluginDependencyError(Exception):
+    pass
+
+
+def setup_plugins(plugins, secrets, threads=SETUP_THREADS, clock=time.monotonic):
+    """
+    Runs the `setup()` of all the plugins, running as many at the same time as possible. A plugin's setup only
+    starts once the setup of every plugin in its `depends_on` is done. Dependencies on plugins that aren't enabled
+    are ignored (the plugin's setup can check for that itself).
+
+    If a setup fails, then no more are started, and the exception is raised once the running ones are done.
+    :param plugins: A dict of the plugin name to the plugin.
+    :param secrets:
+    :param threads:
+    :param clock:
+    :return: A dict of the plugin name to a tuple of (when it started, how long it took), in seconds.
+    """
+    dependencies = {name: [dependency for dependency in getattr(plugin, "depends_on", []) if dependency in plugins]
+                    for name, plugin in plugins.items()}
+    _check_for_cycles(dependencies)
+
+    started = clock()
+    timings = {}
+    waiting = dict(dependencies)
+    running = {}
+    error = None
+
+    def run_setup(name):
+        began = clock()
+        plugins[name].setup(secrets)
+        timings[name] = (began - started, clock() - began)
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hubcommander-setup") as executor:
+        while waiting or running:
+            if not error:
+                for name in [name for name, needs in waiting.items() if all(need in timings for need in needs)]:
+                    del waiting[name]
+                    running[executor.submit(run_setup, name)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                if future.exception() and not error:
+                    error = future.exception()
+
+    if error:
+        raise error
+
+    return timings
+
+
+def _check_for_cycles(dependencies):
+    resolved = set()
+    remaining = dict(dependencies)
+
+    while remaining:
+        ready = [name for name, needs in remaining.items() if all(need in resolved for need in needs)]
+        if not ready:
+            raise PluginDependencyError("The plugins depend on each other in a cycle: {}".format(
+                ", ".join(sorted(remaining))))
+
+        for name in ready:
+            resolved.add(name)
+            del remaining[name]
+
+
+def format_timings(plugins, timings):
+    """
+    Formats the setup timings as a table, in the order that the plugins started.
+    :param plugins:
+    :param timings:
+    :return:
+    """
+    lines = ["\t{:<20}{:>10}{:>10}  {}".format("Plugin", "Start (s)", "Took (s)", "Depends on")]
+    for name, (start, took) in sorted(timings.items(), key=lambda timing: timing[1][0]):
+        lines.append("\t{:<20}{:>10.3f}{:>10.3f}  {}".format(name, start, took,
+                                                             ", ".join(getattr(plugins[name], "depends_on", []))))
+
+    return "\n".join(lines)
+
+
+def warm_up_plugins(plugins, tasks=None, threads=SETUP_THREADS, clock=time.monotonic):
+    """
+    Runs the `warm_up()` of all the plugins (and any other tasks) at the same time. A warm-up that fails is printed,
+    and doesn't stop the others; the caches that it would have filled are just filled by the first command instead.
+    :param plugins: A dict of the plugin name to the plugin.
+    :param tasks: A dict of a name to a function, for warming up things that aren't plugins.
+    :param threads:
+    :param clock:
+    :return: A dict of the name to how long its warm-up took (or the exception that it raised).
+    """
+    work = {name: plugin.warm_up for name, plugin in plugins.items()}
+    work.update(tasks or {})
+    results = {}
+
+    def run_warm_up(name):
+        began = clock()
+        try:
+            work[name]()
+            results[name] = clock() - began
+        except Exception as e:
+            results[name] = e
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hubcommander-warm-up") as executor:
+        for name in work:
+            executor.submit(run_warm_up, name)
+
+    return results
+
+
+def start_warm_up(plugins, tasks=None):
+    """
+    Warms up the plugins on a background thread, so that it doesn't hold up connecting to Slack.
+    :param plugins:
+    :param tasks:
+    :return: The thread.
+    """
+    def run():
+        for name, result in sorted(warm_up_plugins(plugins, tasks).items()):
+            if isinstance(result, Exception):
+                print("[!] Warm-up for \"{}\" failed: {}".format(name, result))
+            else:
+                print("[+] Warmed up \"{}\" in {:.3f}s".format(name, result))
+
+    thread = threading.Thread(target=run, name="hubcommander-warm-up", daemon=True)
+    thread.start()
+    return thread
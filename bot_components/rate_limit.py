@@ -0,0 +1,133 @@
+"""
+.. module: hubcommander.bot_components.rate_limit
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# The limiters for Slack users and channels (None means no limit):
+USER_LIMITER = None
+CHANNEL_LIMITER = None
+
+# Held while a message is checked against the limiters and the tokens are taken, so that two messages can't both
+# pass the checks and then overdraw a bucket:
+_ADMIT_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """
+    A bucket that holds up to `capacity` tokens, and is refilled at `rate` tokens per second.
+    """
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens=1):
+        """
+        How long (in seconds) until the bucket has enough tokens. 0 means that there are enough right now.
+        :param tokens:
+        :return:
+        """
+        self._refill()
+        if self.tokens >= tokens:
+            return 0
+
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens=1):
+        """
+        Takes the tokens out of the bucket if there are enough of them.
+        :param tokens:
+        :return: True if the tokens were taken.
+        """
+        if self.wait_time(tokens):
+            return False
+
+        self.tokens -= tokens
+        return True
+
+
+class RateLimiter:
+    """
+    A token bucket for each key (like a Slack user or channel ID). Only the most recently used `max_keys` buckets
+    are kept around. A bucket that is evicted was idle, so it would have been refilled anyway.
+    """
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _bucket(self, key):
+        bucket = self.buckets.get(key)
+        if not bucket:
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst, clock=self.clock)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+
+        return bucket
+
+    def wait_time(self, key):
+        with self.lock:
+            return self._bucket(key).wait_time()
+
+    def consume(self, key):
+        with self.lock:
+            return self._bucket(key).consume()
+
+
+def configure(user_limit=None, channel_limit=None):
+    """
+    Sets up the limiters. The limits are dicts with the "rate" (commands per second) and the "burst"
+    (the number of commands that can be sent at once).
+    :param user_limit:
+    :param channel_limit:
+    :return:
+    """
+    global USER_LIMITER, CHANNEL_LIMITER
+
+    USER_LIMITER = RateLimiter(user_limit["rate"], user_limit["burst"]) if user_limit else None
+    CHANNEL_LIMITER = RateLimiter(channel_limit["rate"], channel_limit["burst"]) if channel_limit else None
+
+
+def admit(data):
+    """
+    Checks if the user and channel that sent the message are within their limits. If they are, then a token is
+    taken from each of them.
+    :param data:
+    :return: 0 if the command can run, otherwise the number of seconds to wait before trying again.
+    """
+    limits = []
+    if USER_LIMITER and data.get("user"):
+        limits.append((USER_LIMITER, data["user"]))
+
+    if CHANNEL_LIMITER:
+        limits.append((CHANNEL_LIMITER, data["channel"]))
+
+    with _ADMIT_LOCK:
+        # Don't take a token from one of them if the other is going to reject the command:
+        wait = max([limiter.wait_time(key) for limiter, key in limits] or [0])
+        if wait:
+            return wait
+
+        for limiter, key in limits:
+            limiter.consume(key)
+
+    return 0
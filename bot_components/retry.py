@@ -0,0 +1,164 @@
+"""
+.. module: hubcommander.bot_components.retry
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# The methods that are safe to send again (since doing them twice is the same as doing them once):
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+# The responses that are worth trying again:
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+# The retry policy, and the retry budget for this process (None means that nothing is retried):
+POLICY = None
+PROCESS_BUDGET = None
+
+# The number of retries that the running command has left (None outside of commands):
+_COMMAND_RETRIES = contextvars.ContextVar("command_retries", default=None)
+
+COUNTS = {"retries": 0, "out_of_command_budget": 0, "out_of_process_budget": 0}
+_COUNTS_LOCK = threading.Lock()
+
+
+class RetryPolicy:
+    """
+    How many times to try a call, and how long to wait between the attempts. The delays are "full jitter": a random
+    amount of time up to `base_delay * 2^attempt` (capped at `max_delay`), so that retries from many commands don't
+    all land at the same time.
+    """
+    def __init__(self, max_attempts=3, base_delay=0.2, max_delay=2, per_command=5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.per_command = per_command
+
+    def delay(self, attempt, retry_after=None):
+        """
+        :param attempt: The attempt that just failed (starting at 0).
+        :param retry_after: How long the upstream asked us to wait (this is still capped at `max_delay`).
+        :return: How many seconds to wait before the next attempt.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, min(self.max_delay, retry_after))
+
+        return delay
+
+
+class RetryBudget:
+    """
+    Limits the retries for a process to `ratio` of its calls (plus `min_per_second`, so that a quiet process can still
+    retry). When an upstream is having problems, this keeps the retries from multiplying the load on it.
+    """
+    def __init__(self, ratio=0.1, min_per_second=1, capacity=10, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, deposit=0):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.min_per_second + deposit)
+        self.updated = now
+
+    def record_call(self):
+        with self.lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        """
+        :return: True if there was enough budget left for a retry.
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+
+def configure(policy):
+    """
+    :param policy: A dict with the `RetryPolicy` settings, plus the `RetryBudget`'s "budget_ratio" and
+                   "min_per_second". None to disable retries.
+    :return:
+    """
+    global POLICY, PROCESS_BUDGET
+
+    if not policy:
+        POLICY = PROCESS_BUDGET = None
+        return
+
+    policy = dict(policy)
+    PROCESS_BUDGET = RetryBudget(policy.pop("budget_ratio", 0.1), policy.pop("min_per_second", 1))
+    POLICY = RetryPolicy(**policy)
+
+
+@contextmanager
+def command_budget():
+    """
+    Limits the retries for everything that's called within this (like a command) to the policy's `per_command`.
+    """
+    token = _COMMAND_RETRIES.set([POLICY.per_command] if POLICY else None)
+    try:
+        yield
+    finally:
+        _COMMAND_RETRIES.reset(token)
+
+
+def _count(name):
+    with _COUNTS_LOCK:
+        COUNTS[name] += 1
+
+
+def record_call():
+    if PROCESS_BUDGET:
+        PROCESS_BUDGET.record_call()
+
+
+def should_retry(method, attempt):
+    """
+    Checks if a failed call can be tried again, and takes the retry out of the budgets if it can.
+    :param method: The HTTP method.
+    :param attempt: The attempt that just failed (starting at 0).
+    :return:
+    """
+    if not POLICY or method.upper() not in IDEMPOTENT_METHODS or attempt + 1 >= POLICY.max_attempts:
+        return False
+
+    remaining = _COMMAND_RETRIES.get()
+    if remaining is not None and remaining[0] <= 0:
+        _count("out_of_command_budget")
+        return False
+
+    if not PROCESS_BUDGET.withdraw():
+        _count("out_of_process_budget")
+        return False
+
+    if remaining is not None:
+        remaining[0] -= 1
+
+    _count("retries")
+    return True
+
+
+def wait_before_retry(attempt, retry_after=None):
+    time.sleep(POLICY.delay(attempt, retry_after))
+
+
+def retry_stats():
+    with _COUNTS_LOCK:
+        return dict(COUNTS)
@@ -0,0 +1,198 @@
+"""
+.. module: hubcommander.bot_components.scheduler
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+FAST_LANE = "fast"
+READ_LANE = "read"
+SLOW_LANE = "slow"
+
+DEFAULT_LANES = {
+    FAST_LANE: {"weight": 4, "reserved_threads": 1},
+    READ_LANE: {"weight": 2, "reserved_threads": 0},
+    SLOW_LANE: {"weight": 1, "reserved_threads": 0},
+}
+
+# The running scheduler (None means that commands are run inline):
+SCHEDULER = None
+
+# The lanes that commands were asked to run in, but that weren't configured (so that they're only warned about once):
+_WARNED_LANES = set()
+
+
+class LaneScheduler:
+    """
+    Runs commands on a pool of threads, with a separate queue (lane) for each kind of command.
+
+    Shared threads pick the next command across all the lanes with a smooth weighted round-robin, so a lane
+    with a weight of 4 gets 4 turns for every turn of a lane with a weight of 1. Each lane can also reserve
+    threads that only ever serve that lane. This way, cheap commands are never stuck behind slow
+    ones (like those that wait on Duo), even when every shared thread is busy.
+    """
+    def __init__(self, lanes, threads):
+        self.lanes = lanes
+        self.queues = {lane: deque() for lane in lanes}
+        self.current_weights = {lane: 0 for lane in lanes}
+        self.condition = threading.Condition()
+        self.shutting_down = False
+        self.threads = []
+
+        for lane, lane_config in lanes.items():
+            for x in range(lane_config.get("reserved_threads", 0)):
+                self._start_thread([lane], "{}-{}".format(lane, x))
+
+        for x in range(threads):
+            self._start_thread(list(lanes), "shared-{}".format(x))
+
+    def _start_thread(self, lanes, name):
+        thread = threading.Thread(target=self._run, args=(lanes,), name="hubcommander-lane-{}".format(name),
+                                  daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def submit(self, lane, func, *args, **kwargs):
+        future = Future()
+        with self.condition:
+            if self.shutting_down:
+                raise RuntimeError("The scheduler has been shut down.")
+
+            self.queues[lane].append((future, func, args, kwargs))
+            self.condition.notify_all()
+
+        return future
+
+    def queue_depths(self):
+        with self.condition:
+            return {lane: len(queue) for lane, queue in self.queues.items()}
+
+    def shutdown(self, wait=True):
+        with self.condition:
+            self.shutting_down = True
+            self.condition.notify_all()
+
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def _pick_lane(self, lanes):
+        """
+        Smooth weighted round-robin over the lanes that have work waiting. Must be called with the lock held.
+        :param lanes:
+        :return:
+        """
+        ready = [lane for lane in lanes if self.queues[lane]]
+        if not ready:
+            return None
+
+        total = 0
+        for lane in ready:
+            self.current_weights[lane] += self.lanes[lane].get("weight", 1)
+            total += self.lanes[lane].get("weight", 1)
+
+        picked = max(ready, key=lambda lane: self.current_weights[lane])
+        self.current_weights[picked] -= total
+
+        return picked
+
+    def _run(self, lanes):
+        while True:
+            with self.condition:
+                lane = self._pick_lane(lanes)
+                while lane is None:
+                    if self.shutting_down:
+                        return
+
+                    self.condition.wait()
+                    lane = self._pick_lane(lanes)
+
+                future, func, args, kwargs = self.queues[lane].popleft()
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+def lane_for_command(command, lanes=None):
+    """
+    Figures out which lane a command belongs in, from its configuration in the plugin's `commands` dict.
+
+    Commands can set a "lane" explicitly. Otherwise, commands that are marked as "cheap" (answered from local data)
+    go into the fast lane, commands that are marked as "read_only" (which call GitHub, but don't change anything) go
+    into the read lane, and everything else goes into the slow lane.
+
+    Commands are never dropped for want of a lane: if their lane isn't configured, then they go into the slow lane
+    (or the first lane, if there's no slow lane either), and a warning is printed (once for each missing lane).
+    :param command:
+    :param lanes: The lanes to pick from (the running scheduler's, or the default lanes, if not given).
+    :return:
+    """
+    if not lanes:
+        lanes = SCHEDULER.lanes if SCHEDULER else DEFAULT_LANES
+
+    if command.get("lane"):
+        lane = command["lane"]
+    elif command.get("cheap"):
+        lane = FAST_LANE
+    elif command.get("read_only"):
+        lane = READ_LANE
+    else:
+        lane = SLOW_LANE
+
+    if lane in lanes:
+        return lane
+
+    fallback = SLOW_LANE if SLOW_LANE in lanes else next(iter(lanes))
+    if lane not in _WARNED_LANES:
+        _WARNED_LANES.add(lane)
+        print("[!] The \"{}\" command lane isn't in COMMAND_LANES, so its commands are run in the \"{}\" lane."
+              .format(lane, fallback))
+
+    return fallback
+
+
+def start_scheduler(threads, lanes=None):
+    global SCHEDULER
+
+    if not SCHEDULER:
+        SCHEDULER = LaneScheduler(lanes or DEFAULT_LANES, threads)
+
+    return SCHEDULER
+
+
+def stop_scheduler(wait=True):
+    global SCHEDULER
+
+    if SCHEDULER:
+        SCHEDULER.shutdown(wait=wait)
+        SCHEDULER = None
+
+
+def submit(lane, func, *args, **kwargs):
+    """
+    Schedules the function to run in the given lane. If the scheduler is not running, then the function is
+    run right away.
+    :return: A future for the result.
+    """
+    if SCHEDULER:
+        return SCHEDULER.submit(lane, func, *args, **kwargs)
+
+    future = Future()
+    try:
+        future.set_result(func(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+
+    return future
@@ -0,0 +1,108 @@
+"""
+.. module: hubcommander.bot_components.sharding
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import os
+import socket
+import threading
+import time
+import zlib
+
+SHARD_COUNT = 1
+SHARD_INDEX = 0
+
+# The shared lease store (None means that this replica does not need to coordinate with any other):
+LEASE_STORE = None
+
+
+class SQLiteLeaseStore:
+    """
+    A lease table in a SQLite database that all replicas can reach. The first replica to insert the lease for a
+    message is the one (and only one) that executes it.
+    """
+    def __init__(self, path, lease_seconds=300, owner=None):
+        self.lease_seconds = lease_seconds
+        self.owner = owner or "{}:{}".format(socket.gethostname(), os.getpid())
+        self.lock = threading.Lock()
+        self.acquired = 0
+
+        import sqlite3   # Only needed with a LEASE_DATABASE.
+
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS leases "
+                                "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def acquire(self, key):
+        """
+        Attempts to take the lease for the key.
+        :param key:
+        :return: True if this replica now holds the lease, False if another replica does.
+        """
+        now = time.time()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+                cursor = self.connection.execute("INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                                                 (key, self.owner, now + self.lease_seconds))
+                acquired = cursor.rowcount == 1
+
+                # Every so often, clean out the expired leases so that the table doesn't grow forever:
+                self.acquired += 1
+                if self.acquired % 100 == 0:
+                    self.connection.execute("DELETE FROM leases WHERE expires < ?", (now,))
+
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+        return acquired
+
+    def close(self):
+        self.connection.close()
+
+
+def configure(shard_count=1, shard_index=0, lease_store=None):
+    global SHARD_COUNT, SHARD_INDEX, LEASE_STORE
+
+    if not 0 <= shard_index < shard_count:
+        raise ValueError("The shard index must be between 0 and {}.".format(shard_count - 1))
+
+    SHARD_COUNT = shard_count
+    SHARD_INDEX = shard_index
+    LEASE_STORE = lease_store
+
+
+def shard_for_channel(channel, shard_count):
+    # crc32 is stable across processes and hosts (unlike hash()):
+    return zlib.crc32(channel.encode("utf-8")) % shard_count
+
+
+def owns_channel(channel):
+    """
+    Checks if this replica is responsible for the channel.
+    :param channel:
+    :return:
+    """
+    if SHARD_COUNT == 1:
+        return True
+
+    return shard_for_channel(channel, SHARD_COUNT) == SHARD_INDEX
+
+
+def claim_message(data):
+    """
+    Takes the lease for the message so that no other replica executes it. This protects against overlapping shards,
+    such as during a rolling deploy that changes the shard count.
+    :param data:
+    :return: True if this replica should execute the message.
+    """
+    if not LEASE_STORE:
+        return True
+
+    return LEASE_STORE.acquire("{}:{}".format(data["channel"], data["ts"]))
@@ -6,13 +6,266 @@
 
 .. moduleauthor:: Mike Grima <mgrima@netflix.com>
 """
+import contextvars
+import itertools
 import json
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import Future
 
 from hubcommander import bot_components
+from hubcommander.bot_components import circuit_breaker, metrics, tracing
+from hubcommander.bot_components.cache import CACHES, Cache
 
 # A nice color to output
 WORKING_COLOR = "#439FE0"
 
+# Slack permits (roughly) 1 message per second, per channel:
+CHANNEL_SEND_INTERVAL = 1.0
+
+# How long to wait after Slack rate limits us. slackclient only returns the body of Slack's response (and not its
+# Retry-After header), so this is doubled for each time that the same message is rate limited (up to the max):
+RATE_LIMIT_BACKOFF = 1
+MAX_RATE_LIMIT_BACKOFF = 30
+
+# The number of times to try sending a message before giving up on it:
+MAX_SEND_ATTEMPTS = 5
+
+# Slack cuts off messages that are longer than this (roughly), so longer tables are split across messages:
+MAX_MESSAGE_LENGTH = 3500
+
+# Tables that are longer than this are uploaded as a text snippet, rather than being sent as a pile of messages:
+UPLOAD_TABLE_LENGTH = 14000
+
+# The background sender (None means that messages are sent right away):
+OUTBOUND_QUEUE = None
+
+# Commands are only acknowledged with a "Working, Please wait..." if they have been running for this many seconds
+# (None means acknowledge right away). If WORKING_REACTION is set, then the acknowledgement is that reaction on the
+# command's message, rather than a message of its own:
+WORKING_DELAY = 2.0
+WORKING_REACTION = None
+
+# The Slack users' info, by user ID (None means that it's fetched for every command):
+USER_CACHE = None
+
+# The errors that the running command has sent (None outside of `watch_for_errors()`):
+_ERRORS_SENT = contextvars.ContextVar("errors_sent", default=None)
+
+# The acknowledgements that have not been sent yet, by (channel, message timestamp):
+PENDING_WORKING = {}
+PENDING_WORKING_LOCK = threading.Lock()
+
+
+class OutboundQueue:
+    """
+    Sends messages to Slack from a background thread, so that commands don't need to wait on the Slack API.
+
+    Each channel gets its own queue (so messages to a channel are sent in order), and a channel is not sent
+    to more than once per `interval` seconds. If Slack rate limits us anyway, then the message is put back at the
+    front of its channel's queue, and the channel is paused (for longer each time, see `retry_after()`).
+    """
+    def __init__(self, interval=CHANNEL_SEND_INTERVAL, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self.queues = {}
+        self.next_send = {}
+        self.condition = threading.Condition()
+        self.shutting_down = False
+
+        self.thread = threading.Thread(target=self._run, name="hubcommander-slack-outbound", daemon=True)
+        self.thread.start()
+
+    def put(self, channel, verb, kwargs):
+        future = Future()
+        with self.condition:
+            # The message is sent in the context of the command that sent it (for its metrics and trace):
+            self.queues.setdefault(channel, deque()).append([verb, kwargs, future, 0, contextvars.copy_context()])
+            self.condition.notify()
+
+        return future
+
+    def shutdown(self, wait=True):
+        """
+        Stops the sender once everything that is queued up has been sent.
+        :param wait:
+        :return:
+        """
+        with self.condition:
+            self.shutting_down = True
+            self.condition.notify()
+
+        if wait:
+            self.thread.join()
+
+    def _next_message(self):
+        """
+        Finds the channel that can be sent to the soonest. Must be called with the lock held.
+        :return: A tuple of the channel (or None if nothing is queued), and how long to wait before sending to it.
+        """
+        now = self.clock()
+        channel = None
+        soonest = None
+        for name, queue in self.queues.items():
+            if queue:
+                ready_at = self.next_send.get(name, now)
+                if soonest is None or ready_at < soonest:
+                    channel = name
+                    soonest = ready_at
+
+        if channel is None:
+            return None, None
+
+        return channel, max(0, soonest - now)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                channel, wait = self._next_message()
+                while channel is None or wait:
+                    if channel is None and self.shutting_down:
+                        return
+
+                    self.condition.wait(wait)
+                    channel, wait = self._next_message()
+
+                message = self.queues[channel].popleft()
+                self.next_send[channel] = self.clock() + self.interval
+
+            verb, kwargs, future, attempts, context = message
+            try:
+                result = context.run(_send, verb, kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+
+            message[3] = attempts + 1
+            if is_rate_limited(result) and message[3] < MAX_SEND_ATTEMPTS:
+                with self.condition:
+                    self.queues[channel].appendleft(message)
+                    self.next_send[channel] = self.clock() + retry_after(message[3])
+                continue
+
+            future.set_result(result)
+
+
+def start_outbound_queue(interval=CHANNEL_SEND_INTERVAL):
+    global OUTBOUND_QUEUE
+
+    if not OUTBOUND_QUEUE:
+        OUTBOUND_QUEUE = OutboundQueue(interval)
+
+    return OUTBOUND_QUEUE
+
+
+def stop_outbound_queue(wait=True):
+    global OUTBOUND_QUEUE
+
+    if OUTBOUND_QUEUE:
+        OUTBOUND_QUEUE.shutdown(wait=wait)
+        OUTBOUND_QUEUE = None
+
+
+class _ReplyTarget:
+    """
+    The message that a `chat.update` applies to. The message may still be waiting in the outbound queue when the
+    update is queued up, so its timestamp is looked up when the update is actually sent.
+    """
+    def __init__(self, posted, thread=None):
+        self.posted = posted
+        self.thread = thread
+
+
+def _send(verb, kwargs):
+    target = kwargs.get("ts")
+    if verb == "chat.update" and isinstance(target, _ReplyTarget):
+        posted = target.posted.result() if not target.posted.exception() else None
+        kwargs = dict(kwargs)
+
+        if posted and posted.get("ok") and posted.get("ts"):
+            kwargs["ts"] = posted["ts"]
+
+        else:
+            # The message never made it to Slack, so there is nothing to update. Post it instead:
+            verb = "chat.postMessage"
+            del kwargs["ts"]
+            if target.thread:
+                kwargs["thread_ts"] = target.thread
+
+    # An upload may be sent more than once (like if it was rate limited), so it's read from the start each time:
+    if verb == "files.upload" and hasattr(kwargs.get("file"), "seek"):
+        kwargs["file"].seek(0)
+
+    started = time.monotonic()
+    with tracing.span("Slack {}".format(verb), upstream="Slack") as span:
+        try:
+            result = circuit_breaker.call("Slack", lambda: bot_components.SLACK_CLIENT.api_call(verb, **kwargs))
+        except circuit_breaker.CircuitOpenError as e:
+            result = {"ok": False, "error": str(e)}
+        finally:
+            metrics.observe_phase(metrics.SLACK_SEND, time.monotonic() - started)
+
+        if span and isinstance(result, dict):
+            span.set_attribute("slack.ok", result.get("ok"))
+            if not result.get("ok"):
+                span.status = "error"
+                span.set_attribute("error", result.get("error"))
+
+        return result
+
+
+def is_rate_limited(result):
+    return bool(result) and result.get("error") == "ratelimited"
+
+
+def retry_after(attempts):
+    """
+    :param attempts: The number of times that the message has been rate limited.
+    :return: How many seconds to wait before sending it again.
+    """
+    return min(MAX_RATE_LIMIT_BACKOFF, RATE_LIMIT_BACKOFF * 2 ** (attempts - 1))
+
+
+def api_call(verb, **kwargs):
+    """
+    Calls the Slack API right away. If Slack rate limits the call, then this backs off (see `retry_after()`), and
+    tries again.
+    :param verb:
+    :param kwargs:
+    :return:
+    """
+    for attempt in range(1, MAX_SEND_ATTEMPTS):
+        result = _send(verb, kwargs)
+        if not is_rate_limited(result):
+            return result
+
+        time.sleep(retry_after(attempt))
+
+    return _send(verb, kwargs)
+
+
+def post(verb, **kwargs):
+    """
+    Posts to a Slack channel (in `kwargs["channel"]`, or `kwargs["channels"]` for file uploads). If the outbound
+    queue is running, then this is sent in the background.
+    :param verb:
+    :param kwargs:
+    :return: A future for Slack's response.
+    """
+    if OUTBOUND_QUEUE:
+        return OUTBOUND_QUEUE.put(kwargs.get("channel", kwargs.get("channels")), verb, kwargs)
+
+    future = Future()
+    try:
+        future.set_result(api_call(verb, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+
+    return future
+
 
 def say(channel, attachments, text=None, ephemeral_user=None, thread=None):
     """
@@ -22,7 +275,7 @@ def say(channel, attachments, text=None, ephemeral_user=None, thread=None):
     :param text:
     :param ephemeral_user:ID of the user who will receive the ephemeral message
     :param thread:
-    :return:
+    :return: A future for Slack's response.
     """
     kwargs_to_send = {
         "channel": channel,
@@ -39,7 +292,52 @@ def say(channel, attachments, text=None, ephemeral_user=None, thread=None):
     if thread:
         kwargs_to_send["thread_ts"] = thread
 
-    bot_components.SLACK_CLIENT.api_call(verb, **kwargs_to_send)
+        # The user can see that the command is being worked on, so there's no need to acknowledge it:
+        _cancel_pending_working(channel, thread)
+
+    return post(verb, **kwargs_to_send)
+
+
+class Reply:
+    """
+    A reply to a command that is posted once, and is then edited in place (with `chat.update`) each time that its
+    status changes. This keeps multi-step commands down to a single message in the channel.
+
+    Ephemeral messages can't be edited, so each status of an ephemeral reply is posted on its own.
+    """
+    def __init__(self, channel, thread=None, ephemeral_user=None):
+        self.channel = channel
+        self.thread = thread
+        self.ephemeral_user = ephemeral_user
+        self.posted = None
+
+    def info(self, text, markdown=False):
+        return self._say(text, WORKING_COLOR, markdown)
+
+    def error(self, text, markdown=False):
+        _error_sent(text)
+        return self._say(text, "danger", markdown)
+
+    def success(self, text, markdown=False):
+        return self._say(text, "good", markdown)
+
+    def _say(self, text, color, markdown):
+        attachment = {
+            "text": text,
+            "color": color,
+        }
+
+        if markdown:
+            attachment["mrkdwn_in"] = ["text"]
+
+        if not self.posted or self.ephemeral_user:
+            self.posted = say(self.channel, [attachment], ephemeral_user=self.ephemeral_user, thread=self.thread)
+
+        else:
+            self.posted = post("chat.update", channel=self.channel, ts=_ReplyTarget(self.posted, self.thread),
+                               text=" ", attachments=json.dumps([attachment]), as_user=True)
+
+        return self.posted
 
 
 def send_error(channel, text, markdown=False, ephemeral_user=None, thread=None):
@@ -60,7 +358,33 @@ def send_error(channel, text, markdown=False, ephemeral_user=None, thread=None):
     if markdown:
         attachment["mrkdwn_in"] = ["text"]
 
-    say(channel, [attachment], ephemeral_user=ephemeral_user, thread=thread)
+    _error_sent(text)
+    return say(channel, [attachment], ephemeral_user=ephemeral_user, thread=thread)
+
+
+@contextmanager
+def watch_for_errors():
+    """
+    Keeps track of the errors that are sent to Slack within this (like while a command runs), so that a command that
+    reports a problem (rather than raising an exception) is known to have failed. These can be nested: the errors are
+    also added to the outer one's list.
+    :return: The list of the errors that were sent.
+    """
+    outer = _ERRORS_SENT.get()
+    errors = []
+    token = _ERRORS_SENT.set(errors)
+    try:
+        yield errors
+    finally:
+        _ERRORS_SENT.reset(token)
+        if outer is not None:
+            outer.extend(errors)
+
+
+def _error_sent(text):
+    errors = _ERRORS_SENT.get()
+    if errors is not None:
+        errors.append(text)
 
 
 def send_info(channel, text, markdown=False, ephemeral_user=None, thread=None):
@@ -81,7 +405,7 @@ def send_info(channel, text, markdown=False, ephemeral_user=None, thread=None):
     if markdown:
         attachment["mrkdwn_in"] = ["text"]
 
-    say(channel, [attachment], ephemeral_user=ephemeral_user, thread=thread)
+    return say(channel, [attachment], ephemeral_user=ephemeral_user, thread=thread)
 
 
 def send_success(channel, text, markdown=False, ephemeral_user=None, thread=None):
@@ -102,7 +426,7 @@ def send_success(channel, text, markdown=False, ephemeral_user=None, thread=None
     if markdown:
         attachment["mrkdwn_in"] = ["text"]
 
-    say(channel, [attachment], ephemeral_user=ephemeral_user, thread=thread)
+    return say(channel, [attachment], ephemeral_user=ephemeral_user, thread=thread)
 
 
 def send_raw(channel, text, ephemeral_user=None, thread=None):
@@ -114,7 +438,309 @@ def send_raw(channel, text, ephemeral_user=None, thread=None):
     :param thread:
     :return:
     """
-    say(channel, None, text, ephemeral_user=ephemeral_user, thread=thread)
+    return say(channel, None, text, ephemeral_user=ephemeral_user, thread=thread)
+
+
+class Table:
+    """
+    A plain-text table (in the same layout as tabulate's "orgtbl" format) that can be rendered a slice at a time.
+
+    The column widths are worked out as the rows come in, so the rows are only held once (as strings), and the
+    rendered table is produced line by line rather than all at once.
+    """
+    def __init__(self, headers, rows):
+        self.headers = [str(header) for header in headers]
+        self.widths = [len(header) for header in self.headers]
+        self.numeric = [True] * len(self.headers)
+        self.rows = []
+
+        for row in rows:
+            cells = []
+            for x, cell in enumerate(row):
+                if isinstance(cell, bool) or not isinstance(cell, (int, float)):
+                    self.numeric[x] = False
+
+                cell = str(cell)
+                self.widths[x] = max(self.widths[x], len(cell))
+                cells.append(cell)
+
+            self.rows.append(cells)
+
+    def _line(self, cells, numeric):
+        return "| {} |".format(" | ".join(cell.rjust(width) if right else cell.ljust(width)
+                                          for cell, width, right in zip(cells, self.widths, numeric)))
+
+    def header_lines(self):
+        return [self._line(self.headers, self.numeric),
+                "|-{}-|".format("-+-".join("-" * width for width in self.widths))]
+
+    def lines(self):
+        yield from self.header_lines()
+        for row in self.rows:
+            yield self._line(row, self.numeric)
+
+    def rendered_length(self):
+        line_length = sum(self.widths) + 3 * len(self.widths) + 2
+        return line_length * (len(self.rows) + 2)
+
+    def chunks(self, max_length):
+        """
+        Splits the rendered table on row boundaries, into chunks that are no longer than `max_length`
+        (unless a single row is longer than that). Each chunk starts with the headers.
+        :param max_length:
+        :return:
+        """
+        header = "\n".join(self.header_lines())
+        chunk = [header]
+        length = len(header)
+
+        for row in self.rows:
+            line = self._line(row, self.numeric)
+            if len(chunk) > 1 and length + len(line) + 1 > max_length:
+                yield "\n".join(chunk)
+                chunk = [header]
+                length = len(header)
+
+            chunk.append(line)
+            length += len(line) + 1
+
+        yield "\n".join(chunk)
+
+
+def send_table(channel, title, headers, rows, ephemeral_user=None, thread=None):
+    """
+    Sends a table to Slack. Tables that don't fit in one message are split across several messages (on row
+    boundaries). Tables that are longer than `UPLOAD_TABLE_LENGTH` are uploaded as a text snippet instead.
+    :param channel:
+    :param title: The text that goes above the table.
+    :param headers:
+    :param rows: An iterable of rows (each being a list of cells).
+    :param ephemeral_user:ID of the user who will receive the ephemeral message
+    :param thread:
+    :return: A future for Slack's response to the last message.
+    """
+    return _send_table(channel, title, Table(headers, rows), ephemeral_user, thread)[0]
+
+
+def _table_file(table):
+    """
+    Writes the rendered table to a temporary file, a line at a time, so that it's uploaded from there rather than
+    from one big string.
+    """
+    upload = tempfile.TemporaryFile()
+    for line in table.lines():
+        upload.write(line.encode("utf-8") + b"\n")
+
+    return upload
+
+
+def _send_table(channel, title, table, ephemeral_user=None, thread=None):
+    """
+    :return: A tuple of (a future for Slack's response to the last message, whether it was sent as one message).
+    """
+    # Ephemeral files aren't a thing, so those are always sent as messages:
+    if not ephemeral_user and table.rendered_length() > UPLOAD_TABLE_LENGTH:
+        upload = _table_file(table)
+        kwargs = {
+            "channels": channel,
+            "file": upload,
+            "filetype": "text",
+            "filename": "table.txt",
+            "initial_comment": title
+        }
+        if thread:
+            kwargs["thread_ts"] = thread
+            _cancel_pending_working(channel, thread)
+
+        posted = post("files.upload", **kwargs)
+        posted.add_done_callback(lambda future: upload.close())
+        return posted, False
+
+    future = None
+    messages = 0
+    for chunk in table.chunks(MAX_MESSAGE_LENGTH - len(title)):
+        text = "```{}```".format(chunk)
+        if not future:
+            text = "{} \n\n{}".format(title, text)
+
+        future = send_raw(channel, text, ephemeral_user=ephemeral_user, thread=thread)
+        messages += 1
+
+    return future, messages == 1
+
+
+def format_age(seconds):
+    """
+    Formats a number of seconds for people, like "45s", "12m", or "3h".
+    """
+    if seconds < 60:
+        return "{}s".format(int(seconds))
+
+    if seconds < 3600:
+        return "{}m".format(int(seconds // 60))
+
+    return "{}h".format(int(seconds // 3600))
+
+
+class TableReply:
+    """
+    A table that can be sent again with new rows, like when the table was sent from a cache, and the fresh rows have
+    just come in. If the table was sent as a single message, then the message is edited in place (with
+    `chat.update`). Otherwise (and for ephemeral tables), the new table is sent on its own.
+    """
+    def __init__(self, channel, title, headers, ephemeral_user=None, thread=None):
+        self.channel = channel
+        self.title = title
+        self.headers = headers
+        self.ephemeral_user = ephemeral_user
+        self.thread = thread
+        self.posted = None
+        self.single = False
+
+    def send(self, rows, note=None):
+        """
+        :param rows:
+        :param note: Text that goes after the title, like how old the rows are.
+        :return: A future for Slack's response to the last message.
+        """
+        table = Table(self.headers, rows)
+        title = "{} {}".format(self.title, note) if note else self.title
+
+        # Tables that are going to be uploaded are never split into chunks (so they're only rendered once), and
+        # otherwise no more than the first two chunks are needed to know whether the table still fits in one message:
+        chunks = []
+        if self.posted and self.single and not self.ephemeral_user and table.rendered_length() <= UPLOAD_TABLE_LENGTH:
+            chunks = list(itertools.islice(table.chunks(MAX_MESSAGE_LENGTH - len(title)), 2))
+
+        if len(chunks) == 1:
+            self.posted = post("chat.update", channel=self.channel, ts=_ReplyTarget(self.posted, self.thread),
+                               text="{} \n\n```{}```".format(title, chunks[0]), as_user=True)
+
+        else:
+            self.posted, self.single = _send_table(self.channel, title, table, self.ephemeral_user, self.thread)
+
+        return self.posted
+
+
+async def _wait(send, *args, **kwargs):
+    """
+    Sends a message from a coroutine. Without the outbound queue, the message is sent right away, which blocks on
+    the Slack API -- so it's sent from an executor thread instead of the event loop's (in the coroutine's context).
+    """
+    import asyncio   # Only imported (by the event loop) once there is a coroutine to run.
+
+    if OUTBOUND_QUEUE:
+        return await asyncio.wrap_future(send(*args, **kwargs))
+
+    context = contextvars.copy_context()
+    posted = await asyncio.get_running_loop().run_in_executor(None, lambda: context.run(send, *args, **kwargs))
+    return posted.result()
+
+
+async def async_send_error(channel, text, markdown=False, ephemeral_user=None, thread=None):
+    """
+    The same as `send_error()`, for `async def` commands. This waits for Slack's response.
+    """
+    return await _wait(send_error, channel, text, markdown=markdown, ephemeral_user=ephemeral_user, thread=thread)
+
+
+async def async_send_info(channel, text, markdown=False, ephemeral_user=None, thread=None):
+    """
+    The same as `send_info()`, for `async def` commands. This waits for Slack's response.
+    """
+    return await _wait(send_info, channel, text, markdown=markdown, ephemeral_user=ephemeral_user, thread=thread)
+
+
+async def async_send_success(channel, text, markdown=False, ephemeral_user=None, thread=None):
+    """
+    The same as `send_success()`, for `async def` commands. This waits for Slack's response.
+    """
+    return await _wait(send_success, channel, text, markdown=markdown, ephemeral_user=ephemeral_user, thread=thread)
+
+
+async def async_send_raw(channel, text, ephemeral_user=None, thread=None):
+    """
+    The same as `send_raw()`, for `async def` commands. This waits for Slack's response.
+    """
+    return await _wait(send_raw, channel, text, ephemeral_user=ephemeral_user, thread=thread)
+
+
+def configure_working(delay=WORKING_DELAY, reaction=None):
+    global WORKING_DELAY, WORKING_REACTION
+
+    WORKING_DELAY = delay
+    WORKING_REACTION = reaction
+
+
+def send_working(data, user_data):
+    """
+    Lets the user know that the command is being worked on -- but only if the command is still running after
+    `WORKING_DELAY` seconds. Fast commands then only need to send their result.
+
+    This is cancelled as soon as anything else is posted to the command's thread, or when the command finishes.
+    :param data:
+    :param user_data:
+    :return:
+    """
+    if not WORKING_DELAY:
+        _acknowledge(data, user_data)
+        return
+
+    timer = threading.Timer(WORKING_DELAY, _fire_pending_working, args=(data, user_data))
+    timer.daemon = True
+    with PENDING_WORKING_LOCK:
+        PENDING_WORKING[(data["channel"], data["ts"])] = timer
+
+    timer.start()
+
+
+def finish_working(data):
+    """
+    Called when a command finishes. Cancels the acknowledgement if it hasn't been sent yet, and removes the
+    reaction if one was added.
+    :param data:
+    :return:
+    """
+    if not _cancel_pending_working(data["channel"], data.get("ts")) and data.get("working_reaction"):
+        post("reactions.remove", channel=data["channel"], timestamp=data["ts"], name=data.pop("working_reaction"))
+
+
+def _cancel_pending_working(channel, ts):
+    with PENDING_WORKING_LOCK:
+        timer = PENDING_WORKING.pop((channel, ts), None)
+
+    if timer:
+        timer.cancel()
+        return True
+
+    return False
+
+
+def _fire_pending_working(data, user_data):
+    with PENDING_WORKING_LOCK:
+        if not PENDING_WORKING.pop((data["channel"], data["ts"]), None):
+            return
+
+    _acknowledge(data, user_data)
+
+
+def _acknowledge(data, user_data):
+    if WORKING_REACTION:
+        data["working_reaction"] = WORKING_REACTION
+        post("reactions.add", channel=data["channel"], timestamp=data["ts"], name=WORKING_REACTION)
+    else:
+        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+
+
+def configure_user_cache(seconds):
+    """
+    Caches the Slack users' info for this many seconds (None to not cache it).
+    """
+    global USER_CACHE
+
+    USER_CACHE = Cache("slack.users", seconds) if seconds else None
+    if USER_CACHE is None:
+        CACHES.pop("slack.users", None)
 
 
 def get_user_data(data):
@@ -125,9 +751,42 @@ def get_user_data(data):
     :param data:
     :return:
     """
-    result = bot_components.SLACK_CLIENT.api_call("users.info", user=data["user"])
+    if USER_CACHE is not None:
+        user = USER_CACHE.get(data["user"], refresh=lambda: _fetch_user(data["user"]))
+        if user:
+            return user, None
+
+    result = api_call("users.info", user=data["user"])
     if result.get("error"):
         return None, result["error"]
 
     else:
+        if USER_CACHE is not None:
+            USER_CACHE.set(data["user"], result["user"])
+
         return result["user"], None
+
+
+def prefetch_users(user_ids):
+    """
+    Loads the info for these Slack users into the cache (see `configure_user_cache()`).
+    :param user_ids:
+    :return: The number of users that were loaded.
+    """
+    loaded = 0
+    for user_id in user_ids:
+        user, error = get_user_data({"user": user_id})
+        if error:
+            print("[!] Couldn't fetch the Slack user {}: {}".format(user_id, error))
+        else:
+            loaded += 1
+
+    return loaded
+
+
+def _fetch_user(user_id):
+    result = api_call("users.info", user=user_id)
+    if result.get("error"):
+        raise ValueError(result["error"])
+
+    return result["user"]
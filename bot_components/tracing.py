@@ -0,0 +1,181 @@
+"""
+.. module: hubcommander.bot_components.tracing
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Where the finished spans are sent (None means that tracing is disabled):
+EXPORTER = None
+
+# The span that is running (None outside of traces):
+_CURRENT_SPAN = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed piece of work within a trace, in the style of OpenTelemetry. All the spans for a command share the
+    command's trace ID, and each span points at the span that it ran within (its parent).
+    """
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start_time = time.time()
+        self.end_time = None
+        self._started = time.monotonic()
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def end(self):
+        self.end_time = self.start_time + (time.monotonic() - self._started)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round((self.end_time - self.start_time) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class JSONFileExporter:
+    """
+    Appends each finished span to a file, as a line of JSON.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a") as file:
+                file.write(line)
+
+
+def configure(path=None, exporter=None):
+    """
+    :param path: The file to write the spans to (see `JSONFileExporter`).
+    :param exporter: Anything with an `export(span)` method, instead of a file. With neither, tracing is disabled.
+    :return:
+    """
+    global EXPORTER
+
+    EXPORTER = exporter or (JSONFileExporter(path) if path else None)
+
+
+def trace_id_for_message(data):
+    """
+    :param data: The Slack message.
+    :return: The trace ID for the message, so that its spans can be found from its channel and timestamp.
+    """
+    return hashlib.sha256("{}:{}".format(data.get("channel"), data.get("ts")).encode("utf-8")).hexdigest()[:32]
+
+
+def current_span():
+    return _CURRENT_SPAN.get()
+
+
+@contextmanager
+def span(name, trace_id=None, **attributes):
+    """
+    Runs the code within a span. Outside of a trace, this does nothing (unless `trace_id` is given to start one).
+    Exceptions mark the span as an "error", and are raised as usual.
+    :param name:
+    :param trace_id: Starts a new trace with this ID.
+    :param attributes:
+    :return: The span (or None if it isn't traced).
+    """
+    parent = _CURRENT_SPAN.get()
+    if not EXPORTER or not (parent or trace_id):
+        yield None
+        return
+
+    current = Span(name, trace_id or parent.trace_id, None if trace_id else parent.span_id, attributes)
+    token = _CURRENT_SPAN.set(current)
+    try:
+        yield current
+
+    except BaseException as e:
+        current.status = "error"
+        current.set_attribute("error", "{}: {}".format(type(e).__name__, e))
+        raise
+
+    finally:
+        _CURRENT_SPAN.reset(token)
+        current.end()
+        exporter = EXPORTER
+        if exporter:
+            try:
+                exporter.export(current)
+            except Exception as e:
+                print("[X] Unable to export a trace span: {}".format(e))
+
+
+@contextmanager
+def trace_message(data, name, **attributes):
+    """
+    Starts the trace for a Slack message. All the spans within it share a trace ID that is worked out from the
+    message's channel and timestamp (the message's "ts" is also in the root span's attributes).
+    """
+    with span(name, trace_id=trace_id_for_message(data), **dict(attributes, **{
+            "slack.channel": data.get("channel"), "slack.ts": data.get("ts"), "slack.user": data.get("user")})) \
+            as root:
+        yield root
+
+
+def load_spans(path):
+    """
+    :param path: A file that a `JSONFileExporter` wrote.
+    :return: A dict of trace ID to the list of its spans (as dicts).
+    """
+    traces = {}
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                span_dict = json.loads(line)
+                traces.setdefault(span_dict["trace_id"], []).append(span_dict)
+
+    return traces
+
+
+def critical_path(spans):
+    """
+    Works out the chain of spans that the trace's time was spent waiting on: starting at the root, it follows the
+    child that finished last (since the parent couldn't finish before it did).
+    :param spans: The spans for a single trace (as dicts).
+    :return: The list of spans, from the root down.
+    """
+    children = {}
+    root = None
+    for each in spans:
+        if each["parent_span_id"]:
+            children.setdefault(each["parent_span_id"], []).append(each)
+        elif not root:
+            root = each
+
+    path = []
+    while root:
+        path.append(root)
+        root = max(children.get(root["span_id"], []), key=lambda child: child["end_time"], default=None)
+
+    return path
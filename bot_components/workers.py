@@ -0,0 +1,120 @@
+"""
+.. module: hubcommander.bot_components.workers
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+
+# The process pool that commands are dispatched to (None means run in-process):
+WORKER_POOL = None
+
+# The (count, initializer, initargs) that the pool was started with, for replacing it if it breaks:
+_POOL_ARGS = None
+_POOL_LOCK = threading.Lock()
+
+
+def start_workers(count, initializer, initargs=()):
+    """
+    Starts a pool of `count` worker processes. Each worker runs the `initializer` once on startup. This is where
+    the worker needs to perform its own plugin `setup()`.
+
+    The workers are spawned (not forked) so that each one gets a clean interpreter and its own Slack client, rather
+    than sharing the RTM reader's sockets.
+    :param count:
+    :param initializer:
+    :param initargs:
+    :return:
+    """
+    global WORKER_POOL, _POOL_ARGS
+
+    with _POOL_LOCK:
+        if not WORKER_POOL:
+            _POOL_ARGS = (count, initializer, initargs)
+            WORKER_POOL = _new_pool(count, initializer, initargs)
+
+        return WORKER_POOL
+
+
+def _new_pool(count, initializer, initargs):
+    # multiprocessing is only needed (and imported) when there are workers:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=count, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=initializer, initargs=initargs)
+
+
+def _replace_pool(broken):
+    """
+    Replaces the pool if a worker process died (like if it ran out of memory), since a `ProcessPoolExecutor` doesn't
+    run anything else once that happens.
+    :param broken: The pool that broke (it's only replaced once, no matter how many commands find it broken).
+    :return: The pool to use.
+    """
+    global WORKER_POOL
+
+    with _POOL_LOCK:
+        if WORKER_POOL is broken:
+            print("[X] A worker process died. Starting a new pool of worker processes.")
+            broken.shutdown(wait=False)
+            WORKER_POOL = _new_pool(*_POOL_ARGS)
+
+        return WORKER_POOL
+
+
+def _is_broken_pool_error(error):
+    # Only imported once there are workers, since it imports multiprocessing:
+    from concurrent.futures.process import BrokenProcessPool
+
+    return isinstance(error, BrokenProcessPool)
+
+
+def stop_workers(wait=True):
+    global WORKER_POOL
+
+    with _POOL_LOCK:
+        pool = WORKER_POOL
+        WORKER_POOL = None
+
+    if pool:
+        pool.shutdown(wait=wait)
+
+
+def dispatch(func, *args):
+    """
+    Runs the function in one of the worker processes. The function and its arguments must be picklable, which
+    means that it must be a module-level function.
+    :param func:
+    :param args:
+    :return: A future for the result.
+    """
+    pool = WORKER_POOL
+    try:
+        future = pool.submit(func, *args)
+    except Exception as e:
+        if not _is_broken_pool_error(e):
+            raise
+
+        pool = _replace_pool(pool)
+        future = pool.submit(func, *args)
+
+    future.add_done_callback(lambda future: _report_failure(pool, future))
+
+    return future
+
+
+def _report_failure(pool, future):
+    if future.cancelled():
+        return
+
+    error = future.exception()
+    if error:
+        print("[X] A worker process encountered an error while running a command: {}".format(error))
+
+    # The commands that were running when a worker died aren't run again (they may have already made changes), but
+    # the next ones go to a new pool:
+    if _is_broken_pool_error(error):
+        _replace_pool(pool)
@@ -28,6 +28,17 @@ GITHUB_VERSION = "application/vnd.github.v3+json"   # Is this still needed?
 # GITHUB API PATH:
 GITHUB_URL = "https://api.github.com/"
 
+# How long the list of teams in each org is cached for (in seconds). Teams that aren't in the cached list are
+# looked up again, so new teams are found right away:
+TEAM_INDEX_CACHE_SECONDS = 3600
+
+# Read-only commands (!ListPRs and !ListKeys) cache what they fetch from GitHub. Results that are younger than
+# READ_CACHE_SECONDS are shown as they are. Older results (up to READ_CACHE_STALE_SECONDS) are shown right away,
+# marked with their age, and are fetched again in the background -- if anything changed, the table is updated in
+# place. This keeps these commands fast while GitHub is slow. Set READ_CACHE_STALE_SECONDS to None to disable.
+READ_CACHE_SECONDS = 0
+READ_CACHE_STALE_SECONDS = 600
+
 # You can use this to add/replace fields from the command_plugins dictionary:
 USER_COMMAND_DICT = {
     # This is an example for enabling Duo 2FA support for the "!SetDefaultBranch" command:
@@ -6,7 +6,6 @@
 
 .. moduleauthor:: Mike Grima <mgrima@netflix.com>
 """
-import validators
 from hubcommander.bot_components.parse_functions import ParseException
 
 
@@ -28,6 +27,8 @@ def validate_homepage(plugin_obj, homepage, **kwargs):
     url = extract_url(plugin_obj, homepage)
 
     if url != "":
+        import validators   # This is slow to import, and is only needed for this.
+
         if not validators.url(url):
             raise ParseException("homepage", "Invalid homepage URL was sent in. It must be a well formed URL.")
 
@@ -10,19 +10,24 @@ import json
 
 import requests
 import time
-from tabulate import tabulate
 
 from hubcommander.bot_components.bot_classes import BotCommander
+from hubcommander.bot_components.cache import Cache
 from hubcommander.bot_components.decorators import hubcommander_command, auth
-from hubcommander.bot_components.slack_comm import send_info, send_success, send_error, send_raw
+from hubcommander.bot_components.http import UpstreamSession
+from hubcommander.bot_components.slack_comm import send_info, send_success, send_error, send_raw, send_working, \
+    TableReply, format_age
 from hubcommander.bot_components.parse_functions import extract_repo_name, parse_toggles, extract_multiple_repo_names
-from hubcommander.command_plugins.github.config import GITHUB_URL, GITHUB_VERSION, ORGS, USER_COMMAND_DICT
+from hubcommander.command_plugins.github.config import GITHUB_URL, GITHUB_VERSION, ORGS, USER_COMMAND_DICT, \
+    TEAM_INDEX_CACHE_SECONDS, READ_CACHE_SECONDS, READ_CACHE_STALE_SECONDS
 from hubcommander.command_plugins.github.parse_functions import lookup_real_org, validate_homepage
 from hubcommander.command_plugins.github.decorators import repo_must_exist, github_user_exists, branch_must_exist, \
     team_must_exist
 
 
 class GitHubPlugin(BotCommander):
+    upstreams = ["GitHub"]
+
     def __init__(self):
         super().__init__()
 
@@ -32,6 +37,8 @@ class GitHubPlugin(BotCommander):
                 "func": self.list_org_command,
                 "user_data_required": False,
                 "help": "Lists the GitHub organizations that are managed.",
+                "read_only": True,
+                "cheap": True,
                 "enabled": True
             },
             "!CreateRepo": {
@@ -91,6 +98,7 @@ class GitHubPlugin(BotCommander):
                 "user_data_required": True,
                 "help": "List the Pull Requests for a repo.",
                 "permitted_states": ["open", "closed", "all"],
+                "read_only": True,
                 "enabled": True
             },
             "!DeleteRepo": {
@@ -120,6 +128,7 @@ class GitHubPlugin(BotCommander):
                 "func": self.list_deploy_keys_command,
                 "user_data_required": True,
                 "help": "List the Deploy Keys for a repo.",
+                "read_only": True,
                 "enabled": True
             },
             "!AddKey": {
@@ -141,6 +150,7 @@ class GitHubPlugin(BotCommander):
                 "func": self.get_deploy_key_command,
                 "user_data_required": True,
                 "help": "Get Deploy Key Public Key",
+                "read_only": True,
                 "enabled": True
             },
             "!SetTopics": {
@@ -156,6 +166,18 @@ class GitHubPlugin(BotCommander):
         # For org alias lookup convenience:
         self.org_lookup = None
 
+        # All requests go through one session, so that connections to GitHub are reused. The resource names are for
+        # telling the kinds of calls apart (for their timeouts):
+        self.session = UpstreamSession("GitHub", resources=["orgs", "repos", "users", "teams", "members", "memberships",
+                                                            "branches", "protection", "collaborators", "keys",
+                                                            "pulls", "topics"])
+
+        # The results of read-only commands (like !ListPRs), so that they can be shown right away:
+        self.read_cache = Cache("github.reads", READ_CACHE_SECONDS, stale_ttl=READ_CACHE_STALE_SECONDS or 0)
+
+        # The teams in each org, as a dict of the team slug to the team ID:
+        self.team_index = Cache("github.teams", TEAM_INDEX_CACHE_SECONDS)
+
     def setup(self, secrets, **kwargs):
         self.token = secrets["GITHUB"]
 
@@ -172,6 +194,19 @@ class GitHubPlugin(BotCommander):
         for cmd, keys in USER_COMMAND_DICT.items():
             self.commands[cmd].update(keys)
 
+    def warm_up(self):
+        """
+        Opens a connection to GitHub, and loads the team indexes for all the orgs.
+        :return:
+        """
+        self.session.get(GITHUB_URL, timeout=10)
+
+        for org in ORGS:
+            try:
+                self.team_index.set(org, self.load_team_index(org))
+            except Exception as e:
+                print("[!] Couldn't load the GitHub teams for {}: {}".format(org, e))
+
     @staticmethod
     def list_org_command(data):
         """
@@ -179,6 +214,8 @@ class GitHubPlugin(BotCommander):
         :param data:
         :return:
         """
+        from tabulate import tabulate   # Only this command needs it, so it's imported when it's first used.
+
         headers = ["Alias", "Organization"]
         rows = []
         for org in ORGS.items():
@@ -218,7 +255,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Modify the description:
         if not (self.make_repo_edit(data, user_data, repo, org, description=description)):
@@ -263,7 +300,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Modify the homepage:
         if not (self.make_repo_edit(data, user_data, repo, org, homepage=homepage)):
@@ -313,7 +350,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Grant access:
         try:
@@ -369,7 +406,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Grant access:
         try:
@@ -428,7 +465,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Grant access:
         try:
@@ -485,7 +522,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Do it:
         try:
@@ -537,7 +574,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Check if the repo already exists:
         try:
@@ -618,7 +655,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Delete the repository:
         try:
@@ -628,6 +665,10 @@ class GitHubPlugin(BotCommander):
                        "@{}: I encountered a problem:\n\n{}".format(user_data["name"], e), thread=data["ts"])
             return
 
+        # So that the read-only commands don't think that it's still there (or show what was in it, if a new repo
+        # with the same name is made):
+        self.forget_repo_reads(org, repo)
+
         # All done!
         message = "@{}: The repo: {} has been deleted from {}.\n".format(user_data["name"], repo, org)
         send_success(data["channel"], message, thread=data["ts"])
@@ -664,7 +705,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Set the default branch:
         if not (self.make_repo_edit(data, user_data, repo, org, default_branch=branch)):
@@ -710,7 +751,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Change the protection status:
         try:
@@ -743,7 +784,7 @@ class GitHubPlugin(BotCommander):
         optional=[]
     )
     @auth()
-    @repo_must_exist()
+    @repo_must_exist(cached=True)
     def list_pull_requests_command(self, data, user_data, org, repo, state):
         """
         List the Pull Requests for a repo.
@@ -756,29 +797,19 @@ class GitHubPlugin(BotCommander):
         :param data:
         :return:
         """
-        # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
-
-        # Grab all PRs [All states]
-        pull_requests = self.get_repo_prs(data, user_data, repo, org, state)
-        if not pull_requests:
-            if isinstance(pull_requests, list):
-                send_info(data["channel"],
-                          "@{}: No matching pull requests were found in *{}*.".format(user_data["name"], repo),
-                          thread=data["ts"])
-            return
-
         headers = ["#PR", "Title", "Opened by", "Assignee", "State"]
 
-        rows = []
-        for pr in pull_requests:
-            assignee = pr['assignee']['login'] if pr['assignee'] is not None else '-'
-            rows.append([pr['number'], pr['title'], pr['user']['login'], assignee, pr['state'].title()])
+        def make_rows(pull_requests):
+            return ([pr['number'], pr['title'], pr['user']['login'],
+                     pr['assignee']['login'] if pr['assignee'] is not None else '-', pr['state'].title()]
+                    for pr in pull_requests)
 
-        # Done:
-        send_raw(data["channel"], text="Repository: *{}* \n\n```{}```".format(repo, tabulate(rows, headers=headers,
-                                                                                             tablefmt='orgtbl')),
-                 thread=data["ts"])
+        # Grab all PRs [All states]
+        self.send_cached_table(data, user_data, ("prs", org, repo, state),
+                               lambda: self.get_repo_prs(data, user_data, repo, org, state),
+                               lambda: self.get_repo_pull_requests_http(repo, org, state),
+                               "Repository: *{}*".format(repo), headers, make_rows,
+                               "@{}: No matching pull requests were found in *{}*.".format(user_data["name"], repo))
 
     @hubcommander_command(
         name="!ListKeys",
@@ -793,7 +824,7 @@ class GitHubPlugin(BotCommander):
         optional=[]
     )
     @auth()
-    @repo_must_exist()
+    @repo_must_exist(cached=True)
     def list_deploy_keys_command(self, data, user_data, org, repo):
         """
         List the Deploy Keys for a repo.
@@ -805,33 +836,18 @@ class GitHubPlugin(BotCommander):
         :param data:
         :return:
         """
-        # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
-
-        # Grab all Deploy Keys
-        deploy_keys = self.get_repo_deploy_keys(data, user_data, repo, org)
-
-        if not (deploy_keys):
-            if isinstance(deploy_keys, list):
-                send_info(data["channel"],
-                          "@{}: No deploy keys were found in *{}*.".format(user_data["name"], repo), thread=data["ts"])
-            return
-
         headers = ["ID#", "Title", "Read-only", "Created"]
 
-        rows = []
-        for key in deploy_keys:
-            # Set a default readonly state
-            readonly = 'True'
-            if not key['read_only']:
-                readonly = 'False'
-
-            rows.append([key['id'], key['title'], readonly, key['created_at']])
+        def make_rows(deploy_keys):
+            return ([key['id'], key['title'], 'True' if key['read_only'] else 'False', key['created_at']]
+                    for key in deploy_keys)
 
-        # Done:
-        send_raw(data["channel"], text="Deploy Keys: *{}* \n\n```{}```".format(repo, tabulate(rows, headers=headers,
-                                                                                              tablefmt='orgtbl')),
-                 thread=data["ts"])
+        # Grab all Deploy Keys
+        self.send_cached_table(data, user_data, ("keys", org, repo),
+                               lambda: self.get_repo_deploy_keys(data, user_data, repo, org),
+                               lambda: self.get_repo_deploy_keys_http(repo, org),
+                               "Deploy Keys: *{}*".format(repo), headers, make_rows,
+                               "@{}: No deploy keys were found in *{}*.".format(user_data["name"], repo))
 
     @hubcommander_command(
         name="!AddKey",
@@ -868,7 +884,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Add the Deploy Key
         result = self.add_repo_deploy_key(data, user_data, repo, org, title, pubkey, readonly)
@@ -884,6 +900,9 @@ class GitHubPlugin(BotCommander):
                        thread=data["ts"])
             return
 
+        # So that !ListKeys shows the new key:
+        self.read_cache.delete(("keys", org, repo))
+
         # Done:
         send_raw(data["channel"],
                  text="Deploy Key *{}* with ID *{}* successfully added to *{}*\n\n".format(result['title'],
@@ -918,7 +937,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Grab the Deploy Key (check that it exists)
         deploy_key = self.get_repo_deploy_key_by_id(data, user_data, repo, org, id)
@@ -942,6 +961,9 @@ class GitHubPlugin(BotCommander):
                       markdown=True, thread=data["ts"])
             return
 
+        # So that !ListKeys doesn't show the deleted key:
+        self.read_cache.delete(("keys", org, repo))
+
         # Done:
         send_raw(data["channel"], text="Deploy Key ID *{}* successfully deleted from *{}*\n\n".format(id, repo),
                  thread=data["ts"])
@@ -975,7 +997,7 @@ class GitHubPlugin(BotCommander):
         :return:
         """
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Grab the Deploy Key
         deploy_key = self.get_repo_deploy_key_by_id(data, user_data, repo, org, id)
@@ -1024,7 +1046,7 @@ class GitHubPlugin(BotCommander):
             topic_list = topics.split(",")
 
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
 
         # Set the topics:
         if self.set_repo_topics(data, user_data, org, repo, topic_list):
@@ -1040,7 +1062,78 @@ class GitHubPlugin(BotCommander):
                              "to the repo: {repo}".format(user_data["name"], topics=", ".join(topic_list), repo=repo),
                              markdown=True, thread=data["ts"])
 
-    def check_if_repo_exists(self, data, user_data, reponame, real_org):
+    def send_cached_table(self, data, user_data, key, fetch, refetch, title, headers, make_rows, empty_message):
+        """
+        Sends a table of what a read-only command fetches from GitHub. If there is a cached result, then that's sent
+        right away (so that the command doesn't wait on GitHub). If it's stale, then the table is marked with its
+        age, and the result is fetched again in the background. If it changed, then the table is updated in place.
+        :param data:
+        :param user_data:
+        :param key: The key for the result in the read cache.
+        :param fetch: Fetches the result, or returns False (after telling the user why) if it couldn't.
+        :param refetch: Fetches the result in the background. This raises if it can't.
+        :param title:
+        :param headers:
+        :param make_rows: Makes the table's rows from the result.
+        :param empty_message: Sent if there's nothing in the result.
+        :return:
+        """
+        reply = TableReply(data["channel"], title, headers, thread=data["ts"])
+
+        found = self.read_cache.lookup(key) if READ_CACHE_STALE_SECONDS else None
+        if found and found[0]:
+            result, age, stale = found
+            if not stale:
+                reply.send(make_rows(result))
+                return
+
+            reply.send(make_rows(result), "_(from {} ago -- checking GitHub for changes)_".format(format_age(age)))
+
+            def refresh():
+                fresh = refetch()
+                if fresh != result:
+                    reply.send(make_rows(fresh), "_(updated)_")
+
+                return fresh
+
+            self.read_cache.refresh(key, refresh)
+            return
+
+        # Output that we are doing work:
+        send_working(data, user_data)
+
+        result = fetch()
+        if not result:
+            if isinstance(result, list):
+                send_info(data["channel"], empty_message, thread=data["ts"])
+            return
+
+        if READ_CACHE_STALE_SECONDS:
+            self.read_cache.set(key, result)
+
+        # Done:
+        reply.send(make_rows(result))
+
+    def forget_repo_reads(self, org, repo):
+        """
+        Removes everything about the repo from the read cache.
+        :param org:
+        :param repo:
+        :return:
+        """
+        self.read_cache.delete(("repo", org, repo))
+        self.read_cache.delete(("keys", org, repo))
+        for state in self.commands["!ListPRs"]["permitted_states"]:
+            self.read_cache.delete(("prs", org, repo, state))
+
+    def check_if_repo_exists(self, data, user_data, reponame, real_org, cached=False):
+        # With `cached`, repos that were found recently are assumed to still exist (and are checked again in the
+        # background):
+        key = ("repo", real_org, reponame)
+        if cached and READ_CACHE_STALE_SECONDS and self.read_cache.get(
+                key, refresh=lambda: bool(self.check_gh_for_existing_repo(reponame, real_org))):
+            return True
+
         try:
             result = self.check_gh_for_existing_repo(reponame, real_org)
 
@@ -1050,6 +1143,9 @@ class GitHubPlugin(BotCommander):
                            thread=data["ts"])
                 return False
 
+            if READ_CACHE_STALE_SECONDS:
+                self.read_cache.set(key, True)
+
             return True
 
         except Exception as e:
@@ -1083,7 +1179,7 @@ class GitHubPlugin(BotCommander):
         }
         api_part = 'repos/{}/{}'.format(org, repo_to_check)
 
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 200:
             return json.loads(response.text)
@@ -1194,7 +1290,7 @@ class GitHubPlugin(BotCommander):
         }
         api_part = 'users/{}'.format(github_id)
 
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 404:
             return None
@@ -1225,7 +1321,7 @@ class GitHubPlugin(BotCommander):
 
         kwargs["name"] = repo
 
-        response = requests.patch(
+        response = self.session.patch(
             '{}{}'.format(GITHUB_URL, api_part),
             data=json.dumps(kwargs),
             headers=headers,
@@ -1254,7 +1350,7 @@ class GitHubPlugin(BotCommander):
 
         api_part = 'repos/{}/{}/pulls?state={}'.format(org, repo, state)
 
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 200:
             return response.json()
@@ -1282,8 +1378,8 @@ class GitHubPlugin(BotCommander):
 
         api_part = 'repos/{}/{}/topics'.format(org, repo)
 
-        response = requests.put('{}{}'.format(GITHUB_URL, api_part), data=json.dumps(data),
-                                headers=headers, timeout=10)
+        response = self.session.put('{}{}'.format(GITHUB_URL, api_part), data=json.dumps(data),
+                                    headers=headers, timeout=10)
 
         if response.status_code != 200:
             message = 'An error was encountered communicating with GitHub: Status Code: {}' \
@@ -1313,7 +1409,8 @@ class GitHubPlugin(BotCommander):
 
         # Add the outside collab to the repo:
         api_part = 'repos/{}/{}/collaborators/{}'.format(real_org, repo_name, outside_collab_id)
-        response = requests.put('{}{}'.format(GITHUB_URL, api_part), data=json.dumps(data), headers=headers, timeout=10)
+        response = self.session.put('{}{}'.format(GITHUB_URL, api_part), data=json.dumps(data), headers=headers,
+                                    timeout=10)
 
         # GitHub response code flakiness...
         if response.status_code not in [201, 204]:
@@ -1327,9 +1424,9 @@ class GitHubPlugin(BotCommander):
 
         # Add the outside collab to the repo:
         api_part = 'repos/{}/{}/collaborators/{}'.format(real_org, repo_name, outside_collab_id)
-        response = requests.delete('{}{}'.format(GITHUB_URL, api_part),
-                                   headers=headers,
-                                   timeout=10)
+        response = self.session.delete('{}{}'.format(GITHUB_URL, api_part),
+                                       headers=headers,
+                                       timeout=10)
 
         # GitHub response code flakiness...
         if response.status_code not in [201, 204]:
@@ -1348,7 +1445,7 @@ class GitHubPlugin(BotCommander):
             "has_wiki": True
         }
 
-        response = requests.post(
+        response = self.session.post(
             '{}{}'.format(GITHUB_URL, api_part),
             data=json.dumps(data),
             headers=headers,
@@ -1368,7 +1465,7 @@ class GitHubPlugin(BotCommander):
         }
         api_part = 'repos/{org}/{repo}'.format(org=org, repo=repo_to_delete)
 
-        response = requests.delete(
+        response = self.session.delete(
             '{}{}'.format(GITHUB_URL, api_part),
             headers=headers,
             timeout=10
@@ -1390,7 +1487,7 @@ class GitHubPlugin(BotCommander):
             "permission": permission
         }
 
-        response = requests.put(
+        response = self.session.put(
             '{}{}'.format(GITHUB_URL, api_part),
             data=json.dumps(data),
             headers=headers,
@@ -1410,7 +1507,7 @@ class GitHubPlugin(BotCommander):
         }
         api_part = 'repos/{}/{}/branches/{}'.format(org, repo, branch)
 
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 200:
             return True
@@ -1437,7 +1534,7 @@ class GitHubPlugin(BotCommander):
                 "required_pull_request_reviews": None,
                 "restrictions": None
             }
-            response = requests.put('{}{}'.format(GITHUB_URL, api_part), json=data, headers=headers, timeout=10)
+            response = self.session.put('{}{}'.format(GITHUB_URL, api_part), json=data, headers=headers, timeout=10)
 
             if response.status_code != 200:
                 message = 'An error was encountered communicating with GitHub: Status Code: {}' \
@@ -1445,7 +1542,7 @@ class GitHubPlugin(BotCommander):
                 raise requests.exceptions.RequestException(message)
 
         else:
-            response = requests.delete('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+            response = self.session.delete('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
             if response.status_code != 204:
                 message = 'An error was encountered communicating with GitHub: Status Code: {}' \
@@ -1465,7 +1562,7 @@ class GitHubPlugin(BotCommander):
             'Accept': GITHUB_VERSION
         }
         api_part = 'orgs/{}/members/{}'.format(org, user["login"])
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         # Per GitHub API, if 204, then already a member; if 404, then not a member:
         if response.status_code == 204:
@@ -1496,7 +1593,7 @@ class GitHubPlugin(BotCommander):
 
         # Retrieve a users membership details.
         api_part = 'orgs/{}/teams/{}/memberships/{}'.format(org, team_name, github_id)
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 200:
             return True
@@ -1516,12 +1613,33 @@ class GitHubPlugin(BotCommander):
 
         # Add the GitHub user to the team:
         api_part = 'orgs/{}/teams/{}/memberships/{}'.format(org, team, username)
-        response = requests.put('{}{}'.format(GITHUB_URL, api_part), data=json.dumps(data), headers=headers, timeout=10)
+        response = self.session.put('{}{}'.format(GITHUB_URL, api_part), data=json.dumps(data), headers=headers,
+                                    timeout=10)
 
         if response.status_code != 200:
             raise ValueError("GitHub Problem: Adding to team, status code: {}".format(response.status_code))
 
     def find_team_id_by_name(self, org, team_name):
+        """
+        Looks up the ID of a team from its slug. The team index for the org is cached, and reloaded if the team
+        isn't in it (in case the team was made after it was loaded).
+        :param org:
+        :param team_name:
+        :return: The team ID, or False if there is no such team.
+        """
+        teams = self.team_index.get(org, refresh=lambda: self.load_team_index(org))
+        if teams is None or team_name not in teams:
+            teams = self.load_team_index(org)
+            self.team_index.set(org, teams)
+
+        return teams.get(team_name, False)
+
+    def load_team_index(self, org):
+        """
+        Fetches all the teams in the organization.
+        :param org:
+        :return: A dict of the team slug to the team ID.
+        """
         headers = {
             'Authorization': 'token {}'.format(self.token),
             'Accept': GITHUB_VERSION
@@ -1530,23 +1648,22 @@ class GitHubPlugin(BotCommander):
         # Get all teams inside the organization:
         api_part = 'orgs/{}/teams'.format(org)
         url = '{}{}'.format(GITHUB_URL, api_part)
+        teams = {}
 
         while True:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.session.get(url, headers=headers, timeout=10)
 
             if response.status_code != 200:
                 raise ValueError("GitHub Problem: Could not list teams -- received error code: {}"
                                  .format(response.status_code))
 
-            # Check if the provided team_name belongs to a team inside the organization:
             for x in response.json():
-                if x["slug"] == team_name:
-                    return x["id"]
+                teams[x["slug"]] = x["id"]
 
             if "next" in response.links:
                 url = response.links["next"]["url"]
             else:
-                return False
+                return teams
 
     def get_repo_deploy_keys_http(self, repo, org, **kwargs):
         """
@@ -1564,7 +1681,7 @@ class GitHubPlugin(BotCommander):
 
         api_part = 'repos/{}/{}/keys'.format(org, repo)
 
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 200:
             return response.json()
@@ -1590,7 +1707,7 @@ class GitHubPlugin(BotCommander):
 
         api_part = 'repos/{}/{}/keys/{}'.format(org, repo, deploy_key_id)
 
-        response = requests.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.get('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 200:
             return response.json()
@@ -1627,7 +1744,7 @@ class GitHubPlugin(BotCommander):
             "read_only": readonly
         }
 
-        response = requests.post(
+        response = self.session.post(
             '{}{}'.format(GITHUB_URL, api_part),
             data=json.dumps(data),
             headers=headers,
@@ -1661,7 +1778,7 @@ class GitHubPlugin(BotCommander):
 
         api_part = 'repos/{}/{}/keys/{}'.format(org, repo, key_id)
 
-        response = requests.delete('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
+        response = self.session.delete('{}{}'.format(GITHUB_URL, api_part), headers=headers, timeout=10)
 
         if response.status_code == 204:
             return True
@@ -9,15 +9,12 @@
 import json
 import time
 
-import requests
-
 from hubcommander.bot_components.bot_classes import BotCommander
 from hubcommander.bot_components.decorators import hubcommander_command, auth
-from hubcommander.bot_components.slack_comm import send_error, send_info, send_success
+from hubcommander.bot_components.http import UpstreamSession
+from hubcommander.bot_components.slack_comm import send_info, send_working, Reply
 from hubcommander.bot_components.parse_functions import extract_repo_name, ParseException
 
-from tabulate import tabulate
-
 from .config import USER_COMMAND_DICT, USER_AGENT, ORGS
 
 
@@ -40,6 +37,9 @@ def lookup_real_org(plugin_obj, org, **kwargs):
 
 
 class TravisPlugin(BotCommander):
+    depends_on = ["github"]
+    upstreams = ["Travis CI", "GitHub"]
+
     def __init__(self):
         super().__init__()
 
@@ -49,6 +49,8 @@ class TravisPlugin(BotCommander):
                 "func": self.list_org_command,
                 "user_data_required": False,
                 "help": "Lists the GitHub organizations that have Travis CI enabled.",
+                "read_only": True,
+                "cheap": True,
                 "enabled": True
             },
             "!EnableTravis": {
@@ -65,6 +67,8 @@ class TravisPlugin(BotCommander):
 
         self.credentials = None
 
+        self.session = UpstreamSession("Travis CI", resources=["user", "sync", "repo", "activate"])
+
     def setup(self, secrets, **kwargs):
         # GitHub is a dependency:
         from hubcommander.command_plugins.enabled_plugins import COMMAND_PLUGINS
@@ -107,6 +111,8 @@ class TravisPlugin(BotCommander):
         :param data:
         :return:
         """
+        from tabulate import tabulate   # Only this command needs it, so it's imported when it's first used.
+
         headers = ["Alias", "Organization"]
         rows = []
         for org in ORGS.items():
@@ -147,57 +153,51 @@ class TravisPlugin(BotCommander):
         github_plugin = COMMAND_PLUGINS["github"]
 
         # Output that we are doing work:
-        send_info(data["channel"], "@{}: Working, Please wait...".format(user_data["name"]), thread=data["ts"])
+        send_working(data, user_data)
+
+        # All the progress messages (and the result) are shown as one message that is updated in place:
+        reply = Reply(data["channel"], thread=data["ts"])
 
         # Get the repo information from GitHub:
         try:
             repo_result = github_plugin.check_gh_for_existing_repo(repo, org)
 
             if not repo_result:
-                send_error(data["channel"],
-                           "@{}: This repository does not exist in {}!".format(user_data["name"], org),
-                           thread=data["ts"])
+                reply.error("@{}: This repository does not exist in {}!".format(user_data["name"], org))
                 return
 
         except Exception as e:
-            send_error(data["channel"],
-                       "@{}: I encountered a problem:\n\n{}".format(user_data["name"], e), thread=data["ts"])
+            reply.error("@{}: I encountered a problem:\n\n{}".format(user_data["name"], e))
             return
 
         which = "public" if (public and public.lower() == 'true') else "pro"
 
         try:
             # Sync with Travis CI so that it knows about the repo:
-            send_info(data["channel"], ":skull: Need to sync Travis CI with GitHub. Please wait...", thread=data["ts"])
+            reply.info(":skull: Need to sync Travis CI with GitHub. Please wait...")
             self.sync_with_travis(which)
 
-            send_info(data["channel"], ":guitar: Synced! Going to enable Travis CI on the repo now...",
-                      thread=data["ts"])
+            reply.info(":guitar: Synced! Going to enable Travis CI on the repo now...")
 
             travis_data = self.look_for_repo(which, repo_result)
             if not travis_data:
-                send_error(data["channel"], "@{}: Couldn't find the repo in Travis for some reason...\n\n".format(
-                    user_data["name"]), thread=data["ts"])
+                reply.error("@{}: Couldn't find the repo in Travis for some reason...\n\n".format(user_data["name"]))
                 return
 
             # Is it already enabled?
             if travis_data["active"]:
-                send_success(data["channel"],
-                             "@{}: Travis CI is already enabled on {}/{}.\n\n".format(
-                                 user_data["name"], org, repo), thread=data["ts"])
+                reply.success("@{}: Travis CI is already enabled on {}/{}.\n\n".format(user_data["name"], org, repo))
                 return
 
             # Enable it:
             self.enable_travis_on_repo(which, repo_result)
 
         except Exception as e:
-            send_error(data["channel"],
-                       "@{}: I encountered a problem communicating with Travis CI:\n\n{}".format(user_data["name"], e),
-                       thread=data["ts"])
+            reply.error("@{}: I encountered a problem communicating with Travis CI:\n\n{}".format(user_data["name"], e))
             return
 
         message = "@{}: Travis CI has been enabled on {}/{}.\n\n".format(user_data["name"], org, repo)
-        send_success(data["channel"], message, thread=data["ts"])
+        reply.success(message)
 
     def sync_with_travis(self, which):
         """
@@ -205,18 +205,18 @@ class TravisPlugin(BotCommander):
         :param which:
         :return:
         """
-        result = requests.post("{base}/user/{userid}/sync".format(base=TRAVIS_URLS[which],
-                                                                  userid=self.credentials[which]["id"]),
-                               headers=self._make_headers(which))
+        result = self.session.post("{base}/user/{userid}/sync".format(base=TRAVIS_URLS[which],
+                                                                      userid=self.credentials[which]["id"]),
+                                   headers=self._make_headers(which), timeout=10)
         if result.status_code != 200:
             raise TravisCIException("Travis CI Status Code: {}".format(result.status_code))
 
         time.sleep(2)  # Eventual consistency issues may exist?
 
         while True:
-            response = requests.get("{base}/user/{userid}".format(base=TRAVIS_URLS[which],
-                                                                  userid=self.credentials[which]["id"]),
-                                    headers=self._make_headers(which))
+            response = self.session.get("{base}/user/{userid}".format(base=TRAVIS_URLS[which],
+                                                                      userid=self.credentials[which]["id"]),
+                                        headers=self._make_headers(which), timeout=10)
             if response.status_code != 200:
                 raise TravisCIException("Sync Status Code: {}".format(response.status_code))
 
@@ -234,9 +234,9 @@ class TravisPlugin(BotCommander):
         :param repo_dict:
         :return:
         """
-        result = requests.get("{base}/repo/{id}".format(base=TRAVIS_URLS[which],
-                                                        id=repo_dict["full_name"].replace("/", "%2F")),
-                              headers=self._make_headers(which))
+        result = self.session.get("{base}/repo/{id}".format(base=TRAVIS_URLS[which],
+                                                            id=repo_dict["full_name"].replace("/", "%2F")),
+                                  headers=self._make_headers(which), timeout=10)
 
         if result.status_code == 404:
             return None
@@ -253,9 +253,9 @@ class TravisPlugin(BotCommander):
         :param repo_dict:
         :return:
         """
-        result = requests.post("{base}/repo/{repo}/activate".format(base=TRAVIS_URLS[which],
-                                                                    repo=repo_dict["full_name"].replace("/", "%2F")),
-                               headers=self._make_headers(which))
+        repo = repo_dict["full_name"].replace("/", "%2F")
+        result = self.session.post("{base}/repo/{repo}/activate".format(base=TRAVIS_URLS[which], repo=repo),
+                                   headers=self._make_headers(which), timeout=10)
 
         if result.status_code != 200:
             raise TravisCIException("Enable Repo Status Code: {}".format(result.status_code))
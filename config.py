@@ -1,4 +1,6 @@
 
+import os
+
 ONLY_LISTEN = [
     #"SLACKROOM_ID_HERE"
 ]
@@ -7,6 +9,134 @@ IGNORE_ROOMS = [
     #"SLACKROOM_ID_HERE"
 ]
 
+# How commands are received from Slack. One of:
+#   "rtm"    - Over the RTM connection (every message in every channel that HubCommander is in).
+#   "events" - Over the Events API, on an HTTP server that listens on EVENTS_API_PORT. Needs the
+#              SLACK_SIGNING_SECRET credential.
+#   "socket" - Over Socket Mode. Needs the SLACK_APP_TOKEN credential (an app-level token).
+# With "events" and "socket", Slack only sends the events that the Slack app is subscribed to (like `app_mention`).
+INGESTION = "rtm"
+EVENTS_API_PORT = 3000
+
+# The number of worker processes to run commands in. With 0, commands are run in the same process
+# that reads messages from Slack. Each worker process runs the setup() for all the plugins (but not the
+# background Slack sender, the cache snapshots, or the warm-up, which only run in the main process).
+WORKER_PROCESSES = 0
+
+# The number of threads for running commands. With 0, commands are run one at a time as they arrive.
+SCHEDULER_THREADS = 0
+
+# With the scheduler running, commands are placed into lanes. Commands marked as "cheap" in the plugin's command
+# config go into the "fast" lane, commands marked as "read_only" go into the "read" lane (or the "slow" lane, if
+# there isn't a "read" lane), and everything else goes into the "slow" lane. Shared threads take turns
+# between the lanes according to the weights, and each lane can reserve threads that only run its commands.
+COMMAND_LANES = {
+    "fast": {"weight": 4, "reserved_threads": 1},
+    "read": {"weight": 2, "reserved_threads": 0},
+    "slow": {"weight": 1, "reserved_threads": 0},
+}
+
+# Limits on how quickly commands can be sent. Each Slack user (and each channel) gets a bucket that holds up to
+# "burst" commands, and is refilled at "rate" commands per second. Commands over the limit are rejected with a
+# message that says how long to wait. Set to None to disable.
+# For example, to permit bursts of 5 commands, and then 1 command every 10 seconds per user:
+# USER_RATE_LIMIT = {"rate": 0.1, "burst": 5}
+USER_RATE_LIMIT = None
+CHANNEL_RATE_LIMIT = None
+
+# If the same user sends the same command in the same channel while it's still running (or within this many
+# seconds after it finished), then the copy is not run again. Set to None to disable.
+DUPLICATE_COMMAND_WINDOW = 5
+
+# Send messages to Slack from a background thread, so that commands don't wait on Slack. Messages to a channel
+# are sent in order, no more than once every SLACK_CHANNEL_SEND_INTERVAL seconds. Rate limited messages are
+# retried after backing off (for 1 second, then 2, then 4, and so on).
+SLACK_SEND_IN_BACKGROUND = True
+SLACK_CHANNEL_SEND_INTERVAL = 1.0
+
+# Commands only post their "Working, Please wait..." if they are still running after this many seconds. Set to
+# None to always post it right away. To add a reaction to the command's message instead of posting a message, set
+# WORKING_REACTION to the name of the emoji, like "hourglass_flowing_sand".
+WORKING_DELAY = 2.0
+WORKING_REACTION = None
+
+# How long the Slack users' info (which commands use for the user's name, and auth plugins for their email) is
+# cached for, in seconds. Set to None to fetch it for every command.
+SLACK_USER_CACHE_SECONDS = 300
+
+# Where the caches are kept. With "memory", each process has its own. With "sqlite", the worker processes (and
+# replicas on the same host) share them. With "redis" (which needs the `redis` package), all the replicas share them.
+# CACHE_BACKEND = {"type": "sqlite", "path": "/var/lib/hubcommander/cache.db"}
+# CACHE_BACKEND = {"type": "redis", "url": "redis://localhost:6379/0"}
+CACHE_BACKEND = {"type": "memory"}
+
+# Warm up the plugins in the background on startup (without holding up connecting to Slack), so that the first
+# commands don't pay for opening connections and filling caches. For example, the GitHub plugin opens its
+# connection to GitHub and loads the teams for all the orgs. The Slack users in WARM_UP_SLACK_USERS (like the
+# people who run the most commands) have their info loaded too.
+WARM_UP = False
+WARM_UP_SLACK_USERS = [
+    #"SLACK_USER_ID_HERE"
+]
+
+# Path to a SQLite database that the in-memory caches are saved to every CACHE_SNAPSHOT_INTERVAL seconds (and on
+# exit). They are loaded from it on startup, so that a restart doesn't need to fetch everything from GitHub and Slack
+# again. (The "sqlite" and "redis" cache backends keep their entries across restarts already.)
+# Loaded entries are used right away, and are fetched again in the background the first time that they're used.
+CACHE_SNAPSHOT_PATH = None
+CACHE_SNAPSHOT_INTERVAL = 300
+
+# Circuit breakers for the services that HubCommander calls ("GitHub", "Travis CI", "Slack", and "Duo"). If at least
+# "minimum_calls" are made to a service within "window" seconds, and "failure_ratio" of them fail (or take longer than
+# "slow_seconds"), then the breaker opens: commands that need the service fail right away with a message, rather than
+# waiting on it. After "open_seconds", a single call is let through; if it works, the breaker closes again. The
+# "default" settings can be overridden for each service. Set to None to disable.
+CIRCUIT_BREAKERS = {
+    "default": {"failure_ratio": 0.5, "minimum_calls": 5, "window": 60, "slow_seconds": 9, "open_seconds": 30},
+    "Duo": {"slow_seconds": None},   # Duo waits for people to approve their pushes.
+}
+
+# Timeouts for the GETs to GitHub and Travis CI that are worked out from how long each kind of call (like
+# "GET repos/*/*/pulls") has taken recently: "multiplier" times the 99th percentile, but no less than "min_seconds"
+# (and no more than the usual 10 seconds). The usual timeouts are used until "min_samples" calls of a kind have been
+# made, and always for calls that change something (like POSTs). Set to None to always use the usual timeouts.
+ADAPTIVE_TIMEOUTS = {"multiplier": 3, "min_seconds": 2, "min_samples": 20}
+
+# If a GET is slower than the 95th percentile for its kind of call, then send a second copy of it, and use whichever
+# answers first. This cuts down on the slowest lookups (like checking if a repo exists). Needs ADAPTIVE_TIMEOUTS.
+HEDGED_GETS = False
+
+# Calls to GitHub and Travis CI that fail with a 502, 503, or 504 (or a connection error, or a timeout) are retried,
+# but only if they are safe to send again (GETs, HEADs, PUTs, and DELETEs; never POSTs or PATCHes). Each call is tried
+# up to "max_attempts" times, with a random delay of up to "base_delay" * 2^attempt seconds (capped at "max_delay")
+# between tries. So that retries don't pile onto a service that's already struggling, each command can only make
+# "per_command" retries, and each process only retries "budget_ratio" of its calls (plus "min_per_second").
+# Set to None to disable.
+RETRY_POLICY = {"max_attempts": 3, "base_delay": 0.2, "max_delay": 2, "per_command": 5, "budget_ratio": 0.1,
+                "min_per_second": 1}
+
+# Serve metrics for Prometheus on http://METRICS_HOST:METRICS_PORT/metrics: the number of commands (and errors), how
+# long each command's phases took (parse, auth, precondition, execution, and slack_send), and how long the calls to
+# GitHub and Travis CI took, by host and status code. With WORKER_PROCESSES, the commands' metrics are kept in the
+# workers, and are not served. Set METRICS_PORT to None to disable.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None
+
+# Path to a file that trace spans are appended to, as lines of JSON. Each command gets a trace (with an ID that's
+# worked out from the Slack message's channel and "ts"), with spans for parsing its arguments, each of its stages (like
+# auth and the checks that a repo exists), running it, and each call to GitHub, Travis CI, and Slack that it makes.
+# Set to None to disable.
+TRACING_PATH = None
+
+# For running more than one replica of HubCommander. Each replica only executes commands for the channels in its
+# shard. Every replica should have the same SHARD_COUNT, and a different SHARD_INDEX (0 to SHARD_COUNT - 1).
+SHARD_COUNT = 1
+SHARD_INDEX = int(os.environ.get("HUBCOMMANDER_SHARD_INDEX", 0))
+
+# Path to a SQLite database that is shared by all the replicas. Each message is leased in here by the
+# replica that executes it, so that a message is never executed twice.
+LEASE_DATABASE = None
+LEASE_SECONDS = 300
 
 # For using AWS KMS for credential management:
 # KMS_REGION = "us-west-2"
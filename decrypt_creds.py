@@ -27,6 +27,10 @@ def get_credentials():
         # "TRAVIS_PUBLIC_ID": os.environ.get("TRAVIS_PUBLIC_ID"),
         # "TRAVIS_PUBLIC_TOKEN": os.environ.get("TRAVIS_PUBLIC_TOKEN"),
 
+        # For receiving commands over the Events API or Socket Mode (see INGESTION in config.py):
+        # "SLACK_SIGNING_SECRET": os.environ.get("SLACK_SIGNING_SECRET"),
+        # "SLACK_APP_TOKEN": os.environ.get("SLACK_APP_TOKEN"),
+
         # DUO_...NAME_OF_DUO_CRED: "domain-that-is-duod.com,duo_host,duo_ikey,duo_skey"
 
         # ADD MORE HERE...
@@ -6,12 +6,26 @@
 
 .. moduleauthor:: Mike Grima <mgrima@netflix.com>
 """
+import atexit
+import math
+import sys
+
 from rtmbot.core import Plugin
+from slackclient import SlackClient
 
 from hubcommander.auth_plugins.enabled_plugins import AUTH_PLUGINS
-from hubcommander.bot_components.slack_comm import get_user_data, send_error, send_info
+from hubcommander.bot_components import admission, cache, circuit_breaker, dedup, http, metrics, pipeline, \
+    plugin_setup, rate_limit, retry, scheduler, sharding, tracing, workers
+from hubcommander.bot_components.event_loop import resolve
+from hubcommander.bot_components.slack_comm import get_user_data, send_error, send_info, start_outbound_queue, \
+    configure_working, finish_working, configure_user_cache, prefetch_users, watch_for_errors
 from hubcommander.command_plugins.enabled_plugins import COMMAND_PLUGINS
-from hubcommander.config import IGNORE_ROOMS, ONLY_LISTEN
+from hubcommander.config import IGNORE_ROOMS, ONLY_LISTEN, WORKER_PROCESSES, SHARD_COUNT, SHARD_INDEX, \
+    LEASE_DATABASE, LEASE_SECONDS, SCHEDULER_THREADS, COMMAND_LANES, USER_RATE_LIMIT, CHANNEL_RATE_LIMIT, \
+    DUPLICATE_COMMAND_WINDOW, SLACK_SEND_IN_BACKGROUND, SLACK_CHANNEL_SEND_INTERVAL, WORKING_DELAY, WORKING_REACTION, \
+    INGESTION, EVENTS_API_PORT, SLACK_USER_CACHE_SECONDS, WARM_UP, WARM_UP_SLACK_USERS, CACHE_SNAPSHOT_PATH, \
+    CACHE_SNAPSHOT_INTERVAL, CACHE_BACKEND, CIRCUIT_BREAKERS, ADAPTIVE_TIMEOUTS, HEDGED_GETS, \
+    RETRY_POLICY, METRICS_HOST, METRICS_PORT, TRACING_PATH
 from hubcommander.decrypt_creds import get_credentials
 
 HELP_TEXT = []
@@ -29,31 +43,127 @@ def print_help(data):
 
 
 COMMANDS = {
-    "!help": {"func": print_help, "user_data_required": False},
+    "!help": {"func": print_help, "user_data_required": False, "read_only": True, "cheap": True},
 }
 
+# Picks the commands out of the messages from Slack. This is rebuilt once all the commands are registered:
+ADMISSION_FILTER = admission.AdmissionFilter(COMMANDS, IGNORE_ROOMS, ONLY_LISTEN)
+
 
 class HubCommander(Plugin):
     def __init__(self, **kwargs):
         super(HubCommander, self).__init__(**kwargs)
         setup(self.slack_client)
 
+        if WORKER_PROCESSES:
+            print("[-->] Starting {} worker processes".format(WORKER_PROCESSES))
+            workers.start_workers(WORKER_PROCESSES, worker_setup)
+
+        if SCHEDULER_THREADS:
+            print("[-->] Starting the command scheduler with {} threads".format(SCHEDULER_THREADS))
+            scheduler.start_scheduler(SCHEDULER_THREADS, COMMAND_LANES)
+
+        if INGESTION != "rtm":
+            from hubcommander.bot_components import ingestion
+
+            print("[-->] Receiving commands over: {}".format(INGESTION))
+            ingestion.start_listener(INGESTION, get_credentials(), self.handle_message, EVENTS_API_PORT)
+
+        if METRICS_PORT:
+            print("[-->] Serving metrics on http://{}:{}/metrics".format(METRICS_HOST, METRICS_PORT))
+            metrics.start_server(METRICS_HOST, METRICS_PORT)
+
     def process_message(self, data):
         """
         The Slack Bot's only required method -- checks if the message involves this bot.
         :param data:
         :return:
         """
-        if data["channel"] in IGNORE_ROOMS:
+        # Messages come in over the Events API or Socket Mode instead:
+        if INGESTION != "rtm":
             return
 
-        if len(ONLY_LISTEN) > 0 and data["channel"] not in ONLY_LISTEN:
+        self.handle_message(data)
+
+    def handle_message(self, data):
+        """
+        Checks if the message is a command, and runs it. This is where messages end up, no matter how they
+        were received from Slack.
+        :param data:
+        :return:
+        """
+        # Only process if it starts with one of our GitHub commands (in a room that we listen to):
+        command_prefix = ADMISSION_FILTER.match(data)
+        if not command_prefix:
+            return
+
+        # Is this replica responsible for the channel?
+        if not sharding.owns_channel(data["channel"]):
+            return
+
+        if not sharding.claim_message(data):
             return
 
-        # Only process if it starts with one of our GitHub commands:
-        command_prefix = data["text"].split(" ")[0].lower()
-        if COMMANDS.get(command_prefix):
-            process_the_command(data, command_prefix)
+        # This is checked before looking for duplicates, so that sending a rejected command again isn't a duplicate:
+        if not admit_the_command(data):
+            return
+
+        # Copies of a command that is already running (or that just finished successfully) are attached to that
+        # execution:
+        _, original_ts = dedup.submit(data, dispatch_the_command, data, command_prefix)
+        if original_ts and original_ts != data.get("ts"):
+            send_info(data["channel"], "<@{}>: You just sent this same command, so I am only going to run it "
+                                       "once.".format(data.get("user")), ephemeral_user=data.get("user"))
+
+
+def admit_the_command(data):
+    """
+    Checks the rate limits for the command.
+    :param data:
+    :return: True if the command is within them.
+    """
+    # Is the user (or channel) sending too many commands?
+    wait = rate_limit.admit(data)
+    if wait:
+        send_error(data["channel"], "<@{}>: You are sending commands too quickly. Please wait {} seconds "
+                                    "before trying again.".format(data.get("user"), math.ceil(wait)),
+                   ephemeral_user=data.get("user"))
+        return False
+
+    return True
+
+
+def dispatch_the_command(data, command_prefix):
+    """
+    Hands the command off to be executed, based on how HubCommander is configured to run commands.
+
+    With the scheduler running, the command is placed into its lane, and is run by one of the scheduler's threads
+    (in a worker process, if those are enabled). Otherwise, it's handed straight to a worker process, or run right
+    here.
+    :param data:
+    :param command_prefix:
+    :return: A future for the command's execution.
+    """
+    if workers.WORKER_POOL and not scheduler.SCHEDULER:
+        return workers.dispatch(process_the_command, data, command_prefix)
+
+    lane = scheduler.lane_for_command(COMMANDS[command_prefix])
+    future = scheduler.submit(lane, execute_the_command, data, command_prefix)
+    future.add_done_callback(report_failure)
+
+    return future
+
+
+def execute_the_command(data, command_prefix):
+    if workers.WORKER_POOL:
+        return workers.dispatch(process_the_command, data, command_prefix).result()
+
+    return process_the_command(data, command_prefix)
+
+
+def report_failure(future):
+    if not future.cancelled() and future.exception():
+        print("[X] Encountered an error while running a command: {}".format(future.exception()))
 
 
 def process_the_command(data, command_prefix):
@@ -64,46 +174,124 @@ def process_the_command(data, command_prefix):
     :param command_prefix:
     :return:
     """
+    # Everything that the command does is traced under its Slack message:
+    with tracing.trace_message(data, command_prefix, command=command_prefix):
+        return run_the_command(data, command_prefix)
+
+
+def run_the_command(data, command_prefix):
+    """
+    :return: True if the command succeeded: it didn't raise an exception, return False, or send an error.
+    """
     # Reach out to slack to get the user's information:
     user_data, error = get_user_data(data)
     if error:
         send_error(data["channel"], "ERROR: Unable to communicate with the Slack API. Error:\n{}".format(error))
-        return
+        return False
+
+    # Don't bother if something that the command needs is down:
+    unavailable = circuit_breaker.open_breakers(command_upstreams(COMMANDS[command_prefix]))
+    if unavailable:
+        send_error(data["channel"], "@{}: {} isn't responding right now. Please try again in {:.0f}s.".format(
+            user_data["name"], " and ".join(breaker.name for breaker in unavailable),
+            max(breaker.retry_in() for breaker in unavailable)), thread=data["ts"])
+        finish_working(data)
+        return False
+
+    # Execute the message (with its own retry budget, so that a command can't retry forever):
+    try:
+        with watch_for_errors() as errors, metrics.track_command(command_prefix) as tracked, retry.command_budget():
+            # Commands can be `async def`, in which case they are run on the event loop:
+            if COMMANDS[command_prefix]["user_data_required"]:
+                result = resolve(COMMANDS[command_prefix]["func"](data, user_data))
+
+            else:
+                result = resolve(COMMANDS[command_prefix]["func"](data))
 
-    # Execute the message:
-    if COMMANDS[command_prefix]["user_data_required"]:
-        COMMANDS[command_prefix]["func"](data, user_data)
+            # Commands (and the checks before them, like whether the repo exists) report most problems by sending an
+            # error (and returning False), rather than by raising an exception:
+            tracked.failed = result is False or bool(errors)
 
-    else:
-        COMMANDS[command_prefix]["func"](data)
+        return not tracked.failed
+
+    finally:
+        finish_working(data)
+
+
+def command_upstreams(command):
+    """
+    :param command:
+    :return: The names of the services that the command calls (for the plugin that it's from, and its auth plugin).
+    """
+    plugin = getattr(command["func"], "__self__", None)
+    auth_plugin = command.get("auth", {}).get("plugin")
+    return getattr(plugin, "upstreams", []) + getattr(auth_plugin, "upstreams", [])
 
 
-def setup(slackclient):
+def worker_setup():
+    """
+    This is called once in each worker process (see `WORKER_PROCESSES` in config.py).
+
+    Workers are separate interpreters, so each one needs its own Slack client, and needs to run the `setup()` for
+    all the plugins.
+    :return:
+    """
+    setup(SlackClient(get_credentials()["SLACK"]), worker=True)
+
+
+def setup(slackclient, worker=False):
     """
     This is called by the Slack RTM Bot to initialize the plugin.
 
     This contains code to load all the secrets that are used by all the other services.
+    :param slackclient:
+    :param worker: True in the worker processes. These only run commands, so they skip the things that the main
+                   process already does: the outbound queue, the cache snapshots, and the warm-up.
     :return:
     """
+    global ADMISSION_FILTER
+
     # Need to open the secrets file:
     secrets = get_credentials()
 
     from . import bot_components
     bot_components.SLACK_CLIENT = slackclient
 
+    if SLACK_SEND_IN_BACKGROUND and not worker:
+        start_outbound_queue(SLACK_CHANNEL_SEND_INTERVAL)
+
+    configure_working(WORKING_DELAY, WORKING_REACTION)
+    cache.configure_backend(CACHE_BACKEND)
+    circuit_breaker.configure(CIRCUIT_BREAKERS)
+    http.configure(ADAPTIVE_TIMEOUTS, HEDGED_GETS)
+    retry.configure(RETRY_POLICY)
+    tracing.configure(TRACING_PATH)
+    if metrics.observe_stage not in pipeline.TIMING_HOOKS:
+        pipeline.add_timing_hook(metrics.observe_stage)
+    configure_user_cache(SLACK_USER_CACHE_SECONDS)
+
+    rate_limit.configure(USER_RATE_LIMIT, CHANNEL_RATE_LIMIT)
+    dedup.configure(DUPLICATE_COMMAND_WINDOW)
+
+    if SHARD_COUNT > 1 or LEASE_DATABASE:
+        lease_store = sharding.SQLiteLeaseStore(LEASE_DATABASE, LEASE_SECONDS) if LEASE_DATABASE else None
+        sharding.configure(SHARD_COUNT, SHARD_INDEX, lease_store)
+        print("[+] This replica is shard {} of {}.".format(SHARD_INDEX + 1, SHARD_COUNT))
+
     print("[-->] Enabling Auth Plugins")
-    for name, plugin in AUTH_PLUGINS.items():
-        print("\t[ ] Enabling Auth Plugin: {}".format(name))
-        plugin.setup(secrets)
+    auth_timings = plugin_setup.setup_plugins(AUTH_PLUGINS, secrets)
+    for name in AUTH_PLUGINS:
         print("\t[+] Successfully enabled auth plugin \"{}\"".format(name))
     print("[✔] Completed enabling auth plugins plugins.")
 
     print("[-->] Enabling Command Plugins")
 
+    # The plugins are set up at the same time (except for those that depend on others):
+    command_timings = plugin_setup.setup_plugins(COMMAND_PLUGINS, secrets)
+
     # Register the command_plugins plugins:
     for name, plugin in COMMAND_PLUGINS.items():
         print("[ ] Enabling Command Plugin: {}".format(name))
-        plugin.setup(secrets)
         for cmd in plugin.commands.values():
             if cmd["enabled"]:
                 print("\t[+] Adding command: \'{cmd}\'".format(cmd=cmd["command"]))
@@ -116,6 +304,58 @@ def setup(slackclient):
                     print("\t[!] Not adding help text for hidden command: {}".format(cmd["command"]))
             else:
                 print("\t[/] Skipping disabled command: \'{cmd}\'".format(cmd=cmd["command"]))
+
+        pipeline.compile_plugin_commands(plugin)
         print("[+] Successfully enabled command plugin \"{}\"".format(name))
 
     print("[✔] Completed enabling command plugins.")
+
+    if auth_timings:
+        print("[-->] Auth plugin setup times:")
+        print(plugin_setup.format_timings(AUTH_PLUGINS, auth_timings))
+
+    print("[-->] Command plugin setup times:")
+    print(plugin_setup.format_timings(COMMAND_PLUGINS, command_timings))
+
+    ADMISSION_FILTER = admission.AdmissionFilter(COMMANDS, IGNORE_ROOMS, ONLY_LISTEN)
+
+    if worker:
+        return
+
+    # Loaded after the plugins are set up, since that's when they register their caches:
+    if CACHE_SNAPSHOT_PATH:
+        cache.start_snapshots(CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_INTERVAL)
+        atexit.register(cache.stop_snapshots)
+
+    if WARM_UP:
+        print("[-->] Warming up the plugins in the background")
+        tasks = {"slack users": lambda: prefetch_users(WARM_UP_SLACK_USERS)} if WARM_UP_SLACK_USERS else {}
+        plugin_setup.start_warm_up(dict(AUTH_PLUGINS, **COMMAND_PLUGINS), tasks)
+
+
+def main():
+    """
+    Runs HubCommander on its own (`python -m hubcommander`), rather than as an rtmbot plugin. This is for when the
+    commands are received over the Events API or Socket Mode (see `INGESTION` in config.py): no RTM connection is
+    opened, so Slack doesn't send HubCommander every message in every channel.
+    :return:
+    """
+    if INGESTION == "rtm":
+        print("[X] INGESTION is \"rtm\", which needs rtmbot's connection to Slack. Run HubCommander with rtmbot "
+              "instead, or set INGESTION to \"events\" or \"socket\".")
+        sys.exit(1)
+
+    from hubcommander.bot_components import ingestion
+
+    HubCommander(slack_client=SlackClient(get_credentials()["SLACK"]))
+    print("[✔] HubCommander is running without an RTM connection.")
+
+    try:
+        while ingestion.LISTENER and ingestion.LISTENER.thread.is_alive():
+            ingestion.LISTENER.thread.join(1)
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        ingestion.stop_listener()
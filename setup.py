@@ -50,5 +50,6 @@ setup(
     install_requires=install_requires,
     extras_require={
         'tests': tests_require,
+        'redis': ['redis>=3.0'],    # For the redis cache backend
     },
 )
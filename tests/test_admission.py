@@ -0,0 +1,36 @@
+"""
+.. module: hubcommander.tests.test_admission
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+from hubcommander.bot_components.admission import AdmissionFilter
+
+
+def test_admission_filter():
+    admission_filter = AdmissionFilter(["!Help", "!ListPRs"], ignore_rooms=["C_IGNORED"])
+
+    def match(text, channel="C1", **kwargs):
+        return admission_filter.match(dict(kwargs, type="message", channel=channel, text=text))
+
+    assert match("!ListPRs org repo open") == "!listprs"
+    assert match("!listprs") == "!listprs"
+    assert match("!HELP") == "!help"
+
+    assert not match("!ListPRsss org repo")
+    assert not match("!List")
+    assert not match("Hello there!")
+    assert not match("")
+    assert not admission_filter.match({"type": "message", "channel": "C1"})
+
+    # Edits and bot messages are skipped:
+    assert not match("!Help", subtype="message_changed")
+    assert not match("!Help", bot_id="B1")
+
+    assert not match("!Help", channel="C_IGNORED")
+
+    only_listen = AdmissionFilter(["!help"], only_listen=["C1"])
+    assert only_listen.match({"channel": "C1", "text": "!help"}) == "!help"
+    assert not only_listen.match({"channel": "C2", "text": "!help"})
@@ -0,0 +1,192 @@
+"""
+.. module: hubcommander.tests.test_cache
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+
+import pytest
+
+from hubcommander.bot_components.cache import Cache, CacheSnapshots, MemoryBackend, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmpdir):
+    clock = FakeClock()
+    if request.param == "memory":
+        return MemoryBackend(clock=clock), clock
+
+    return SQLiteBackend(str(tmpdir.join("cache.db")), clock=clock), clock
+
+
+def test_entries_go_stale_and_expire(backend):
+    backend, clock = backend
+    cache = Cache("test.teams", 10, stale_ttl=20, backend=backend, clock=clock)
+
+    cache.set("Netflix", {"hubcommander": 1})
+    cache.set(("Netflix", "repo"), [1, 2])
+    assert cache.get("Netflix") == {"hubcommander": 1}
+    assert cache.get(("Netflix", "repo")) == [1, 2]
+    assert dict(cache.items()) == {("Netflix", "repo"): [1, 2], "Netflix": {"hubcommander": 1}}
+
+    clock.now += 15
+    assert cache.lookup("Netflix") == ({"hubcommander": 1}, 15, True)
+    assert cache.is_stale("Netflix")
+
+    clock.now += 15
+    assert cache.get("Netflix", "default") == "default"
+    assert "Netflix" not in cache
+    assert cache.stats() == {"hits": 2, "stale_hits": 2, "misses": 1, "refreshes": 0, "refresh_failures": 0,
+                             "entries": 0}
+
+
+def test_namespaces_are_separate(backend):
+    backend, clock = backend
+    teams = Cache("test.teams", 10, backend=backend, clock=clock)
+    users = Cache("test.users", 10, backend=backend, clock=clock)
+
+    teams.set("key", "team")
+    users.set("key", "user")
+    assert teams.get("key") == "team"
+
+    teams.clear()
+    assert "key" not in teams
+    assert users.get("key") == "user"
+
+    users.delete("key")
+    assert len(users) == 0
+
+
+def test_least_recently_used_are_dropped():
+    clock = FakeClock()
+    cache = Cache("test.lru", 10, max_entries=2, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert "b" not in cache
+    assert cache.get("c") == 3
+
+
+def test_stale_while_revalidate():
+    clock = FakeClock()
+    cache = Cache("test.swr", 10, stale_ttl=60, clock=clock)
+    fetches = []
+
+    def fetch():
+        fetches.append(True)
+        return {"new": len(fetches)}
+
+    assert cache.get_or_fetch("Netflix", fetch) == {"new": 1}
+    assert cache.get_or_fetch("Netflix", fetch) == {"new": 1}
+    assert len(fetches) == 1
+
+    # Stale: the old value is returned, and fetched again in the background:
+    clock.now += 11
+    release = threading.Event()
+    thread = cache.refresh("Netflix", lambda: release.wait() and fetch())
+    assert cache.refresh("Netflix", fetch) is None   # Already being refreshed.
+    assert cache.get("Netflix") == {"new": 1}
+    release.set()
+    thread.join()
+    assert cache.get("Netflix") == {"new": 2}
+    assert not cache.is_stale("Netflix")
+
+    # Failures leave the old value:
+    def fail():
+        raise ValueError("GitHub is down")
+
+    clock.now += 11
+    assert cache.get("Netflix") == {"new": 2}
+    cache.refresh("Netflix", fail).join()
+    assert cache.get("Netflix") == {"new": 2}
+    assert cache.stats()["refresh_failures"] >= 1
+
+
+def test_snapshots(tmpdir):
+    path = str(tmpdir.join("snapshot.db"))
+    teams = Cache("test.snapshot", 10)
+    teams.set("Netflix", {"hubcommander": 1})
+    teams.set(("Netflix", "repo"), [1, 2])
+
+    assert CacheSnapshots(path, {"test.snapshot": teams}).save() == 2
+
+    # After a restart, the entries are usable, but stale:
+    restarted = Cache("test.snapshot", 10)
+    shared = Cache("test.shared", 10, backend=SQLiteBackend(str(tmpdir.join("cache.db"))))
+    assert CacheSnapshots(path, {"test.snapshot": restarted, "test.shared": shared}).load() == 2
+    assert restarted.get("Netflix") == {"hubcommander": 1}
+    assert restarted.get(("Netflix", "repo")) == [1, 2]
+    assert restarted.is_stale("Netflix")
+
+
+def test_snapshots_keep_their_age(tmpdir):
+    path = str(tmpdir.join("snapshot.db"))
+    now = [1000.0]
+    users = Cache("test.snapshot_age", 100, stale_ttl=100, clock=lambda: now[0])
+    users.set("old", "old value")
+    now[0] += 150
+    users.set("new", "new value")
+    CacheSnapshots(path, {"test.snapshot_age": users}).save()
+
+    # After 60 seconds, the old entry would have expired (it was fetched 210 seconds ago):
+    now[0] += 60
+    restarted = Cache("test.snapshot_age", 100, stale_ttl=100, clock=lambda: now[0])
+    assert CacheSnapshots(path, {"test.snapshot_age": restarted}).load() == 1
+    assert "old" not in restarted
+
+    value, age, stale = restarted.lookup("new")
+    assert value == "new value"
+    assert age == 60
+    assert stale
+
+    # And it expires when it would have without the restart:
+    now[0] += 141
+    assert "new" not in restarted
+
+
+def test_counting_entries_skips_their_values(backend):
+    backend, clock = backend
+    cache = Cache("test.counted", 10, backend=backend, clock=clock)
+    Cache("test.other", 10, backend=backend, clock=clock).set("key", "other")
+
+    cache.set("one", 1)
+    cache.set("two", 2, ttl=5)
+
+    # The entries are counted without reading them (like on every /metrics scrape):
+    backend.items = None
+    assert len(cache) == 2
+    assert cache.stats()["entries"] == 2
+
+    clock.now += 6
+    assert len(cache) == 1
+
+
+def test_redis_counts_keys_only():
+    from hubcommander.bot_components.cache import RedisBackend
+
+    class FakeRedis:
+        def scan_iter(self, match):
+            assert match == "test.redis:*"
+            return iter([b"test.redis:\"one\"", b"test.redis:\"two\""])
+
+        def get(self, key):
+            raise AssertionError("The entries were read.")
+
+    backend = RedisBackend.__new__(RedisBackend)
+    backend.client = FakeRedis()
+    assert backend.count("test.redis:") == 2
@@ -0,0 +1,95 @@
+"""
+.. module: hubcommander.tests.test_circuit_breaker
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import pytest
+
+from hubcommander.bot_components import circuit_breaker
+from hubcommander.bot_components.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ConnectionError("GitHub is down")
+
+
+def test_breaker_opens_and_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("GitHub", failure_ratio=0.5, minimum_calls=4, window=60, slow_seconds=5,
+                             open_seconds=30, clock=clock)
+
+    assert breaker.call(lambda: "ok") == "ok"
+    breaker.record(6, False)   # Too slow.
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+    # Open: calls fail right away:
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as coe:
+        breaker.call(lambda: "ok")
+    assert coe.value.retry_in == 30
+    assert "GitHub isn't responding" in str(coe.value)
+
+    # Half open: a failed probe opens it again:
+    clock.now = 30
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    # A probe that works closes it:
+    clock.now = 60
+    breaker.before()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()   # Only one probe at a time.
+    breaker.record(0.1, False)
+    assert breaker.state == CLOSED
+
+    assert breaker.stats() == {"calls": 6, "failures": 4, "rejected": 2, "opened": 2, "state": CLOSED}
+
+
+def test_expected_errors_and_failed_results():
+    breaker = CircuitBreaker("Duo", minimum_calls=2, clock=FakeClock())
+
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            breaker.call(lambda: {}["user"], expected_errors=(KeyError,))
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        breaker.call(lambda: 503, is_failure=lambda status: status >= 500)
+    assert breaker.state == OPEN
+
+
+def test_upstream_session():
+    from hubcommander.bot_components.http import UpstreamSession, UpstreamUnavailable
+    import requests
+
+    circuit_breaker.configure({"default": {"minimum_calls": 1}})
+    try:
+        circuit_breaker.get_breaker("GitHub").record(0, True)
+        assert [breaker.name for breaker in circuit_breaker.open_breakers(["GitHub", "Slack"])] == ["GitHub"]
+
+        # Fails without going anywhere near the network:
+        with pytest.raises(requests.exceptions.RequestException) as re:
+            UpstreamSession("GitHub").get("https://api.github.com/", timeout=10)
+        assert isinstance(re.value, UpstreamUnavailable)
+
+        assert circuit_breaker.breaker_states()["GitHub"]["state"] == OPEN
+
+    finally:
+        circuit_breaker.configure(None)
+
+    assert not circuit_breaker.open_breakers(["GitHub"])
@@ -0,0 +1,132 @@
+"""
+.. module: hubcommander.tests.test_dedup
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+from concurrent.futures import Future
+
+from hubcommander.bot_components.dedup import CommandDeduplicator, command_key, normalize_command
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_command():
+    assert normalize_command(u"!AddCollab  someone   org repo push") == "!addcollab someone org repo push"
+    assert normalize_command(u"!setdescription org repo “Some Text”") == \
+        normalize_command(u"!SetDescription org repo \"Some Text\"")
+
+    # Arguments keep their case:
+    assert normalize_command("!SetDefaultBranch org repo Main") == "!setdefaultbranch org repo Main"
+
+
+def test_command_key():
+    data = {"user": "U1", "channel": "C1", "text": "!ListPRs org repo open "}
+    assert command_key(data) == ("U1", "C1", "!listprs org repo open")
+
+
+def test_duplicates_attach_to_the_running_command():
+    clock = FakeClock()
+    deduplicator = CommandDeduplicator(window=5, clock=clock)
+    running = Future()
+    calls = []
+
+    def run():
+        calls.append(True)
+        return running
+
+    first, original = deduplicator.submit("key", "1.1", run)
+    assert not original
+
+    second, original = deduplicator.submit("key", "1.2", run)
+    assert original == "1.1"
+    assert second is first
+    assert len(calls) == 1
+
+    running.set_result("done")
+    assert second.result(timeout=0) == "done"
+
+    # Still within the window after it finished:
+    clock.now += 4
+    _, original = deduplicator.submit("key", "1.3", run)
+    assert original == "1.1"
+
+    # The window has passed:
+    clock.now += 2
+    _, original = deduplicator.submit("key", "1.4", run)
+    assert not original
+    assert len(calls) == 2
+
+
+def test_failures_are_passed_along():
+    deduplicator = CommandDeduplicator(window=5)
+
+    def fail():
+        raise ValueError("Nope")
+
+    future, _ = deduplicator.submit("key", "1.1", fail)
+    assert isinstance(future.exception(timeout=0), ValueError)
+
+
+def test_failed_runs_are_not_kept():
+    deduplicator = CommandDeduplicator(window=5)
+    calls = []
+
+    def run(result):
+        calls.append(result)
+        future = Future()
+        future.set_result(result)
+        return future
+
+    deduplicator.submit("key", "1.1", run, False)
+    _, original = deduplicator.submit("key", "1.2", run, True)
+    assert not original
+    assert calls == [False, True]
+
+    # The successful run is kept:
+    _, original = deduplicator.submit("key", "1.3", run, True)
+    assert original == "1.2"
+    assert len(calls) == 2
+
+
+def test_rejected_commands_can_be_sent_again(slack_client):
+    import time
+    from hubcommander import hubcommander
+    from hubcommander.bot_components import admission, dedup, rate_limit
+
+    calls = []
+
+    def test_command(data):
+        calls.append(data["ts"])
+
+    admission_filter = hubcommander.ADMISSION_FILTER
+    hubcommander.COMMANDS["!testdedup"] = {"func": test_command, "user_data_required": False}
+    hubcommander.ADMISSION_FILTER = admission.AdmissionFilter(hubcommander.COMMANDS)
+    rate_limit.configure({"rate": 10, "burst": 1})
+    dedup.configure(5)
+    try:
+        message = {"user": "U12345678", "channel": "C1", "text": "!TestDedup"}
+        hubcommander.HubCommander.handle_message(None, dict(message, text="!TestDedup other", ts="1.1"))
+
+        # Over the limit:
+        hubcommander.HubCommander.handle_message(None, dict(message, ts="1.2"))
+        assert calls == ["1.1"]
+
+        # Sent again once the user has waited:
+        time.sleep(0.2)
+        hubcommander.HubCommander.handle_message(None, dict(message, ts="1.3"))
+        assert calls == ["1.1", "1.3"]
+
+    finally:
+        del hubcommander.COMMANDS["!testdedup"]
+        hubcommander.ADMISSION_FILTER = admission_filter
+        rate_limit.configure()
+        dedup.configure()
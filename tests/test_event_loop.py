@@ -0,0 +1,100 @@
+"""
+.. module: hubcommander.tests.test_event_loop
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import asyncio
+import json
+import threading
+import time
+
+from hubcommander.bot_components.bot_classes import BotAuthPlugin, BotCommander
+from hubcommander.bot_components.decorators import hubcommander_command, auth
+from hubcommander.bot_components.event_loop import resolve
+
+
+def test_resolve():
+    async def add(x, y):
+        await asyncio.sleep(0)
+        return x + y
+
+    assert resolve(add(1, 2)) == 3
+    assert resolve(3) == 3
+
+
+class AsyncAuthPlugin(BotAuthPlugin):
+    async def authenticate(self, data, user_data, should_auth=False, **kwargs):
+        await asyncio.sleep(0)
+        return should_auth
+
+
+def test_async_commands(user_data, slack_client):
+    from hubcommander.bot_components.slack_comm import async_send_success
+
+    class AsyncCommands(BotCommander):
+        def __init__(self):
+            super().__init__()
+            self.commands = {
+                "!FanOut": {"auth": {"plugin": AsyncAuthPlugin(), "kwargs": {"should_auth": True}}},
+                "!Denied": {"auth": {"plugin": AsyncAuthPlugin(), "kwargs": {"should_auth": False}}},
+            }
+
+        @hubcommander_command(
+            name="!FanOut",
+            usage="!FanOut <count>",
+            description="Waits on many things at once.",
+            required=[
+                dict(name="count", properties=dict(type=int, help="How many things to wait on.")),
+            ],
+            optional=[]
+        )
+        @auth()
+        async def fan_out_command(self, data, user_data, count):
+            async def fetch(x):
+                await asyncio.sleep(0.1)
+                return x
+
+            results = await asyncio.gather(*[fetch(x) for x in range(count)])
+            await async_send_success(data["channel"], "Got {} results.".format(len(results)))
+            return sum(results)
+
+        @hubcommander_command(
+            name="!Denied",
+            usage="!Denied",
+            description="Fails to authenticate.",
+            required=[],
+            optional=[]
+        )
+        @auth()
+        async def denied_command(self, data, user_data):
+            assert False
+
+    commands = AsyncCommands()
+
+    # All 200 of the waits happen at the same time:
+    started = time.monotonic()
+    assert commands.fan_out_command(dict(text="!FanOut 200", channel="some_channel"), user_data) == sum(range(200))
+    assert time.monotonic() - started < 5
+
+    attachment = {"text": "Got 200 results.", "color": "good"}
+    slack_client.api_call.assert_called_with("chat.postMessage", channel="some_channel", text=" ",
+                                             attachments=json.dumps([attachment]), as_user=True)
+
+    assert not commands.denied_command(dict(text="!Denied", channel="some_channel"), user_data)
+
+
+def test_async_sends_without_the_queue(slack_client):
+    from hubcommander.bot_components import event_loop, slack_comm
+
+    assert not slack_comm.OUTBOUND_QUEUE
+
+    # The message is sent from another thread, so that the event loop isn't blocked on Slack:
+    threads = []
+    slack_client.api_call.side_effect = lambda *args, **kwargs: threads.append(threading.current_thread()) or \
+        {"ok": True}
+
+    assert event_loop.resolve(slack_comm.async_send_info("some_channel", "Hi")) == {"ok": True}
+    assert threads and threads[0] is not event_loop.LOOP_THREAD
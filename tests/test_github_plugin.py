@@ -0,0 +1,176 @@
+"""
+.. module: hubcommander.tests.test_github_plugin
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import json
+import time
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from hubcommander.bot_components.cache import Cache
+from hubcommander.command_plugins.github.plugin import GitHubPlugin
+
+ORG = "Real_Org_Name_here"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGitHub(BaseAdapter):
+    """
+    Answers the GitHub API calls from `routes`, a dict of (method, path) to (status code, body).
+    """
+    def __init__(self):
+        super().__init__()
+        self.routes = {}
+        self.calls = []
+
+    def send(self, request, **kwargs):
+        path = urlsplit(request.url).path
+        self.calls.append((request.method, path))
+        status, body = self.routes.get((request.method, path), (404, {"message": "Not Found"}))
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+        response.request = request
+        response.url = request.url
+        return response
+
+    def count(self, method, path):
+        return self.calls.count((method, path))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def github():
+    plugin = GitHubPlugin()
+    plugin.setup({"GITHUB": "some-token"})
+
+    clock = FakeClock()
+    plugin.read_cache = Cache("test.github.reads", 60, stale_ttl=600, clock=clock)
+    plugin.team_index = Cache("test.github.teams", 3600, clock=clock)
+
+    fake = FakeGitHub()
+    fake.routes[("GET", "/repos/{}/hubcommander".format(ORG))] = (200, {"full_name": "{}/hubcommander".format(ORG)})
+    fake.routes[("GET", "/repos/{}/hubcommander/keys".format(ORG))] = (200, [
+        {"id": 1, "title": "deploy", "read_only": True, "created_at": "2017-01-01T00:00:00Z"}
+    ])
+    plugin.session.mount("https://", fake)
+
+    return plugin, fake, clock
+
+
+def command_data(text):
+    return {"channel": "some_channel", "user": "U12345678", "ts": "1500000000.000100", "text": text}
+
+
+def posted_texts(slack_client, verb="chat.postMessage"):
+    return [call[1]["text"] for call in slack_client.api_call.call_args_list if call[0][0] == verb]
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def test_send_cached_table(github, user_data, slack_client):
+    plugin, fake, clock = github
+    keys_path = "/repos/{}/hubcommander/keys".format(ORG)
+    list_keys = command_data("!ListKeys {} hubcommander".format(ORG))
+
+    plugin.list_deploy_keys_command(list_keys, user_data)
+    assert fake.count("GET", keys_path) == 1
+    assert "|   1 | deploy |" in posted_texts(slack_client)[-1]
+
+    # Fresh results are sent from the cache, without asking GitHub:
+    plugin.list_deploy_keys_command(list_keys, user_data)
+    assert fake.count("GET", keys_path) == 1
+    assert posted_texts(slack_client)[-1].startswith("Deploy Keys: *hubcommander* \n\n")
+
+    # Stale ones are sent with their age, and updated in place once GitHub has answered:
+    fake.routes[("GET", keys_path)] = (200, [
+        {"id": 1, "title": "deploy", "read_only": True, "created_at": "2017-01-01T00:00:00Z"},
+        {"id": 2, "title": "ci", "read_only": False, "created_at": "2017-01-02T00:00:00Z"},
+    ])
+    slack_client.api_call.side_effect = lambda verb, **kwargs: {"ok": True, "ts": "2.1"}
+    clock.now += 120
+
+    plugin.list_deploy_keys_command(list_keys, user_data)
+    assert "_(from 2m ago -- checking GitHub for changes)_" in posted_texts(slack_client)[-1]
+    assert wait_for(lambda: posted_texts(slack_client, "chat.update"))
+    assert "|   2 | ci " in posted_texts(slack_client, "chat.update")[-1]
+    assert fake.count("GET", keys_path) == 2
+
+
+def test_team_index(github):
+    plugin, fake, clock = github
+    teams_path = "/orgs/{}/teams".format(ORG)
+    fake.routes[("GET", teams_path)] = (200, [{"slug": "admins", "id": 100}])
+
+    assert plugin.find_team_id_by_name(ORG, "admins") == 100
+    assert plugin.find_team_id_by_name(ORG, "admins") == 100
+    assert fake.count("GET", teams_path) == 1
+
+    # A team that isn't in the index is looked up again, in case it's new:
+    fake.routes[("GET", teams_path)] = (200, [{"slug": "admins", "id": 100}, {"slug": "new-team", "id": 200}])
+    assert plugin.find_team_id_by_name(ORG, "new-team") == 200
+    assert fake.count("GET", teams_path) == 2
+
+    assert not plugin.find_team_id_by_name(ORG, "missing")
+    assert fake.count("GET", teams_path) == 3
+
+
+def test_deploy_key_changes_clear_the_cached_keys(github, user_data, slack_client):
+    plugin, fake, clock = github
+    keys_path = "/repos/{}/hubcommander/keys".format(ORG)
+    list_keys = command_data("!ListKeys {} hubcommander".format(ORG))
+
+    plugin.list_deploy_keys_command(list_keys, user_data)
+    assert ("keys", ORG, "hubcommander") in plugin.read_cache
+
+    # Adding a key:
+    fake.routes[("POST", keys_path)] = (201, {"id": 2, "title": "ci"})
+    plugin.add_deploy_key_command(command_data('!AddKey {} hubcommander ci off "ssh-rsa AAAA"'.format(ORG)),
+                                  user_data)
+    assert ("keys", ORG, "hubcommander") not in plugin.read_cache
+
+    fake.routes[("GET", keys_path)] = (200, [
+        {"id": 1, "title": "deploy", "read_only": True, "created_at": "2017-01-01T00:00:00Z"},
+        {"id": 2, "title": "ci", "read_only": False, "created_at": "2017-01-02T00:00:00Z"},
+    ])
+    plugin.list_deploy_keys_command(list_keys, user_data)
+    assert fake.count("GET", keys_path) == 2
+    assert "|   2 | ci " in posted_texts(slack_client)[-1]
+
+    # Deleting a key:
+    fake.routes[("GET", keys_path + "/2")] = (200, {"id": 2, "title": "ci"})
+    fake.routes[("DELETE", keys_path + "/2")] = (204, None)
+    plugin.delete_deploy_key_command(command_data("!DeleteKey {} hubcommander 2".format(ORG)), user_data)
+    assert ("keys", ORG, "hubcommander") not in plugin.read_cache
+
+    # Deleting the repo:
+    plugin.list_deploy_keys_command(list_keys, user_data)
+    assert ("keys", ORG, "hubcommander") in plugin.read_cache
+
+    fake.routes[("DELETE", "/repos/{}/hubcommander".format(ORG))] = (204, None)
+    plugin.delete_repo_command(command_data("!DeleteRepo {} hubcommander".format(ORG)), user_data)
+    assert ("keys", ORG, "hubcommander") not in plugin.read_cache
+    assert ("repo", ORG, "hubcommander") not in plugin.read_cache
@@ -0,0 +1,109 @@
+"""
+.. module: hubcommander.tests.test_http
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+from hubcommander.bot_components import http
+from hubcommander.bot_components.http import LatencyTracker, UpstreamSession, endpoint_class
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    Answers each request after the next delay in `delays`.
+    """
+    def __init__(self, delays):
+        super().__init__()
+        self.delays = delays
+        self.lock = threading.Lock()
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        with self.lock:
+            delay = self.delays.pop(0)
+            self.timeouts.append(timeout)
+
+        time.sleep(delay)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = str(delay).encode("utf-8")
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_endpoint_class():
+    resources = ["repos", "pulls", "users"]
+    assert endpoint_class("get", "https://api.github.com/repos/Netflix/hubcommander/pulls?state=open",
+                          resources) == "GET repos/*/*/pulls"
+    assert endpoint_class("GET", "https://api.github.com/users/mikegrima", resources) == "GET users/*"
+
+
+def test_adaptive_timeout():
+    tracker = LatencyTracker()
+    assert tracker.timeout(10, min_samples=3) == 10
+
+    for seconds in [0.1, 0.2, 0.3, 0.4]:
+        tracker.add(seconds)
+
+    assert tracker.percentile(50) == 0.3
+    assert tracker.timeout(10, multiplier=3, min_seconds=0.5, min_samples=3) == 0.4 * 3
+    assert tracker.timeout(10, multiplier=3, min_seconds=2, min_samples=3) == 2
+    assert tracker.timeout(1, multiplier=3, min_seconds=0.5, min_samples=3) == 1
+
+
+def test_hedged_gets():
+    session = UpstreamSession("Hedged", resources=["users"])
+    adapter = FakeAdapter([0.01] * 5 + [2, 0.01])
+    session.mount("https://", adapter)
+
+    http.configure({"multiplier": 3, "min_seconds": 1, "min_samples": 5}, hedged_gets=True)
+    try:
+        for _ in range(5):
+            session.get("https://api.github.com/users/someone", timeout=10)
+
+        # The first attempt is stuck, so the second copy answers:
+        started = time.monotonic()
+        assert session.get("https://api.github.com/users/someone", timeout=10).text == "0.01"
+        assert time.monotonic() - started < 1
+
+        # The timeout is based on the latencies so far:
+        assert adapter.timeouts[-1] == 1
+
+        stats = http.latency_stats()[("Hedged", "GET users/*")]
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+
+    finally:
+        http.configure(None, False)
+
+
+def test_adaptive_timeouts_only_apply_to_reads():
+    session = UpstreamSession("Writes", resources=["repos"])
+    adapter = FakeAdapter([0.01] * 8)
+    session.mount("https://", adapter)
+
+    http.configure({"multiplier": 3, "min_seconds": 1, "min_samples": 3})
+    try:
+        for _ in range(3):
+            session.get("https://api.github.com/repos/Netflix", timeout=10)
+            session.post("https://api.github.com/repos/Netflix", timeout=10)
+
+        session.get("https://api.github.com/repos/Netflix", timeout=10)
+        session.post("https://api.github.com/repos/Netflix", timeout=10)
+
+        # The GET's timeout is worked out, but the POST keeps the plugin's:
+        assert adapter.timeouts[-2:] == [1, 10]
+
+    finally:
+        http.configure(None, False)
@@ -0,0 +1,173 @@
+"""
+.. module: hubcommander.tests.test_ingestion
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock
+
+import pytest
+
+from hubcommander.bot_components import ingestion
+
+SIGNING_SECRET = "somesecret"
+
+
+def test_event_to_message():
+    assert ingestion.event_to_message({"type": "app_mention", "channel": "C1", "user": "U1", "ts": "1.1",
+                                       "text": "<@UBOT> !ListPRs org repo open"}) == \
+        {"type": "message", "channel": "C1", "user": "U1", "ts": "1.1", "text": "!ListPRs org repo open"}
+
+    assert ingestion.event_to_message({"type": "message", "channel": "C1", "text": "!Help"})["text"] == "!Help"
+
+    # Edits, bots, and other events are skipped:
+    assert not ingestion.event_to_message({"type": "message", "subtype": "message_changed", "channel": "C1"})
+    assert not ingestion.event_to_message({"type": "message", "bot_id": "B1", "channel": "C1", "text": "!Help"})
+    assert not ingestion.event_to_message({"type": "reaction_added", "channel": "C1"})
+
+
+def send_event(port, payload, secret=SIGNING_SECRET, timestamp=None):
+    body = json.dumps(payload).encode("utf-8")
+    timestamp = str(timestamp or int(time.time()))
+    signature = "v0=" + hmac.new(secret.encode("utf-8"), b"v0:" + timestamp.encode("utf-8") + b":" + body,
+                                 hashlib.sha256).hexdigest()
+
+    request = urllib.request.Request("http://127.0.0.1:{}/".format(port), data=body, headers={
+        "Content-Type": "application/json",
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": signature,
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def test_events_api_server():
+    handler = MagicMock()
+    server = ingestion.EventsAPIServer(SIGNING_SECRET, handler, host="127.0.0.1", port=0)
+    server.start()
+
+    try:
+        assert send_event(server.port, {"type": "url_verification", "challenge": "abc"}) == \
+            (200, json.dumps({"challenge": "abc"}))
+
+        event = {"type": "app_mention", "channel": "C1", "user": "U1", "ts": "1.1", "text": "<@UBOT> !Help"}
+        assert send_event(server.port, {"type": "event_callback", "event": event})[0] == 200
+        for _ in range(50):
+            if handler.called:
+                break
+            time.sleep(0.01)
+        handler.assert_called_once_with({"type": "message", "channel": "C1", "user": "U1", "ts": "1.1",
+                                         "text": "!Help"})
+
+        # Requests that weren't signed by Slack (or are too old) are rejected:
+        assert send_event(server.port, {"type": "event_callback", "event": event}, secret="wrong")[0] == 401
+        assert send_event(server.port, {"type": "event_callback", "event": event},
+                          timestamp=int(time.time()) - 3600)[0] == 401
+        assert handler.call_count == 1
+
+    finally:
+        server.stop()
+
+
+class FakeConnection:
+    def __init__(self, envelopes):
+        self.received = [json.dumps(envelope) for envelope in envelopes]
+        self.sent = []
+
+    def recv(self):
+        return self.received.pop(0) if self.received else ""
+
+    def send(self, message):
+        self.sent.append(json.loads(message))
+
+
+def test_socket_mode():
+    handled = threading.Event()
+    handler = MagicMock(side_effect=lambda message: handled.set())
+    connection = FakeConnection([
+        {"type": "hello"},
+        {"type": "events_api", "envelope_id": "e1", "payload": {"event": {
+            "type": "app_mention", "channel": "C1", "user": "U1", "ts": "1.1", "text": "<@UBOT> !Help"}}},
+        {"type": "events_api", "envelope_id": "e2", "payload": {"event": {"type": "reaction_added"}}},
+        {"type": "disconnect"},
+        {"type": "events_api", "envelope_id": "e3", "payload": {"event": {}}},
+    ])
+
+    client = ingestion.SocketModeClient("xapp-token", handler, connect=lambda url: connection)
+    client.slack_client.api_call = MagicMock(return_value={"ok": True, "url": "wss://somewhere"})
+    client.running = True
+    client.listen(client._open())
+
+    assert handled.wait(timeout=5)
+    handler.assert_called_once_with({"type": "message", "channel": "C1", "user": "U1", "ts": "1.1",
+                                     "text": "!Help"})
+    assert connection.sent == [{"envelope_id": "e1"}, {"envelope_id": "e2"}]
+
+
+def test_socket_mode_slow_handler():
+    release = threading.Event()
+    handled = []
+
+    def handler(message):
+        # Like a command that is waiting on a Duo push:
+        release.wait(timeout=5)
+        handled.append(message["ts"])
+
+    event = {"type": "app_mention", "channel": "C1", "user": "U1", "text": "<@UBOT> !Help"}
+    connection = FakeConnection([
+        {"type": "events_api", "envelope_id": "e1", "payload": {"event": dict(event, ts="1.1")}},
+        {"type": "events_api", "envelope_id": "e2", "payload": {"event": dict(event, ts="1.2")}},
+        {"type": "disconnect"},
+    ])
+
+    client = ingestion.SocketModeClient("xapp-token", handler, connect=lambda url: connection)
+    client.running = True
+    client.listen(connection)
+
+    # Both envelopes were acknowledged while the first command was still running:
+    assert connection.sent == [{"envelope_id": "e1"}, {"envelope_id": "e2"}]
+    assert not handled
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while len(handled) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert sorted(handled) == ["1.1", "1.2"]
+
+
+def test_main_without_rtm(monkeypatch):
+    from hubcommander import hubcommander
+
+    # RTM needs rtmbot:
+    monkeypatch.setattr(hubcommander, "INGESTION", "rtm")
+    with pytest.raises(SystemExit):
+        hubcommander.main()
+
+    # Otherwise, HubCommander runs until its listener stops, without ever connecting to RTM:
+    slack_client = MagicMock()
+    plugin = MagicMock(side_effect=lambda slack_client: ingestion.start_listener(
+        "socket", {"SLACK_APP_TOKEN": "xapp-token"}, MagicMock()))
+    monkeypatch.setattr(hubcommander, "INGESTION", "socket")
+    monkeypatch.setattr(hubcommander, "get_credentials", lambda: {"SLACK": "xoxb-token"})
+    monkeypatch.setattr(hubcommander, "SlackClient", lambda token: slack_client)
+    monkeypatch.setattr(hubcommander, "HubCommander", plugin)
+    monkeypatch.setattr(ingestion.SocketModeClient, "_run", lambda self: None)
+
+    hubcommander.main()
+
+    plugin.assert_called_once_with(slack_client=slack_client)
+    assert not slack_client.rtm_connect.called
+    assert not ingestion.LISTENER
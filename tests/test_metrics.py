@@ -0,0 +1,135 @@
+"""
+.. module: hubcommander.tests.test_metrics
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import urllib.request
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from hubcommander.bot_components import metrics
+from hubcommander.bot_components.http import UpstreamSession
+from hubcommander.bot_components.metrics import Counter, Histogram
+
+
+class StatusAdapter(BaseAdapter):
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def registry():
+    """
+    Keeps the test's metrics out of the real ones.
+    """
+    saved = list(metrics.REGISTRY)
+    yield metrics.REGISTRY
+    metrics.REGISTRY[:] = saved
+
+
+def test_histogram(registry):
+    histogram = Histogram("test_seconds", "Test.", ["command"], buckets=(0.1, 1, float("inf")))
+    histogram.observe(0.05, "!Test")
+    histogram.observe(0.5, "!Test")
+    histogram.observe(5, "!Test")
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{command="!Test",le="0.1"} 1',
+        'test_seconds_bucket{command="!Test",le="1"} 2',
+        'test_seconds_bucket{command="!Test",le="+Inf"} 3',
+        'test_seconds_sum{command="!Test"} 5.55',
+        'test_seconds_count{command="!Test"} 3',
+    ]
+
+
+def test_counter_escapes_labels(registry):
+    counter = Counter("test_total", "Test.", ["command"])
+    counter.inc('!Say "hi"')
+    counter.inc('!Say "hi"', amount=2)
+
+    assert counter.render()[-1] == 'test_total{command="!Say \\"hi\\""} 3'
+
+
+def test_track_command():
+    with metrics.track_command("!testok"):
+        metrics.observe_stage("!TestOK", "auth", 0.2, True)
+        metrics.observe_stage("!TestOK", "repo_must_exist", 0.1, True)
+        metrics.observe_stage("!TestOK", "command", 0.3, True)
+
+    with pytest.raises(ValueError):
+        with metrics.track_command("!testerror"):
+            raise ValueError()
+
+    # Commands that sent an error (or returned False) are errors too:
+    with metrics.track_command("!testfailed") as tracked:
+        tracked.failed = True
+
+    assert metrics.COMMANDS.get("!testok", "ok") == 1
+    assert metrics.COMMANDS.get("!testerror", "error") == 1
+    assert metrics.COMMANDS.get("!testfailed", "error") == 1
+    assert not metrics.COMMANDS.get("!testfailed", "ok")
+    for phase in [metrics.AUTH, metrics.PRECONDITION, metrics.EXECUTION]:
+        assert metrics.PHASE_SECONDS.count("!testok", phase) == 1
+
+    # Nothing is recorded outside of a command:
+    metrics.observe_phase(metrics.SLACK_SEND, 0.1)
+    assert metrics.PHASE_SECONDS.count(None, metrics.SLACK_SEND) == 0
+
+
+def test_failed_commands_are_errors(slack_client):
+    from hubcommander import hubcommander
+    from hubcommander.bot_components.slack_comm import send_error
+
+    def failing_command(data, user_data):
+        send_error(data["channel"], "That repo doesn't exist.")
+        return False
+
+    hubcommander.COMMANDS["!testrepomissing"] = {"func": failing_command, "user_data_required": True}
+    try:
+        data = {"channel": "some_channel", "user": "U12345678", "ts": "1.1", "text": "!TestRepoMissing"}
+        assert not hubcommander.run_the_command(data, "!testrepomissing")
+    finally:
+        del hubcommander.COMMANDS["!testrepomissing"]
+
+    assert metrics.COMMANDS.get("!testrepomissing", "error") == 1
+    assert not metrics.COMMANDS.get("!testrepomissing", "ok")
+
+
+def test_upstream_metrics():
+    session = UpstreamSession("Test")
+    session.mount("https://", StatusAdapter(404))
+    session.get("https://api.metrics.test/repos")
+
+    assert metrics.UPSTREAM_SECONDS.count("Test", "api.metrics.test", "404") == 1
+
+
+def test_metrics_server():
+    server = metrics.MetricsServer(port=0)
+    server.start()
+    try:
+        body = urllib.request.urlopen("http://127.0.0.1:{}/metrics".format(server.port)).read().decode("utf-8")
+        assert "# TYPE hubcommander_commands_total counter" in body
+        assert "# TYPE hubcommander_retries_total counter" in body
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen("http://127.0.0.1:{}/".format(server.port))
+
+    finally:
+        server.stop()
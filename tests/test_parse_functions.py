@@ -75,3 +75,18 @@ def test_parse_toggles():
 
     with pytest.raises(ParseException):
         parse_toggles(None, "NotAProperToggle")
+
+
+def test_replace_smart_quotes():
+    from hubcommander.bot_components.parse_functions import replace_smart_quotes
+
+    assert replace_smart_quotes(u'!AddKey org repo “some key” ‘it’s’') == \
+        "!AddKey org repo \"some key\" 'it's'"
+
+
+def test_cleanup_argument():
+    from hubcommander.bot_components.parse_functions import cleanup_argument
+
+    assert cleanup_argument("<https://github.com/Netflix/hubcommander>") == "https://github.com/Netflix/hubcommander"
+    assert cleanup_argument("{[repo]}") == "repo"
+    assert cleanup_argument("&lt;repo&gt; &amp;") == "repo &amp;"
@@ -0,0 +1,149 @@
+"""
+.. module: hubcommander.tests.test_pipeline
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+
+from hubcommander.bot_components import pipeline
+from hubcommander.bot_components.decorators import hubcommander_command, auth
+from hubcommander.bot_components.pipeline import Stage, add_stage
+
+
+def recording_stage(name, calls, concurrent=False, passes=True, barrier=None):
+    def check(plugin_obj, data, user_data, args):
+        if barrier:
+            # Both of the concurrent stages have to be running at the same time to get past this:
+            barrier.wait(timeout=5)
+
+        calls.append(name)
+        return passes
+
+    return add_stage(Stage(name, check, concurrent=concurrent))
+
+
+def test_pipeline_stages(user_data, slack_client, auth_plugin):
+    calls = []
+    timings = []
+    barrier = threading.Barrier(2)
+
+    class TestCommands:
+        def __init__(self):
+            self.commands = {
+                "!TestCommand": {
+                    "auth": {
+                        "plugin": auth_plugin,
+                        "kwargs": {
+                            "should_auth": True
+                        }
+                    }
+                },
+                "!FailCommand": {}
+            }
+            self.commands["!TestCommand"]["func"] = self.pass_command
+
+        @hubcommander_command(
+            name="!TestCommand",
+            usage="!TestCommand <arg1>",
+            description="This is a test command.",
+            required=[
+                dict(name="arg1", properties=dict(type=str, help="This is argument 1")),
+            ],
+            optional=[]
+        )
+        @auth()
+        @recording_stage("one", calls, concurrent=True, barrier=barrier)
+        @recording_stage("two", calls, concurrent=True, barrier=barrier)
+        @recording_stage("three", calls)
+        def pass_command(self, data, user_data, arg1):
+            calls.append("command")
+            return arg1
+
+        @hubcommander_command(
+            name="!FailCommand",
+            usage="!FailCommand <arg1>",
+            description="This is a test command that fails a stage.",
+            required=[
+                dict(name="arg1", properties=dict(type=str, help="This is argument 1")),
+            ],
+            optional=[]
+        )
+        @auth()
+        @recording_stage("fail", calls, passes=False)
+        @recording_stage("never", calls)
+        def fail_command(self, data, user_data, arg1):
+            assert False
+
+    tc = TestCommands()
+    pipeline.compile_plugin_commands(tc)
+    assert tc in tc.pass_command.pipeline.compiled
+
+    hook = lambda *args: timings.append(args)
+    pipeline.add_timing_hook(hook)
+    try:
+        assert tc.pass_command(dict(text="!TestCommand arg1"), user_data) == "arg1"
+        assert sorted(calls[:2]) == ["one", "two"]
+        assert calls[2:] == ["three", "command"]
+
+        # The neighboring concurrent stages are grouped together:
+        compiled = tc.pass_command.pipeline.compile(tc)
+        assert [[name for name, _, _ in group] for group in compiled.groups] == [["auth"], ["one", "two"], ["three"]]
+
+        assert [(name, stage) for name, stage, _, _ in timings if stage in ["auth", "three", "command"]] == \
+            [("!TestCommand", "auth"), ("!TestCommand", "three"), ("!TestCommand", "command")]
+        assert timings[-1][3]
+
+        calls.clear()
+        assert not tc.fail_command(dict(text="!FailCommand arg1"), user_data)
+        assert calls == ["fail"]
+        assert ("!FailCommand", "fail") in [(name, stage) for name, stage, _, passed in timings if not passed]
+
+    finally:
+        pipeline.remove_timing_hook(hook)
+
+
+def test_stages_without_hubcommander_command(user_data):
+    calls = []
+
+    @recording_stage("one", calls)
+    @recording_stage("two", calls)
+    def command(plugin_obj, data, user_data, arg1=None):
+        calls.append(arg1)
+        return True
+
+    assert command(None, {}, user_data, arg1="arg1")
+    assert calls == ["one", "two", "arg1"]
+
+
+def test_command_outcome(user_data, slack_client):
+    from hubcommander.bot_components.slack_comm import send_error
+
+    timings = []
+
+    class TestCommands:
+        def __init__(self):
+            self.commands = {"!ErrorCommand": {}}
+
+        @hubcommander_command(
+            name="!ErrorCommand",
+            usage="!ErrorCommand",
+            description="This is a test command that sends an error.",
+            required=[],
+            optional=[]
+        )
+        def error_command(self, data, user_data):
+            send_error(data["channel"], "That didn't work.")
+
+    hook = lambda *args: timings.append(args)
+    pipeline.add_timing_hook(hook)
+    try:
+        TestCommands().error_command(dict(text="!ErrorCommand", channel="some_channel"), user_data)
+    finally:
+        pipeline.remove_timing_hook(hook)
+
+    # The command returned, but it didn't pass:
+    assert [(name, stage, passed) for name, stage, _, passed in timings if stage == "command"] == \
+        [("!ErrorCommand", "command", False)]
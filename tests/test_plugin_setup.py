@@ -0,0 +1,107 @@
+"""
+.. module: hubcommander.tests.test_plugin_setup
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import time
+
+import pytest
+
+from hubcommander.bot_components.bot_classes import BotCommander
+from hubcommander.bot_components.plugin_setup import setup_plugins, format_timings, warm_up_plugins, \
+    PluginDependencyError
+
+
+class SlowPlugin(BotCommander):
+    def __init__(self, name, order, depends_on=(), fail=False):
+        super().__init__()
+        self.name = name
+        self.order = order
+        self.depends_on = list(depends_on)
+        self.fail = fail
+
+    def setup(self, secrets, **kwargs):
+        time.sleep(0.2)
+        if self.fail:
+            raise ValueError("{} failed".format(self.name))
+
+        self.order.append(self.name)
+
+
+def test_independent_plugins_are_set_up_together():
+    order = []
+    plugins = {
+        "github": SlowPlugin("github", order),
+        "repeat": SlowPlugin("repeat", order),
+        "other": SlowPlugin("other", order),
+        "travisci": SlowPlugin("travisci", order, depends_on=["github", "missing"]),
+    }
+
+    started = time.monotonic()
+    timings = setup_plugins(plugins, {})
+
+    # Three at once, and then Travis:
+    assert time.monotonic() - started < 0.6
+    assert order[-1] == "travisci"
+    assert timings["travisci"][0] >= timings["github"][0] + timings["github"][1]
+
+    table = format_timings(plugins, timings)
+    assert "travisci" in table.splitlines()[-1]
+    assert "github" in table.splitlines()[-1]
+
+
+def test_failed_setup():
+    order = []
+    plugins = {
+        "github": SlowPlugin("github", order, fail=True),
+        "travisci": SlowPlugin("travisci", order, depends_on=["github"]),
+    }
+
+    with pytest.raises(ValueError):
+        setup_plugins(plugins, {})
+
+    assert order == []
+
+
+def test_dependency_cycle():
+    order = []
+    plugins = {
+        "one": SlowPlugin("one", order, depends_on=["two"]),
+        "two": SlowPlugin("two", order, depends_on=["one"]),
+    }
+
+    with pytest.raises(PluginDependencyError):
+        setup_plugins(plugins, {})
+
+
+class WarmUpPlugin(BotCommander):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.warmed_up = False
+
+    def warm_up(self):
+        time.sleep(0.2)
+        if self.fail:
+            raise ValueError("no connection")
+
+        self.warmed_up = True
+
+
+def test_warm_up_plugins():
+    plugins = {"github": WarmUpPlugin(), "broken": WarmUpPlugin(fail=True), "repeat": BotCommander()}
+    prefetched = []
+
+    started = time.monotonic()
+    results = warm_up_plugins(plugins, {"slack users": lambda: prefetched.append(True)})
+
+    # All at once, and the failure doesn't stop the others:
+    assert time.monotonic() - started < 0.4
+    assert plugins["github"].warmed_up
+    assert results["github"] >= 0.2
+    assert isinstance(results["broken"], ValueError)
+    assert results["repeat"] < 0.2
+    assert prefetched
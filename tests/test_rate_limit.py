@@ -0,0 +1,100 @@
+"""
+.. module: hubcommander.tests.test_rate_limit
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+import time
+
+import pytest
+
+from hubcommander.bot_components import rate_limit
+from hubcommander.bot_components.rate_limit import TokenBucket, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def reset_limits():
+    yield
+    rate_limit.configure()
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(0.5, 2, clock=clock)
+
+    assert bucket.consume()
+    assert bucket.consume()
+    assert not bucket.consume()
+    assert bucket.wait_time() == 2
+
+    clock.now += 1
+    assert bucket.wait_time() == 1
+
+    clock.now += 1
+    assert bucket.consume()
+
+    # Never more than the capacity:
+    clock.now += 100
+    assert bucket.consume()
+    assert bucket.consume()
+    assert not bucket.consume()
+
+
+def test_rate_limiter_evicts_idle_keys():
+    limiter = RateLimiter(1, 1, max_keys=2, clock=FakeClock())
+    assert limiter.consume("U1")
+    assert limiter.consume("U2")
+    assert limiter.consume("U3")
+
+    assert list(limiter.buckets) == ["U2", "U3"]
+    assert not limiter.consume("U3")
+
+
+def test_admit(reset_limits):
+    rate_limit.configure(user_limit={"rate": 1, "burst": 2}, channel_limit={"rate": 1, "burst": 3})
+
+    assert rate_limit.admit({"user": "U1", "channel": "C1"}) == 0
+    assert rate_limit.admit({"user": "U1", "channel": "C1"}) == 0
+    assert rate_limit.admit({"user": "U1", "channel": "C1"}) > 0
+
+    # The channel still has a token, because the rejected command didn't take it:
+    assert rate_limit.admit({"user": "U2", "channel": "C1"}) == 0
+    assert rate_limit.admit({"user": "U3", "channel": "C1"}) > 0
+
+
+def test_concurrent_admits_dont_overdraw(reset_limits):
+    class SlowRateLimiter(RateLimiter):
+        def wait_time(self, key):
+            # Gives the other message plenty of time to be checked too, before either takes a token:
+            wait = super().wait_time(key)
+            time.sleep(0.1)
+            return wait
+
+    rate_limit.USER_LIMITER = SlowRateLimiter(0.001, 1)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(rate_limit.admit({"user": "U1", "channel": "C1"})))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(result == 0 for result in results) == [False, True]
+    assert rate_limit.USER_LIMITER.buckets["U1"].tokens >= 0
+
+
+def test_admit_without_limits(reset_limits):
+    for _ in range(100):
+        assert rate_limit.admit({"user": "U1", "channel": "C1"}) == 0
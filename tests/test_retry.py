@@ -0,0 +1,132 @@
+"""
+.. module: hubcommander.tests.test_retry
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from hubcommander.bot_components import retry
+from hubcommander.bot_components.http import UpstreamSession
+from hubcommander.bot_components.retry import RetryBudget, RetryPolicy
+
+
+class FlakyAdapter(BaseAdapter):
+    """
+    Answers with the next status code in `statuses` (or raises it, if it's an exception).
+    """
+    def __init__(self, statuses):
+        super().__init__()
+        self.statuses = statuses
+        self.methods = []
+
+    def send(self, request, **kwargs):
+        self.methods.append(request.method)
+        status = self.statuses.pop(0)
+        if isinstance(status, Exception):
+            raise status
+
+        response = requests.Response()
+        response.status_code = status
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def policy():
+    retry.configure({"max_attempts": 3, "base_delay": 0, "max_delay": 0, "per_command": 2, "budget_ratio": 0.1,
+                     "min_per_second": 0})
+    yield retry.POLICY
+    retry.configure(None)
+
+
+def make_session(statuses):
+    session = UpstreamSession("Test")
+    adapter = FlakyAdapter(statuses)
+    session.mount("https://", adapter)
+    return session, adapter
+
+
+def test_retry_delay():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(5, 2 ** attempt)
+
+    # Retry-After is respected, up to the max delay:
+    assert policy.delay(0, retry_after=3) >= 3
+    assert policy.delay(0, retry_after=60) == 5
+
+
+def test_retry_budget():
+    now = [0]
+    budget = RetryBudget(ratio=0.5, min_per_second=1, capacity=2, clock=lambda: now[0])
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    # Calls earn a fraction of a retry:
+    budget.record_call()
+    budget.record_call()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    # And time earns "min_per_second":
+    now[0] += 1
+    assert budget.withdraw()
+
+
+def test_retries_idempotent_calls(policy):
+    session, adapter = make_session([503, requests.exceptions.ConnectionError(), 200])
+    assert session.get("https://api.example.com/repos").status_code == 200
+    assert len(adapter.methods) == 3
+
+    session, adapter = make_session([502, 204])
+    assert session.put("https://api.example.com/repos").status_code == 204
+
+    # Gives up after max_attempts:
+    session, adapter = make_session([504, 504, 504, 200])
+    assert session.delete("https://api.example.com/repos").status_code == 504
+    assert len(adapter.statuses) == 1
+
+    # Other errors aren't retried:
+    session, adapter = make_session([500, 200])
+    assert session.get("https://api.example.com/repos").status_code == 500
+
+
+def test_doesnt_retry_posts(policy):
+    session, adapter = make_session([503, 201])
+    assert session.post("https://api.example.com/repos").status_code == 503
+
+    session, adapter = make_session([requests.exceptions.ConnectionError(), 200])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.patch("https://api.example.com/repos")
+
+    assert adapter.methods == ["PATCH"]
+
+
+def test_command_budget(policy):
+    with retry.command_budget():
+        session, adapter = make_session([503, 503, 503, 503, 503])
+        assert session.get("https://api.example.com/repos").status_code == 503
+        assert len(adapter.methods) == 3
+
+        # The command used up its 2 retries:
+        assert session.get("https://api.example.com/repos").status_code == 503
+        assert len(adapter.methods) == 4
+
+    assert retry.retry_stats()["out_of_command_budget"] >= 1
+
+
+def test_process_budget(policy):
+    retry.PROCESS_BUDGET.tokens = 1
+    session, adapter = make_session([503, 503, 503])
+    assert session.get("https://api.example.com/repos").status_code == 503
+    assert len(adapter.methods) == 2
+    assert retry.retry_stats()["out_of_process_budget"] >= 1
@@ -0,0 +1,93 @@
+"""
+.. module: hubcommander.tests.test_scheduler
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+
+from hubcommander.bot_components.scheduler import LaneScheduler, lane_for_command, submit, DEFAULT_LANES, \
+    FAST_LANE, READ_LANE, SLOW_LANE
+
+
+def test_lane_for_command():
+    assert lane_for_command({"cheap": True}) == FAST_LANE
+    assert lane_for_command({"cheap": True, "read_only": True}) == FAST_LANE
+    assert lane_for_command({"read_only": True}) == READ_LANE
+    assert lane_for_command({}) == SLOW_LANE
+    assert lane_for_command({"cheap": True, "lane": "custom"}, dict(DEFAULT_LANES, custom={"weight": 1})) == "custom"
+
+    # Without a read lane, the read-only commands go into the slow lane:
+    lanes = {FAST_LANE: {"weight": 4}, SLOW_LANE: {"weight": 1}}
+    assert lane_for_command({"read_only": True}, lanes) == SLOW_LANE
+
+
+def test_partial_lane_config(capsys):
+    from hubcommander.bot_components import scheduler
+
+    lanes = {FAST_LANE: {"weight": 4, "reserved_threads": 1}, SLOW_LANE: {"weight": 1}}
+    assert lane_for_command({"lane": "missing"}, lanes) == SLOW_LANE
+    assert lane_for_command({"lane": "missing"}, lanes) == SLOW_LANE
+    assert capsys.readouterr().out.count("\"missing\" command lane") == 1
+
+    # Without a slow lane either, the commands still run (in whatever lane there is):
+    scheduler.start_scheduler(1, {FAST_LANE: {"weight": 1}})
+    try:
+        for command in [{"read_only": True}, {}, {"lane": "custom"}]:
+            lane = lane_for_command(command)
+            assert lane == FAST_LANE
+            assert submit(lane, lambda: "ran").result(timeout=5) == "ran"
+    finally:
+        scheduler.stop_scheduler()
+
+
+def test_submit_without_scheduler_runs_inline():
+    assert submit(SLOW_LANE, lambda x: x * 2, 21).result(timeout=0) == 42
+
+
+def test_fast_lane_is_not_blocked_by_slow_lane():
+    release = threading.Event()
+    lanes = {
+        FAST_LANE: {"weight": 4, "reserved_threads": 1},
+        SLOW_LANE: {"weight": 1, "reserved_threads": 0},
+    }
+    scheduler = LaneScheduler(lanes, 1)
+
+    try:
+        # Tie up the shared thread with slow commands:
+        slow = [scheduler.submit(SLOW_LANE, release.wait, 10) for _ in range(3)]
+
+        # The reserved thread still runs the fast command:
+        assert scheduler.submit(FAST_LANE, lambda: "fast").result(timeout=5) == "fast"
+        assert not any(future.done() for future in slow)
+        assert scheduler.queue_depths()[SLOW_LANE] >= 2
+    finally:
+        release.set()
+        scheduler.shutdown()
+
+    assert all(future.result() for future in slow)
+
+
+def test_weighted_round_robin():
+    lanes = {
+        FAST_LANE: {"weight": 3},
+        SLOW_LANE: {"weight": 1},
+    }
+
+    # No threads, so that the picking order can be checked directly:
+    scheduler = LaneScheduler(lanes, 0)
+    for _ in range(8):
+        scheduler.submit(FAST_LANE, None)
+        scheduler.submit(SLOW_LANE, None)
+
+    picked = []
+    for _ in range(8):
+        lane = scheduler._pick_lane(list(lanes))
+        scheduler.queues[lane].popleft()
+        picked.append(lane)
+
+    assert picked.count(FAST_LANE) == 6
+    assert picked.count(SLOW_LANE) == 2
+    scheduler.shutdown()
@@ -0,0 +1,59 @@
+"""
+.. module: hubcommander.tests.test_sharding
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import pytest
+
+from hubcommander.bot_components import sharding
+
+
+@pytest.fixture(scope="function")
+def reset_sharding():
+    yield
+    sharding.configure()
+
+
+def test_exactly_one_shard_owns_each_channel(reset_sharding):
+    channels = ["C{:08d}".format(x) for x in range(200)]
+
+    owners = {}
+    for index in range(3):
+        sharding.configure(3, index)
+        for channel in channels:
+            if sharding.owns_channel(channel):
+                owners.setdefault(channel, []).append(index)
+
+    assert len(owners) == len(channels)
+    assert all(len(indexes) == 1 for indexes in owners.values())
+
+    # Every shard should get some of the channels:
+    assert {indexes[0] for indexes in owners.values()} == {0, 1, 2}
+
+
+def test_invalid_shard_index(reset_sharding):
+    with pytest.raises(ValueError):
+        sharding.configure(2, 2)
+
+
+def test_message_lease_is_taken_once(reset_sharding, tmpdir):
+    path = str(tmpdir.join("leases.db"))
+    replica_one = sharding.SQLiteLeaseStore(path, owner="one")
+    replica_two = sharding.SQLiteLeaseStore(path, owner="two")
+
+    assert replica_one.acquire("C12345:1500000000.000001")
+    assert not replica_two.acquire("C12345:1500000000.000001")
+    assert not replica_one.acquire("C12345:1500000000.000001")
+    assert replica_two.acquire("C12345:1500000000.000002")
+
+    # Expired leases can be taken over:
+    expired = sharding.SQLiteLeaseStore(path, lease_seconds=-1, owner="three")
+    assert expired.acquire("C12345:1500000000.000003")
+    assert replica_one.acquire("C12345:1500000000.000003")
+
+    sharding.configure(1, 0, replica_two)
+    assert not sharding.claim_message({"channel": "C12345", "ts": "1500000000.000001"})
+    assert sharding.claim_message({"channel": "C12345", "ts": "1500000000.000004"})
@@ -7,6 +7,7 @@
 .. moduleauthor:: Mike Grima <mgrima@netflix.com>
 """
 import json
+import time
 
 import pytest
 
@@ -82,3 +83,257 @@ def test_get_user(slack_client):
     result, error = get_user_data({"user": "error"})
     assert not result
     assert error
+
+
+def test_user_cache(slack_client):
+    from hubcommander.bot_components.slack_comm import configure_user_cache, get_user_data, prefetch_users
+
+    configure_user_cache(300)
+    try:
+        assert prefetch_users(["hcommander", "error"]) == 1
+
+        result, error = get_user_data({"user": "hcommander"})
+        assert not error
+        assert result["name"] == "hcommander"
+
+        # Errors aren't cached:
+        assert get_user_data({"user": "error"})[1]
+        assert slack_client.api_call.call_count == 3
+
+    finally:
+        configure_user_cache(None)
+
+
+def test_retry_after():
+    from hubcommander.bot_components.slack_comm import retry_after, MAX_RATE_LIMIT_BACKOFF
+    assert [retry_after(attempts) for attempts in [1, 2, 3]] == [1, 2, 4]
+    assert retry_after(20) == MAX_RATE_LIMIT_BACKOFF
+
+
+def test_rate_limited_api_call(slack_client, monkeypatch):
+    from hubcommander.bot_components import slack_comm
+    from hubcommander.bot_components.slack_comm import api_call
+    monkeypatch.setattr(slack_comm, "RATE_LIMIT_BACKOFF", 0)
+    responses = [{"ok": False, "error": "ratelimited"}, {"ok": True}]
+    slack_client.api_call.side_effect = lambda *args, **kwargs: responses.pop(0)
+
+    assert api_call("chat.postMessage", channel="some_channel") == {"ok": True}
+    assert slack_client.api_call.call_count == 2
+
+
+def test_outbound_queue(slack_client, monkeypatch):
+    from hubcommander.bot_components import slack_comm
+    from hubcommander.bot_components.slack_comm import OutboundQueue
+    monkeypatch.setattr(slack_comm, "RATE_LIMIT_BACKOFF", 0.05)
+    sent = []
+    rate_limited = []
+
+    def send(verb, **kwargs):
+        # Rate limit the very first message to "other_channel":
+        if kwargs["channel"] == "other_channel" and not rate_limited:
+            rate_limited.append(True)
+            return {"ok": False, "error": "ratelimited"}
+
+        sent.append((kwargs["channel"], kwargs["text"], time.monotonic()))
+        return {"ok": True, "ts": str(len(sent))}
+
+    slack_client.api_call.side_effect = send
+
+    queue = OutboundQueue(interval=0.05)
+    futures = [queue.put(channel, "chat.postMessage", {"channel": channel, "text": text})
+               for channel, text in [("some_channel", "one"), ("other_channel", "two"),
+                                     ("some_channel", "three"), ("other_channel", "four")]]
+    queue.shutdown()
+
+    assert all(future.result(timeout=5)["ok"] for future in futures)
+    assert [text for channel, text, _ in sent if channel == "some_channel"] == ["one", "three"]
+    assert [text for channel, text, _ in sent if channel == "other_channel"] == ["two", "four"]
+
+    # Messages to the same channel are spaced out:
+    some_channel = [when for channel, _, when in sent if channel == "some_channel"]
+    assert some_channel[1] - some_channel[0] >= 0.04
+
+
+def test_send_working_is_deferred(slack_client):
+    from hubcommander.bot_components import slack_comm
+    from hubcommander.bot_components.slack_comm import send_working, finish_working, send_success, WORKING_COLOR
+
+    user_data = {"name": "hcommander"}
+    try:
+        # Fast commands never acknowledge:
+        slack_comm.configure_working(0.05)
+        data = {"channel": "some_channel", "ts": "1.1"}
+        send_working(data, user_data)
+        send_success("some_channel", "Done!", thread="1.1")
+        finish_working(data)
+        time.sleep(0.1)
+        assert slack_client.api_call.call_count == 1
+
+        # Slow commands do:
+        data = {"channel": "some_channel", "ts": "1.2"}
+        send_working(data, user_data)
+        time.sleep(0.2)
+        attachment = {"text": "@hcommander: Working, Please wait...", "color": WORKING_COLOR}
+        slack_client.api_call.assert_called_with("chat.postMessage", channel="some_channel", text=" ",
+                                                 attachments=json.dumps([attachment]), as_user=True, thread_ts="1.2")
+
+        # Reactions are removed when the command is done:
+        slack_comm.configure_working(0.05, "hourglass")
+        data = {"channel": "some_channel", "ts": "1.3"}
+        send_working(data, user_data)
+        time.sleep(0.2)
+        slack_client.api_call.assert_called_with("reactions.add", channel="some_channel", timestamp="1.3",
+                                                 name="hourglass")
+        finish_working(data)
+        slack_client.api_call.assert_called_with("reactions.remove", channel="some_channel", timestamp="1.3",
+                                                 name="hourglass")
+
+    finally:
+        slack_comm.configure_working()
+
+
+def test_reply_is_updated_in_place(slack_client):
+    from hubcommander.bot_components.slack_comm import Reply, OutboundQueue, WORKING_COLOR
+    import hubcommander.bot_components.slack_comm as slack_comm
+
+    slack_client.api_call.side_effect = None
+    slack_client.api_call.return_value = {"ok": True, "ts": "2.1"}
+
+    reply = Reply("some_channel", thread="1.1")
+    reply.info("Working on it...")
+    slack_client.api_call.assert_called_with("chat.postMessage", channel="some_channel", text=" ",
+                                             attachments=json.dumps([{"text": "Working on it...",
+                                                                      "color": WORKING_COLOR}]),
+                                             as_user=True, thread_ts="1.1")
+
+    reply.success("Done!")
+    slack_client.api_call.assert_called_with("chat.update", channel="some_channel", ts="2.1", text=" ",
+                                             attachments=json.dumps([{"text": "Done!", "color": "good"}]),
+                                             as_user=True)
+    assert slack_client.api_call.call_count == 2
+
+    # The update waits for the original message's timestamp when both are queued up:
+    slack_comm.OUTBOUND_QUEUE = OutboundQueue(interval=0)
+    try:
+        reply = Reply("some_channel")
+        reply.info("Working on it...")
+        reply.error("Nope!").result(timeout=5)
+        slack_client.api_call.assert_called_with("chat.update", channel="some_channel", ts="2.1", text=" ",
+                                                 attachments=json.dumps([{"text": "Nope!", "color": "danger"}]),
+                                                 as_user=True)
+    finally:
+        slack_comm.stop_outbound_queue()
+
+    # If the original message didn't make it, then the update is posted instead:
+    slack_client.api_call.return_value = {"ok": False, "error": "channel_not_found"}
+    reply = Reply("some_channel", thread="1.1")
+    reply.info("Working on it...")
+    reply.success("Done!")
+    slack_client.api_call.assert_called_with("chat.postMessage", channel="some_channel", text=" ",
+                                             attachments=json.dumps([{"text": "Done!", "color": "good"}]),
+                                             as_user=True, thread_ts="1.1")
+
+    # Ephemeral replies can't be edited:
+    slack_client.api_call.reset_mock()
+    reply = Reply("some_channel", ephemeral_user="user")
+    reply.info("one")
+    reply.info("two")
+    assert [call[0][0] for call in slack_client.api_call.call_args_list] == ["chat.postEphemeral"] * 2
+
+
+def test_send_table(slack_client):
+    from hubcommander.bot_components import slack_comm
+    from hubcommander.bot_components.slack_comm import Table, send_table
+
+    table = Table(["#PR", "Title"], ([number, "PR {}".format(number)] for number in [1, 123]))
+    assert list(table.lines()) == [
+        "| #PR | Title  |",
+        "|-----+--------|",
+        "|   1 | PR 1   |",
+        "| 123 | PR 123 |",
+    ]
+    assert table.rendered_length() == len("\n".join(table.lines())) + 1
+
+    # Split on row boundaries, with the headers on each chunk:
+    chunks = list(table.chunks(len("\n".join(list(table.lines())[:3]))))
+    assert chunks == ["| #PR | Title  |\n|-----+--------|\n|   1 | PR 1   |",
+                      "| #PR | Title  |\n|-----+--------|\n| 123 | PR 123 |"]
+
+    # Small tables are a single message:
+    send_table("some_channel", "PRs", ["#PR", "Title"], [[1, "PR 1"]], thread="1.1")
+    slack_client.api_call.assert_called_with("chat.postMessage", channel="some_channel", as_user=True,
+                                             text="PRs \n\n```| #PR | Title |\n|-----+-------|\n|   1 | PR 1  |```",
+                                             attachments="null", thread_ts="1.1")
+
+    # Bigger ones are split across messages:
+    rows = [[number, "x" * 100] for number in range(100)]
+    slack_client.api_call.reset_mock()
+    send_table("some_channel", "PRs", ["#PR", "Title"], rows)
+    assert slack_client.api_call.call_count > 1
+    for call in slack_client.api_call.call_args_list:
+        assert len(call[1]["text"]) <= slack_comm.MAX_MESSAGE_LENGTH + 20
+
+    # The biggest ones are uploaded:
+    rows = [[number, "x" * 100] for number in range(1000)]
+    uploaded = []
+    slack_client.api_call.reset_mock()
+    slack_client.api_call.side_effect = lambda verb, **kwargs: uploaded.append(kwargs["file"].read())
+    send_table("some_channel", "PRs", ["#PR", "Title"], rows, thread="1.1")
+    assert slack_client.api_call.call_count == 1
+    args, kwargs = slack_client.api_call.call_args
+    assert args == ("files.upload",)
+    assert kwargs["channels"] == "some_channel"
+    assert kwargs["thread_ts"] == "1.1"
+    assert kwargs["filename"] == "table.txt"
+    assert uploaded == ["".join(line + "\n" for line in Table(["#PR", "Title"], rows).lines()).encode("utf-8")]
+
+    # The table is uploaded from a file, which is closed once it has been sent:
+    assert kwargs["file"].closed
+
+
+def test_table_reply(slack_client):
+    from hubcommander.bot_components.slack_comm import TableReply, format_age
+
+    slack_client.api_call.side_effect = None
+    slack_client.api_call.return_value = {"ok": True, "ts": "2.1"}
+
+    reply = TableReply("some_channel", "PRs", ["#PR", "Title"], thread="1.1")
+    reply.send([[1, "PR 1"]], "_(from {} ago)_".format(format_age(125)))
+    slack_client.api_call.assert_called_with("chat.postMessage", channel="some_channel", as_user=True,
+                                             text="PRs _(from 2m ago)_ \n\n"
+                                                  "```| #PR | Title |\n|-----+-------|\n|   1 | PR 1  |```",
+                                             attachments="null", thread_ts="1.1")
+
+    # Single messages are edited in place:
+    reply.send([[1, "PR 1"], [2, "PR 2"]], "_(updated)_")
+    slack_client.api_call.assert_called_with("chat.update", channel="some_channel", ts="2.1", as_user=True,
+                                             text="PRs _(updated)_ \n\n```| #PR | Title |\n|-----+-------|\n"
+                                                  "|   1 | PR 1  |\n|   2 | PR 2  |```")
+
+    # Tables that don't fit in one message are sent again:
+    slack_client.api_call.reset_mock()
+    reply.send([[number, "x" * 100] for number in range(100)])
+    assert {call[0][0] for call in slack_client.api_call.call_args_list} == {"chat.postMessage"}
+
+
+def test_table_reply_uploads_without_chunking(slack_client, monkeypatch):
+    from hubcommander.bot_components import slack_comm
+    from hubcommander.bot_components.slack_comm import Table, TableReply
+
+    slack_client.api_call.side_effect = None
+    slack_client.api_call.return_value = {"ok": True, "ts": "2.1"}
+
+    reply = TableReply("some_channel", "PRs", ["#PR", "Title"], thread="1.1")
+    reply.send([[1, "PR 1"]])
+
+    # The big table is uploaded straight from its rows, without being split into messages first:
+    def chunks(self, max_length):
+        raise AssertionError("The table was split into chunks.")
+
+    monkeypatch.setattr(Table, "chunks", chunks)
+    rows = [[number, "x" * 100] for number in range(1000)]
+    assert Table(["#PR", "Title"], rows).rendered_length() > slack_comm.UPLOAD_TABLE_LENGTH
+
+    slack_client.api_call.reset_mock()
+    reply.send(rows, "_(updated)_")
+    assert [call[0][0] for call in slack_client.api_call.call_args_list] == ["files.upload"]
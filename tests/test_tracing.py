@@ -0,0 +1,143 @@
+"""
+.. module: hubcommander.tests.test_tracing
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import threading
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from hubcommander.bot_components import tracing
+from hubcommander.bot_components.decorators import hubcommander_command
+from hubcommander.bot_components.http import UpstreamSession
+from hubcommander.bot_components.pipeline import Stage, add_stage
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        with self.lock:
+            self.spans.append(span.to_dict())
+
+    def by_name(self):
+        return {span["name"]: span for span in self.spans}
+
+
+class OKAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    tracing.configure(exporter=exporter)
+    yield exporter
+    tracing.configure()
+
+
+def test_spans(exporter):
+    # Nothing is traced outside of a trace:
+    with tracing.span("orphan") as span:
+        assert not span
+
+    data = {"channel": "C12345", "ts": "1500000000.000100", "user": "U12345"}
+    with tracing.trace_message(data, "!testcommand") as root:
+        with tracing.span("child", extra="yes"):
+            pass
+
+        with pytest.raises(ValueError):
+            with tracing.span("broken"):
+                raise ValueError("nope")
+
+    spans = exporter.by_name()
+    assert set(spans) == {"!testcommand", "child", "broken"}
+    assert root.trace_id == tracing.trace_id_for_message(data)
+    assert spans["!testcommand"]["attributes"]["slack.ts"] == data["ts"]
+    assert spans["!testcommand"]["parent_span_id"] is None
+    assert spans["child"]["parent_span_id"] == root.span_id
+    assert spans["child"]["attributes"] == {"extra": "yes"}
+    assert spans["broken"]["status"] == "error"
+    assert spans["broken"]["attributes"]["error"] == "ValueError: nope"
+    assert all(span["trace_id"] == root.trace_id for span in exporter.spans)
+
+
+def test_command_spans(exporter, user_data):
+    session = UpstreamSession("Test")
+    session.mount("https://", OKAdapter())
+
+    def check(plugin_obj, data, user_data, args):
+        return session.get("https://api.tracing.test/repos/{}".format(args["repo"])).status_code == 200
+
+    class TestCommands:
+        def __init__(self):
+            self.commands = {"!TraceCommand": {}}
+
+        @hubcommander_command(
+            name="!TraceCommand",
+            usage="!TraceCommand <repo>",
+            description="This is a test command.",
+            required=[
+                dict(name="repo", properties=dict(type=str, help="The repo.")),
+            ],
+            optional=[]
+        )
+        @add_stage(Stage("repo_must_exist", check, concurrent=True))
+        @add_stage(Stage("always", lambda *args: True, concurrent=True))
+        def trace_command(self, data, user_data, repo):
+            return repo
+
+    data = {"channel": "C12345", "ts": "1500000000.000200", "text": "!TraceCommand hubcommander"}
+    with tracing.trace_message(data, "!tracecommand"):
+        assert TestCommands().trace_command(data, user_data) == "hubcommander"
+
+    spans = exporter.by_name()
+    assert set(spans) == {"!tracecommand", "parse", "repo_must_exist", "always", "execute", "HTTP GET"}
+
+    # The concurrent stages run on other threads, but are still in the command's trace:
+    assert spans["HTTP GET"]["parent_span_id"] == spans["repo_must_exist"]["span_id"]
+    assert spans["HTTP GET"]["attributes"]["http.status_code"] == 200
+    assert spans["HTTP GET"]["attributes"]["http.host"] == "api.tracing.test"
+    assert spans["repo_must_exist"]["parent_span_id"] == spans["!tracecommand"]["span_id"]
+    assert spans["repo_must_exist"]["attributes"]["passed"]
+
+    path = tracing.critical_path(exporter.spans)
+    assert path[0]["name"] == "!tracecommand"
+    assert path[1]["name"] == "execute"
+
+
+def test_json_file_exporter(tmpdir):
+    path = str(tmpdir.join("spans.json"))
+    tracing.configure(path)
+    try:
+        data = {"channel": "C12345", "ts": "1500000000.000300"}
+        with tracing.trace_message(data, "!one"):
+            with tracing.span("first"):
+                pass
+
+            with tracing.span("second"):
+                with tracing.span("inner"):
+                    pass
+
+    finally:
+        tracing.configure()
+
+    traces = tracing.load_spans(path)
+    assert list(traces) == [tracing.trace_id_for_message(data)]
+
+    spans = traces[tracing.trace_id_for_message(data)]
+    assert [span["name"] for span in tracing.critical_path(spans)] == ["!one", "second", "inner"]
@@ -0,0 +1,76 @@
+"""
+.. module: hubcommander.tests.test_workers
+    :platform: Unix
+    :copyright: (c) 2017 by Netflix Inc., see AUTHORS for more
+    :license: Apache, see LICENSE for more details.
+
+.. moduleauthor:: Mike Grima <mgrima@netflix.com>
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+WORKER_STATE = {}
+
+
+def init_worker(value):
+    WORKER_STATE["value"] = value
+
+
+def run_in_worker(text):
+    return os.getpid(), WORKER_STATE.get("value"), text
+
+
+def die_in_worker():
+    os._exit(1)
+
+
+def test_dispatch_to_workers():
+    from hubcommander.bot_components import workers
+
+    workers.start_workers(1, init_worker, initargs=("set up",))
+    try:
+        pid, value, text = workers.dispatch(run_in_worker, "!Help").result(timeout=60)
+    finally:
+        workers.stop_workers()
+
+    assert pid != os.getpid()
+    assert value == "set up"
+    assert text == "!Help"
+    assert not workers.WORKER_POOL
+
+
+def test_replace_broken_pool():
+    from concurrent.futures.process import BrokenProcessPool
+    from hubcommander.bot_components import workers
+
+    workers.start_workers(1, init_worker, initargs=("set up",))
+    try:
+        broken = workers.WORKER_POOL
+        with pytest.raises(BrokenProcessPool):
+            workers.dispatch(die_in_worker).result(timeout=60)
+
+        # The next commands go to a new pool (that was set up the same way):
+        pid, value, text = workers.dispatch(run_in_worker, "!Help").result(timeout=60)
+        assert workers.WORKER_POOL is not broken
+        assert value == "set up"
+
+        # Even if the broken pool was still being used:
+        workers.WORKER_POOL.shutdown()
+        workers.WORKER_POOL = broken
+        assert workers.dispatch(run_in_worker, "!Help").result(timeout=60)[1] == "set up"
+        assert workers.WORKER_POOL is not broken
+
+    finally:
+        workers.stop_workers()
+
+
+def test_importing_workers_skips_multiprocessing():
+    # In a fresh interpreter, since this one has already imported multiprocessing:
+    code = "import sys; import hubcommander.bot_components.workers; print('multiprocessing' in sys.modules)"
+    output = subprocess.check_output([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+        path for path in sys.path if path)))
+
+    assert output.decode("utf-8").strip() == "False"